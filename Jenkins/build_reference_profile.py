@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Script Jenkins : construit le profil de référence utilisé par le backend
+pour les flags out-of-distribution (OOD) au moment du scoring
+
+Depuis monitoring/data/churn2.csv (données d'entraînement) :
+- features numériques : quantiles (0.5% ... 99.5%), min, max
+- features catégorielles : fréquences des modalités
+
+Le profil (quelques Ko de JSON) est écrit dans backend/src/processors/
+et embarqué dans l'image Docker avec le modèle.
+"""
+
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Chemins du projet
+PROJECT_ROOT = Path(__file__).parent.parent
+REFERENCE_CSV = PROJECT_ROOT / "monitoring" / "data" / "churn2.csv"
+BACKEND_PROCESSORS = PROJECT_ROOT / "backend" / "src" / "processors"
+PROFILE_PATH = BACKEND_PROCESSORS / "reference_profile.json"
+
+# Colonnes hors features (identifiant, cible)
+EXCLUDED_COLUMNS = {"clientnum", "attrition_flag"}
+
+QUANTILES = [0.005, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 0.995]
+
+
+def build_profile(df: pd.DataFrame) -> dict:
+    """Profil compact : quantiles par feature numérique, fréquences par feature catégorielle"""
+    df = df.copy()
+    df.columns = df.columns.str.lower()
+    df = df.loc[:, [c for c in df.columns if c not in EXCLUDED_COLUMNS and not c.startswith("unnamed")]]
+
+    numeric = {}
+    categorical = {}
+
+    for col in df.columns:
+        series = df[col].dropna()
+        if pd.api.types.is_numeric_dtype(series):
+            q = series.quantile(QUANTILES)
+            numeric[col] = {
+                "quantiles": {str(k): float(v) for k, v in q.items()},
+                "min": float(series.min()),
+                "max": float(series.max()),
+            }
+        else:
+            freqs = series.astype(str).value_counts(normalize=True)
+            categorical[col] = {str(k): round(float(v), 6) for k, v in freqs.items()}
+
+    return {
+        "source": REFERENCE_CSV.name,
+        "rows": int(len(df)),
+        "created_at": datetime.now().isoformat(),
+        "numeric": numeric,
+        "categorical": categorical,
+    }
+
+
+def main():
+    print("="*80)
+    print("📐 CONSTRUCTION DU PROFIL DE RÉFÉRENCE (OOD)")
+    print("="*80)
+
+    if not REFERENCE_CSV.exists():
+        print(f"❌ Données de référence non trouvées: {REFERENCE_CSV}")
+        sys.exit(1)
+
+    df = pd.read_csv(REFERENCE_CSV)
+    profile = build_profile(df)
+
+    BACKEND_PROCESSORS.mkdir(parents=True, exist_ok=True)
+    with open(PROFILE_PATH, "w") as f:
+        json.dump(profile, f, indent=2)
+
+    print(f"✅ Profil écrit: {PROFILE_PATH}")
+    print(f"   Lignes de référence:     {profile['rows']}")
+    print(f"   Features numériques:     {len(profile['numeric'])}")
+    print(f"   Features catégorielles:  {len(profile['categorical'])}")
+    print(f"   Taille: {PROFILE_PATH.stat().st_size / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ MODEL_REGISTRY_DIR = PROJECT_ROOT / "notebooks" / "model_registry"
 NOTEBOOKS_PROCESSORS = PROJECT_ROOT / "notebooks" / "processors"
 BACKEND_PROCESSORS = PROJECT_ROOT / "backend" / "src" / "processors"
 BACKEND_MODEL_DIR = BACKEND_PROCESSORS / "models"
+BACKEND_REGISTRY_DIR = BACKEND_PROCESSORS / "registry"
 
 def create_directories():
     """Créer les dossiers nécessaires"""
@@ -147,6 +148,34 @@ def copy_model_to_backend(model, metadata):
     
     return True
 
+def export_inference_model(model):
+    """
+    Exporte le modèle sans les étapes d'entraînement (samplers imblearn type SMOTE)
+    
+    Les samplers ne s'appliquent qu'au fit : à l'inférence, le Pipeline imblearn
+    se réduit à son estimateur final. Le backend charge ce fichier en priorité,
+    ce qui évite d'importer imblearn au démarrage (cold start).
+    """
+    inference_path = BACKEND_MODEL_DIR / "best_model_inference.pkl"
+    
+    steps = getattr(model, 'steps', None)
+    if not steps or not all(hasattr(step, 'fit_resample') for _, step in steps[:-1]):
+        # Pas de Pipeline, ou étapes de transformation à conserver
+        if inference_path.exists():
+            inference_path.unlink()
+        print("\nℹ️ Pas de modèle d'inférence allégé (le backend utilisera best_model_final.pkl)")
+        return False
+    
+    try:
+        with open(inference_path, 'wb') as f:
+            pickle.dump(steps[-1][1], f)
+        print(f"\n✅ Modèle d'inférence exporté: {inference_path}")
+        print(f"   Étapes retirées: {', '.join(name for name, _ in steps[:-1])}")
+        return True
+    except Exception as e:
+        print(f"\n⚠️ Impossible d'exporter le modèle d'inférence: {e}")
+        return False
+
 def copy_preprocessors():
     """Copie les fichiers preprocessors depuis notebooks vers backend"""
     
@@ -187,6 +216,46 @@ def copy_preprocessors():
     
     return success_count > 0
 
+def copy_cascade_model():
+    """Copie le modèle léger de la cascade s'il a été entraîné (optionnel)"""
+    
+    src = NOTEBOOKS_PROCESSORS / "models" / "cascade_model.pkl"
+    dst = BACKEND_MODEL_DIR / "cascade_model.pkl"
+    
+    if not src.exists():
+        print("\nℹ️ Pas de modèle cascade (Jenkins/train_model.py), cascade indisponible")
+        return False
+    
+    try:
+        shutil.copy2(src, dst)
+        print(f"\n✅ Modèle cascade copié: {dst}")
+        return True
+    except Exception as e:
+        print(f"\n⚠️ Impossible de copier le modèle cascade: {e}")
+        return False
+
+def copy_model_registry():
+    """Copie tout le registry (toutes les versions) pour le pool multi-modèles du backend"""
+    
+    print("\n" + "="*80)
+    print("📦 COPIE DU REGISTRY VERS BACKEND (model pool)")
+    print("="*80)
+    
+    try:
+        if BACKEND_REGISTRY_DIR.exists():
+            shutil.rmtree(BACKEND_REGISTRY_DIR)
+        shutil.copytree(
+            MODEL_REGISTRY_DIR,
+            BACKEND_REGISTRY_DIR,
+            ignore=shutil.ignore_patterns('mlruns', '*.tmp')
+        )
+        for model_dir in sorted(d for d in BACKEND_REGISTRY_DIR.iterdir() if d.is_dir()):
+            print(f"✅ Copié: {model_dir.name}")
+        return True
+    except Exception as e:
+        print(f"⚠️ Impossible de copier le registry: {e}")
+        return False
+
 def verify_backend_files():
     """Vérifie que tous les fichiers critiques sont présents"""
     
@@ -244,16 +313,25 @@ def main():
         print("\n❌ ÉCHEC: Impossible de copier le modèle")
         sys.exit(1)
     
+    # 4b. Modèle d'inférence allégé (démarrage plus rapide du backend)
+    export_inference_model(model)
+    
     # 5. Copier les preprocessors
     if not copy_preprocessors():
         print("\n⚠️ ATTENTION: Certains preprocessors n'ont pas été copiés")
     
-    # 6. Vérifier que tout est OK
+    # 6. Copier le modèle cascade (optionnel)
+    copy_cascade_model()
+    
+    # 7. Copier le registry complet (modèles servis à la demande)
+    copy_model_registry()
+    
+    # 8. Vérifier que tout est OK
     if not verify_backend_files():
         print("\n❌ ÉCHEC: Fichiers critiques manquants")
         sys.exit(1)
     
-    # 7. Succès !
+    # 9. Succès !
     print("\n" + "="*80)
     print("✅ DÉPLOIEMENT RÉUSSI")
     print("="*80)
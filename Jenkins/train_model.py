@@ -8,11 +8,15 @@ from pathlib import Path
 from lightgbm import LGBMClassifier
 from xgboost import XGBClassifier
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 
 # Configuration - Utiliser les variables d'environnement de Jenkins
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Modèle léger de la cascade (premier étage du backend)
+CASCADE_MODEL_PATH = BASE_DIR / "notebooks" / "processors" / "models" / "cascade_model.pkl"
+
 # Récupérer depuis les variables d'environnement
 DAGSHUB_USERNAME = os.getenv('DAGSHUB_USER', 'karrayyessine1')
 DAGSHUB_REPO = os.getenv('DAGSHUB_REPO', 'MLOps_Project')
@@ -58,6 +62,45 @@ def calculate_metrics(y_true, y_pred, y_proba):
         'roc_auc': roc_auc_score(y_true, y_proba)
     }
 
+def train_cascade_model(X_train, X_test, y_train, y_test, run_timestamp):
+    """
+    Entraîne le modèle léger de la cascade (régression logistique)
+    Il score toutes les lignes côté backend ; seules les lignes incertaines
+    sont envoyées au LightGBM tuné.
+    """
+    print("Training CascadeLogReg...")
+
+    # Hyperparamètres tunés de la régression logistique (notebook modeling)
+    model = LogisticRegression(solver='liblinear', penalty='l2', C=0.04832930238571752, max_iter=1000)
+
+    with mlflow.start_run(run_name=f"CascadeLogReg_CT_{run_timestamp}"):
+        mlflow.log_params(model.get_params())
+        mlflow.log_param('model_name', 'CascadeLogReg')
+        mlflow.log_param('stage', 'cascade_first_stage')
+        mlflow.log_param('timestamp', run_timestamp)
+
+        start_time = datetime.now()
+        model.fit(X_train, y_train)
+        duration = (datetime.now() - start_time).total_seconds()
+
+        y_pred = model.predict(X_test)
+        y_proba = model.predict_proba(X_test)[:, 1]
+        metrics = calculate_metrics(y_test, y_pred, y_proba)
+
+        for k, v in metrics.items():
+            mlflow.log_metric(k, v)
+        mlflow.log_metric('training_time_seconds', duration)
+
+        print(f"  --> CascadeLogReg finished. ROC-AUC: {metrics['roc_auc']:.4f} ({duration:.1f}s)")
+
+        mlflow.sklearn.log_model(model, "model")
+
+    CASCADE_MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(CASCADE_MODEL_PATH, 'wb') as f:
+        pickle.dump(model, f)
+    print(f"✅ Modèle cascade sauvegardé: {CASCADE_MODEL_PATH}")
+
+
 def train_and_track():
     """Fonction principale d'entraînement."""
     
@@ -122,6 +165,9 @@ def train_and_track():
             # Log Model
             mlflow.sklearn.log_model(model, "model")
 
+    # 4. Modèle léger de la cascade
+    train_cascade_model(X_train, X_test, y_train, y_test, run_timestamp)
+
     print("\n✅ Continuous Training Pipeline Completed.")
 
 if __name__ == "__main__":
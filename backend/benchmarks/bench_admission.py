@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark admission control : latence interactive sous charge bulk
+
+Contre une API démarrée (uvicorn main:app), mesure la latence de /predict
+(p50 / p95 / p99) seule, puis pendant que des clients bulk envoient en
+boucle de gros CSV sur /predict-csv. Relancer l'API avec
+ADMISSION_ENABLED=false pour comparer sans admission control.
+
+Usage:
+    python backend/benchmarks/bench_admission.py --url http://localhost:8000
+    python backend/benchmarks/bench_admission.py --bulk-clients 4 --rows 100000
+"""
+import argparse
+import os
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import requests
+
+from bench_utils import DATA_DIR
+
+SAMPLE_CSV = os.path.join(DATA_DIR, "prod_batch_01_no_drift.csv")
+
+CUSTOMER = {
+    "customer_age": 45, "gender": "M", "dependent_count": 3, "education_level": "Graduate",
+    "marital_status": "Married", "income_category": "$60K - $80K", "card_category": "Blue",
+    "months_on_book": 39, "total_relationship_count": 5, "months_inactive_12_mon": 1,
+    "contacts_count_12_mon": 3, "credit_limit": 12691.0, "total_revolving_bal": 777,
+    "avg_open_to_buy": 11914.0, "total_amt_chng_q4_q1": 1.335, "total_trans_amt": 1144,
+    "total_trans_ct": 42, "total_ct_chng_q4_q1": 1.625, "avg_utilization_ratio": 0.061,
+}
+
+
+def make_payload(rows: int) -> bytes:
+    sample = pd.read_csv(SAMPLE_CSV)
+    return sample.sample(n=rows, replace=True, random_state=42).to_csv(index=False).encode("utf-8")
+
+
+def interactive_latencies(url: str, duration: float) -> tuple:
+    session = requests.Session()
+    latencies, statuses = [], Counter()
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        r = session.post(f"{url}/predict", json=CUSTOMER, headers={"X-Client-Id": "interactive"}, timeout=60)
+        latencies.append(time.perf_counter() - start)
+        statuses[r.status_code] += 1
+    return np.array(latencies) * 1000, statuses
+
+
+def bulk_client(url: str, client_id: str, payload: bytes, stop: threading.Event, statuses: Counter):
+    session = requests.Session()
+    while not stop.is_set():
+        r = session.post(f"{url}/predict-csv", files={"file": ("bulk.csv", payload)},
+                         headers={"X-Client-Id": client_id}, timeout=600)
+        statuses[r.status_code] += 1
+        if r.status_code == 429:
+            # Client bien élevé : respecte Retry-After (borné pour la durée du bench)
+            stop.wait(min(float(r.headers.get("Retry-After", 1)), 2.0))
+
+
+def report(name: str, latencies, statuses):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"   {name:<22} n={len(latencies):>5}  p50={p50:7.1f}ms  p95={p95:7.1f}ms  "
+          f"p99={p99:7.1f}ms  status={dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--rows", type=int, default=50_000, help="lignes par CSV bulk")
+    parser.add_argument("--bulk-clients", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+
+    admission = requests.get(f"{args.url}/health", timeout=10).json().get("admission", {})
+    print(f"🔧 Admission control: {'activé' if admission.get('enabled') else 'désactivé'}")
+
+    payload = make_payload(args.rows)
+    print(f"📦 Bulk: {args.bulk_clients} clients x {args.rows} lignes ({len(payload) / 1e6:.1f} MB)\n")
+
+    report("interactif seul", *interactive_latencies(args.url, args.duration))
+
+    stop = threading.Event()
+    bulk_statuses = Counter()
+    threads = [
+        threading.Thread(target=bulk_client, args=(args.url, f"bulk-{i}", payload, stop, bulk_statuses))
+        for i in range(args.bulk_clients)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(1.0)
+    try:
+        report("interactif + bulk", *interactive_latencies(args.url, args.duration))
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    print(f"   {'bulk':<22} status={dict(bulk_statuses)}")
+
+
+if __name__ == "__main__":
+    main()
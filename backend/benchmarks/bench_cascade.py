@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la cascade de modèles sur un batch réel
+
+Pour plusieurs bandes d'incertitude [low, high], mesure sur un fichier de
+production (prod_batch_01_no_drift.csv par défaut) :
+- la part de lignes envoyées au modèle complet (compute économisé)
+- l'accord des prédictions avec le modèle complet seul
+- l'écart max de probabilité et le temps d'inférence
+
+Usage:
+    python backend/benchmarks/bench_cascade.py
+    python backend/benchmarks/bench_cascade.py --csv monitoring/data/prod_batch_03_strong_drift.csv
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_utils import DATA_DIR, PROJECT_ROOT, find_processors_dir, load_artifacts, load_pickle
+from scoring import preprocess_raw_churn, apply_preprocessor
+from cascade import cascade_predict
+
+DEFAULT_BANDS = [(0.02, 0.98), (0.05, 0.95), (0.1, 0.9), (0.2, 0.8)]
+
+
+def load_cascade_model():
+    """cascade_model.pkl (Jenkins/train_model.py) ou, à défaut, le même modèle ré-entraîné localement"""
+    path = os.path.join(find_processors_dir(), "models", "cascade_model.pkl")
+    if os.path.exists(path):
+        print(f"✅ Modèle cascade: {path}")
+        return load_pickle(path)
+
+    from sklearn.linear_model import LogisticRegression
+
+    print("⚠️ cascade_model.pkl absent : entraînement local sur preprocessed_data.pkl")
+    data = load_pickle(os.path.join(PROJECT_ROOT, "notebooks", "processors", "preprocessed_data.pkl"))
+    model = LogisticRegression(solver='liblinear', penalty='l2', C=0.04832930238571752, max_iter=1000)
+    return model.fit(data['X_train'], data['y_train'])
+
+
+def timed(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=os.path.join(DATA_DIR, "prod_batch_01_no_drift.csv"))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model, preprocessor, feature_names = load_artifacts()
+    cascade_model = load_cascade_model()
+
+    df = pd.read_csv(args.csv)
+    X = apply_preprocessor(preprocess_raw_churn(df), preprocessor, feature_names)
+    print(f"📦 {os.path.basename(args.csv)}: {len(df)} lignes\n")
+
+    t_full, full_probas = timed(lambda: model.predict_proba(X), args.repeat)
+    full_pred = np.argmax(full_probas, axis=1)
+
+    print(f"{'bande':<14}{'escaladées':>12}{'accord':>10}{'max |Δp|':>10}{'temps':>10}{'gain':>8}")
+    print(f"{'full model':<14}{'100.0%':>12}{'100.00%':>10}{0:>10.3f}{t_full * 1000:>8.1f}ms{'x1.00':>8}")
+
+    for low, high in DEFAULT_BANDS:
+        t_cascade, (pred, probas) = timed(
+            lambda: cascade_predict(X, model, cascade_model, low=low, high=high), args.repeat
+        )
+        cheap = cascade_model.predict_proba(X)[:, 1]
+        escalated = ((cheap >= low) & (cheap <= high)).mean()
+        agreement = (pred == full_pred).mean()
+        max_diff = np.abs(probas[:, 1] - full_probas[:, 1]).max()
+        print(f"[{low:.2f}, {high:.2f}]  {escalated * 100:>10.1f}%{agreement * 100:>9.2f}%"
+              f"{max_diff:>10.3f}{t_cascade * 1000:>8.1f}ms{'x%.2f' % (t_full / t_cascade):>8}")
+
+
+if __name__ == "__main__":
+    main()
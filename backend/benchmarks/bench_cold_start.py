@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold start du backend : démarrage du processus -> premier /predict réussi
+
+1. Profil des imports de main.py (python -X importtime), modules les plus coûteux
+2. Lance `uvicorn main:app` plusieurs fois et mesure :
+   - le temps jusqu'à la première réponse HTTP (/health)
+   - le temps jusqu'au premier /predict réussi
+3. Compare les médianes au budget suivi dans cold_start_budget.json
+   (code de sortie 1 si le budget est dépassé)
+
+Usage:
+    python backend/benchmarks/bench_cold_start.py
+    python backend/benchmarks/bench_cold_start.py --runs 5 --env BACKGROUND_LOADING=false
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+from bench_utils import BACKEND_SRC, BENCH_DIR
+
+BUDGET_PATH = os.path.join(BENCH_DIR, "cold_start_budget.json")
+
+CUSTOMER = {
+    "customer_age": 45, "gender": "M", "dependent_count": 3, "education_level": "Graduate",
+    "marital_status": "Married", "income_category": "$60K - $80K", "card_category": "Blue",
+    "months_on_book": 39, "total_relationship_count": 5, "months_inactive_12_mon": 1,
+    "contacts_count_12_mon": 3, "credit_limit": 12691.0, "total_revolving_bal": 777,
+    "avg_open_to_buy": 11914.0, "total_amt_chng_q4_q1": 1.335, "total_trans_amt": 1144,
+    "total_trans_ct": 42, "total_ct_chng_q4_q1": 1.625, "avg_utilization_ratio": 0.061,
+}
+
+
+def import_profile(src: str, top: int):
+    """Imports directs de main.py triés par temps cumulé (µs)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", "import main"],
+        cwd=src, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Profondeur 1 sous main : deux espaces d'indentation
+        if name.startswith("   ") and not name.startswith("     "):
+            try:
+                rows.append((int(cumulative), name.strip()))
+            except ValueError:
+                continue
+    return sorted(rows, reverse=True)[:top]
+
+
+def measure_once(src: str, port: int, env: dict, timeout: float):
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=src, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    first_response = first_predict = None
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if first_response is None:
+                    requests.get(f"{url}/health", timeout=1)
+                    first_response = time.perf_counter() - start
+                r = requests.post(f"{url}/predict", json=CUSTOMER, timeout=timeout)
+                if r.status_code == 200:
+                    first_predict = time.perf_counter() - start
+                    break
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return first_response, first_predict
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--src", default=BACKEND_SRC, help="dossier de main.py (avec processors/)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--env", action="append", default=[], help="VAR=valeur passée à l'API")
+    args = parser.parse_args()
+
+    with open(BUDGET_PATH) as f:
+        budget = json.load(f)
+
+    env = dict(os.environ, SCORING_WORKERS="1")
+    env.update(item.split("=", 1) for item in args.env)
+
+    print("📦 Imports directs de main.py (temps cumulé):")
+    for cumulative, name in import_profile(args.src, args.top):
+        print(f"   {cumulative / 1000:8.1f} ms  {name}")
+
+    responses, predicts = [], []
+    for run in range(args.runs):
+        first_response, first_predict = measure_once(args.src, args.port, env, args.timeout)
+        if first_predict is None:
+            print(f"❌ Run {run + 1}: pas de /predict réussi en {args.timeout:.0f}s")
+            sys.exit(1)
+        responses.append(first_response)
+        predicts.append(first_predict)
+        print(f"   run {run + 1}: première réponse {first_response:.2f}s, premier /predict {first_predict:.2f}s")
+
+    results = {
+        "first_response_s": statistics.median(responses),
+        "first_predict_s": statistics.median(predicts),
+    }
+
+    print("\n⏱️ Médianes vs budget:")
+    within_budget = True
+    for key, value in results.items():
+        limit = budget[key]
+        ok = value <= limit
+        within_budget &= ok
+        print(f"   {'✅' if ok else '❌'} {key:<18} {value:6.2f}s  (budget {limit:.2f}s)")
+
+    sys.exit(0 if within_budget else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark /predict-csv : mode batch vs mode pipeliné
+
+Génère un gros CSV en ré-échantillonnant un batch de production, puis mesure
+le débit de bout en bout (read_csv -> preprocessing -> predict -> to_csv)
+des deux modes et vérifie que les sorties sont identiques.
+
+Usage:
+    python backend/benchmarks/bench_csv_pipeline.py --rows 200000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+
+from bench_utils import DATA_DIR, load_artifacts
+from scoring import score_frame
+from csv_pipeline import attach_predictions, pipelined_predict_csv
+
+SAMPLE_CSV = os.path.join(DATA_DIR, "prod_batch_01_no_drift.csv")
+
+
+def make_input(rows: int) -> bytes:
+    sample = pd.read_csv(SAMPLE_CSV)
+    big = sample.sample(n=rows, replace=True, random_state=42)
+    return big.to_csv(index=False).encode("utf-8")
+
+
+def run_batch(payload: bytes, model, preprocessor, feature_names) -> str:
+    df_input = pd.read_csv(io.BytesIO(payload))
+    predictions, probas = score_frame(df_input, model, preprocessor, feature_names)
+    output = io.StringIO()
+    attach_predictions(df_input, predictions, probas).to_csv(output, index=False)
+    return output.getvalue()
+
+
+def run_pipelined(payload: bytes, model, preprocessor, feature_names, chunk_size: int) -> str:
+    return "".join(pipelined_predict_csv(io.BytesIO(payload), model, preprocessor, feature_names,
+                                         chunk_size=chunk_size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model, preprocessor, feature_names = load_artifacts()
+    payload = make_input(args.rows)
+    print(f"📦 Entrée: {args.rows} lignes, {len(payload) / 1e6:.1f} MB")
+
+    results = {}
+    outputs = {}
+    for name, fn in [
+        ("batch", lambda: run_batch(payload, model, preprocessor, feature_names)),
+        ("pipelined", lambda: run_pipelined(payload, model, preprocessor, feature_names, args.chunk_size)),
+    ]:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            outputs[name] = fn()
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results[name] = best
+        print(f"   {name:<10} {best:7.2f}s  {args.rows / best:>10,.0f} lignes/s")
+
+    identical = outputs["batch"] == outputs["pipelined"]
+    print(f"\n⚡ Speedup pipeliné: x{results['batch'] / results['pipelined']:.2f}")
+    print(f"{'✅' if identical else '❌'} Sorties identiques: {identical}")
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark fan-out : un gros /predict-csv sur 1 réplique vs N répliques
+
+1. Lance --replicas processus uvicorn sur des ports différents
+   (le premier est le coordinateur, PEER_REPLICAS = les autres)
+2. Envoie le même CSV à une réplique seule puis au coordinateur
+3. Vérifie que les sorties sont identiques et affiche les temps
+
+--dead-peer ajoute une URL injoignable à PEER_REPLICAS : ses chunks sont
+retentés sur les autres répliques.
+
+Chaque réplique utilise un seul cœur (SCORING_WORKERS=1, MODEL_THREADS=1) :
+le gain attendu est proche du nombre de répliques si la machine a assez de cœurs.
+
+Usage:
+    python backend/benchmarks/bench_fanout.py --replicas 3 --rows 100000
+"""
+import argparse
+import io
+import os
+import secrets
+import subprocess
+import sys
+import time
+
+import pandas as pd
+import requests
+
+from bench_utils import BACKEND_SRC, DATA_DIR
+
+
+def start_replica(src: str, port: int, env: dict):
+    return subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=src, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_ready(port: int, timeout: float):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/ready", timeout=1).status_code == 200:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Réplique :{port} non prête après {timeout:.0f}s")
+
+
+def post_csv(port: int, payload: bytes):
+    start = time.perf_counter()
+    r = requests.post(
+        f"http://127.0.0.1:{port}/predict-csv",
+        files={"file": ("bench.csv", payload, "text/csv")},
+        headers={"X-Request-Timeout": "600"},
+        timeout=600,
+    )
+    r.raise_for_status()
+    return time.perf_counter() - start, r.content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--src", default=BACKEND_SRC, help="dossier de main.py (avec processors/)")
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--port", type=int, default=8810)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--dead-peer", action="store_true", help="ajoute une réplique injoignable")
+    args = parser.parse_args()
+
+    base = pd.read_csv(os.path.join(DATA_DIR, "churn2.csv"))
+    df = pd.concat([base] * (args.rows // len(base) + 1), ignore_index=True).iloc[:args.rows]
+    payload = df.to_csv(index=False).encode()
+    print(f"📦 CSV: {len(df)} lignes, {len(payload) / 1024 ** 2:.1f} MB")
+
+    ports = [args.port + i for i in range(args.replicas)]
+    peers = [f"http://127.0.0.1:{p}" for p in ports[1:]]
+    if args.dead_peer:
+        peers.append(f"http://127.0.0.1:{args.port + args.replicas}")
+
+    common = dict(
+        os.environ, SCORING_WORKERS="1", MODEL_THREADS="1",
+        BACKGROUND_LOADING="false", ADMISSION_ENABLED="false",
+        FANOUT_TOKEN=os.environ.get("FANOUT_TOKEN") or secrets.token_hex(16)
+    )
+    procs = [start_replica(args.src, ports[0], dict(
+        common, PEER_REPLICAS=",".join(peers), FANOUT_MIN_ROWS="1",
+        FANOUT_CHUNK_SIZE=str(args.chunk_size), FANOUT_PEER_COOLDOWN_S="600"
+    ))]
+    procs += [start_replica(args.src, p, common) for p in ports[1:]]
+
+    try:
+        for p in ports:
+            wait_ready(p, 120)
+
+        single_port = ports[1] if len(ports) > 1 else ports[0]
+        post_csv(single_port, payload[:200000])  # chauffe
+        single_time, single_out = post_csv(single_port, payload)
+        fanout_time, fanout_out = post_csv(ports[0], payload)
+
+        same = pd.read_csv(io.BytesIO(single_out)).equals(pd.read_csv(io.BytesIO(fanout_out)))
+        status = requests.get(f"http://127.0.0.1:{ports[0]}/health").json()["fanout"]
+
+        print(f"\n⏱️ 1 réplique:          {single_time:6.2f}s  ({len(df) / single_time:,.0f} lignes/s)")
+        print(f"⏱️ {args.replicas} répliques (fan-out): {fanout_time:6.2f}s  ({len(df) / fanout_time:,.0f} lignes/s)")
+        print(f"   Accélération: x{single_time / fanout_time:.2f}")
+        print(f"   Sorties identiques: {'✅' if same else '❌'}")
+        for peer in status["peers"]:
+            print(f"   {peer['url']}: {peer['chunks_scored']} chunks, {peer['failures']} échec(s)")
+        sys.exit(0 if same else 1)
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
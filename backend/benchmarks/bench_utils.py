@@ -0,0 +1,37 @@
+"""
+Helpers communs aux benchmarks du backend (chemins + chargement des artefacts)
+"""
+import os
+import pickle
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_SRC = os.path.abspath(os.path.join(BENCH_DIR, "..", "src"))
+PROJECT_ROOT = os.path.abspath(os.path.join(BENCH_DIR, "..", ".."))
+DATA_DIR = os.path.join(PROJECT_ROOT, "monitoring", "data")
+
+if BACKEND_SRC not in sys.path:
+    sys.path.append(BACKEND_SRC)
+
+
+def find_processors_dir():
+    """backend/src/processors si Jenkins y a copié les artefacts, sinon notebooks/processors"""
+    for candidate in [os.path.join(BACKEND_SRC, "processors"),
+                      os.path.join(PROJECT_ROOT, "notebooks", "processors")]:
+        if os.path.exists(os.path.join(candidate, "preprocessor.pkl")):
+            return candidate
+    raise FileNotFoundError("preprocessor.pkl introuvable (lancer Jenkins/register_best_model.py)")
+
+
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def load_artifacts():
+    """Retourne (model, preprocessor, feature_names)"""
+    processors_dir = find_processors_dir()
+    model = load_pickle(os.path.join(processors_dir, "models", "best_model_final.pkl"))
+    preprocessor = load_pickle(os.path.join(processors_dir, "preprocessor.pkl"))
+    feature_names = load_pickle(os.path.join(processors_dir, "feature_names.pkl"))
+    return model, preprocessor, feature_names
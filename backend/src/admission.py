@@ -0,0 +1,200 @@
+# api/admission.py
+"""
+Admission control : rate limiting par client (en lignes/s) et plafond global
+
+- Chaque client (adresse IP ; header X-Client-Id seulement pour un appelant
+  de confiance, cf. client_id_from) a un token bucket exprimé en lignes :
+  ADMISSION_RATE_ROWS lignes/s, rafale max ADMISSION_BURST_ROWS.
+- Au plus ADMISSION_MAX_ROWS_IN_FLIGHT lignes en cours de scoring dans le
+  worker. Une part (ADMISSION_INTERACTIVE_RESERVE) est réservée au trafic
+  interactif (/predict) : les jobs bulk (/predict-batch, /predict-csv) ne
+  peuvent pas la consommer.
+- Une requête refusée reçoit un 429 avec Retry-After.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_RATE_ROWS = float(os.getenv("ADMISSION_RATE_ROWS", "50000"))
+ADMISSION_BURST_ROWS = float(os.getenv("ADMISSION_BURST_ROWS", "200000"))
+ADMISSION_MAX_ROWS_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_ROWS_IN_FLIGHT", "500000"))
+ADMISSION_INTERACTIVE_RESERVE = float(os.getenv("ADMISSION_INTERACTIVE_RESERVE", "0.1"))
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+
+# Appelants dont le header X-Client-Id est retenu (passerelle, frontend...) ;
+# pour les autres, un nouvel X-Client-Id par requête contournerait la limite
+ADMISSION_TRUSTED_CLIENTS = {
+    a.strip() for a in os.getenv("ADMISSION_TRUSTED_CLIENTS", "127.0.0.1,::1").split(",") if a.strip()
+}
+
+# Classes de priorité
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def headers(self) -> dict:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class TokenBucket:
+    """Bucket en lignes ; une requête plus grosse que la rafale passe si le bucket est plein (dette)"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_consume(self, rows: int):
+        """Retourne (accepté, secondes avant de pouvoir réessayer)"""
+        self._refill(time.monotonic())
+        needed = min(rows, self.capacity)
+        if self.tokens >= needed:
+            self.tokens -= rows
+            return True, 0.0
+        return False, (needed - self.tokens) / self.rate
+
+
+class Ticket:
+    """Lignes admises ; release() idempotent (fin du scoring ou du streaming)"""
+
+    def __init__(self, controller, rows: int, priority: str):
+        self.controller = controller
+        self.rows = rows
+        self.priority = priority
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class AdmissionController:
+
+    def __init__(self, enabled: bool = None, rate: float = None, burst: float = None,
+                 max_rows_in_flight: int = None, interactive_reserve: float = None):
+        self.enabled = ADMISSION_ENABLED if enabled is None else enabled
+        self.rate = rate or ADMISSION_RATE_ROWS
+        self.burst = burst or ADMISSION_BURST_ROWS
+        self.max_rows = max_rows_in_flight or ADMISSION_MAX_ROWS_IN_FLIGHT
+        reserve = ADMISSION_INTERACTIVE_RESERVE if interactive_reserve is None else interactive_reserve
+        self.bulk_max_rows = int(self.max_rows * (1 - reserve))
+
+        self._buckets = OrderedDict()  # client -> TokenBucket (LRU borné)
+        self._lock = threading.Lock()
+        self.in_flight = {INTERACTIVE: 0, BULK: 0}
+        self.admitted = {INTERACTIVE: 0, BULK: 0}
+        self.rejected = {"rate_limited": 0, "overloaded": 0}
+
+    def _bucket(self, client_id: str) -> TokenBucket:
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self._buckets[client_id] = bucket
+            if len(self._buckets) > ADMISSION_MAX_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_id)
+        return bucket
+
+    def _has_capacity(self, rows: int, priority: str) -> bool:
+        if priority == INTERACTIVE:
+            # La réserve interactive reste disponible quel que soit le bulk en cours
+            total = self.in_flight[INTERACTIVE] + self.in_flight[BULK]
+            reserve = self.max_rows - self.bulk_max_rows
+            return self.in_flight[INTERACTIVE] + rows <= reserve or total + rows <= self.max_rows
+        # Un job bulk plus gros que sa part passe seul (sinon jamais admis)
+        return self.in_flight[BULK] == 0 or self.in_flight[BULK] + rows <= self.bulk_max_rows
+
+    def admit(self, client_id: str, rows: int, priority: str = BULK, charge_client: bool = True) -> Ticket:
+        """
+        Réserve `rows` lignes pour le client ; lève AdmissionRejected sinon
+        charge_client=False : plafond de lignes en cours seulement (travail déjà
+        décompté ailleurs, ex. chunks d'un job admis par le coordinateur du fan-out)
+        """
+        rows = max(int(rows), 1)
+        if not self.enabled:
+            return Ticket(self, 0, priority)
+
+        with self._lock:
+            if not self._has_capacity(rows, priority):
+                self.rejected["overloaded"] += 1
+                # Estimation : le temps d'écouler les lignes en cours au débit nominal
+                retry_after = (self.in_flight[INTERACTIVE] + self.in_flight[BULK]) / self.rate
+                raise AdmissionRejected("Capacité de scoring saturée", retry_after)
+
+            ok, retry_after = self._bucket(client_id).try_consume(rows) if charge_client else (True, 0.0)
+            if not ok:
+                self.rejected["rate_limited"] += 1
+                raise AdmissionRejected(
+                    f"Limite de débit atteinte ({self.rate:.0f} lignes/s par client)", retry_after
+                )
+
+            self.in_flight[priority] += rows
+            self.admitted[priority] += 1
+
+        return Ticket(self, rows, priority)
+
+    def _release(self, ticket: Ticket):
+        with self._lock:
+            self.in_flight[ticket.priority] -= ticket.rows
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "rate_rows_per_sec": self.rate,
+                "burst_rows": self.burst,
+                "max_rows_in_flight": self.max_rows,
+                "bulk_max_rows_in_flight": self.bulk_max_rows,
+                "rows_in_flight": dict(self.in_flight),
+                "admitted": dict(self.admitted),
+                "rejected": dict(self.rejected),
+                "clients": len(self._buckets),
+            }
+
+
+def client_id_from(request, trusted: bool = False) -> str:
+    """
+    Identité du client (requête HTTP ou WebSocket) : adresse IP de l'appelant
+    X-Client-Id n'est retenu que si l'appelant est de confiance : authentifié
+    (trusted, ex. chunk de fan-out avec token valide) ou dans ADMISSION_TRUSTED_CLIENTS
+    """
+    host = request.client.host if request.client else "unknown"
+    client_id = request.headers.get("x-client-id")
+    if client_id and (trusted or host in ADMISSION_TRUSTED_CLIENTS):
+        return client_id[:128]
+    return host
+
+
+def release_after(iterator, ticket: Ticket):
+    """Libère le ticket à la fin du streaming de la réponse (ou à l'abandon du client)"""
+    try:
+        yield from iterator
+    finally:
+        ticket.release()
@@ -0,0 +1,67 @@
+# api/cascade.py
+"""
+Cascade de modèles à deux étages
+
+Un modèle très léger (régression logistique entraînée par
+Jenkins/train_model.py) score toutes les lignes. Seules les lignes dont la
+probabilité de churn tombe dans la bande d'incertitude [CASCADE_LOW,
+CASCADE_HIGH] sont envoyées au modèle complet (LightGBM tuné).
+"""
+import os
+
+import numpy as np
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() in ("1", "true", "yes")
+CASCADE_LOW = float(os.getenv("CASCADE_LOW", "0.05"))
+CASCADE_HIGH = float(os.getenv("CASCADE_HIGH", "0.95"))
+
+# Compteurs du processus courant (les workers du pool renvoient leurs deltas)
+CASCADE_STATS = {"rows": 0, "escalated": 0}
+
+
+def record_cascade_stats(delta: dict):
+    for key, value in delta.items():
+        CASCADE_STATS[key] = CASCADE_STATS.get(key, 0) + value
+
+
+def cascade_status(enabled: bool) -> dict:
+    rows = CASCADE_STATS["rows"]
+    return {
+        "enabled": enabled,
+        "band": [CASCADE_LOW, CASCADE_HIGH],
+        "rows_scored": rows,
+        "rows_escalated": CASCADE_STATS["escalated"],
+        "escalation_rate": (CASCADE_STATS["escalated"] / rows) if rows else None,
+    }
+
+
+# ============================================================================
+# PREDICTION
+# ============================================================================
+
+def cascade_predict(X, model, cascade_model, low: float = None, high: float = None):
+    """
+    Prédiction en cascade sur des features déjà transformées
+
+    Retourne (predictions, probas) au même format que model.predict / predict_proba
+    """
+    low = CASCADE_LOW if low is None else low
+    high = CASCADE_HIGH if high is None else high
+
+    probas = np.asarray(cascade_model.predict_proba(X), dtype=float)
+    uncertain = (probas[:, 1] >= low) & (probas[:, 1] <= high)
+
+    n_escalated = int(uncertain.sum())
+    if n_escalated:
+        probas[uncertain] = model.predict_proba(X[uncertain])
+
+    classes = getattr(model, "classes_", np.array([0, 1]))
+    predictions = np.asarray(classes).take(np.argmax(probas, axis=1))
+
+    record_cascade_stats({"rows": len(probas), "escalated": n_escalated})
+    return predictions, probas
@@ -0,0 +1,299 @@
+# api/compression.py
+"""
+Compression des corps de requête et de réponse (gzip / zstd)
+
+- RequestDecompressionMiddleware : décompresse à la volée les requêtes
+  envoyées avec "Content-Encoding: gzip|zstd" (CSV de /predict-csv, JSON de
+  /predict-batch), message ASGI par message ASGI.
+- CompressionMiddleware : compresse les réponses selon "Accept-Encoding",
+  chunk par chunk, y compris les StreamingResponse.
+
+Le corps complet n'est jamais tenu en mémoire par ces middlewares.
+"""
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+
+try:
+    import zstandard
+except ImportError:  # zstd optionnel : gzip reste disponible
+    zstandard = None
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Taille minimale (octets) d'une réponse non streamée pour la compresser
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+# Garde-fou contre les "zip bombs"
+MAX_DECOMPRESSED_BYTES = int(os.getenv("MAX_DECOMPRESSED_BYTES", str(1024 ** 3)))
+
+# zstd sans limite de sortie en streaming : entrée découpée en tranches de
+# cette taille (un bloc RLE de 4 octets donne au plus 128 KB, soit ~4 MB par tranche)
+ZSTD_INPUT_STEP = 128
+
+
+def supported_encodings():
+    """Encodages supportés, par ordre de préférence"""
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+class DecompressionError(Exception):
+    """Corps invalide (400) ou trop gros une fois décompressé (413)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# ============================================================================
+# CODECS
+# ============================================================================
+
+class _GzipDecoder:
+    def __init__(self):
+        self._d = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        # Au plus max_length octets : le reste de l'entrée n'est pas décompressé
+        return self._d.decompress(data, max_length)
+
+    def flush(self) -> bytes:
+        return self._d.flush()
+
+
+class _ZstdDecoder:
+    def __init__(self):
+        self._d = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        # Par tranches d'entrée : arrêt dès que la sortie dépasse max_length
+        out = bytearray()
+        for start in range(0, len(data), ZSTD_INPUT_STEP):
+            out += self._d.decompress(data[start:start + ZSTD_INPUT_STEP])
+            if len(out) >= max_length:
+                break
+        return bytes(out)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _GzipEncoder:
+    def __init__(self):
+        self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        # Z_SYNC_FLUSH : chaque chunk est décodable côté client dès réception
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+class _ZstdEncoder:
+    def __init__(self):
+        self._c = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+_DECODERS = {"gzip": _GzipDecoder, "x-gzip": _GzipDecoder, "zstd": _ZstdDecoder}
+_ENCODERS = {"gzip": _GzipEncoder, "zstd": _ZstdEncoder}
+
+
+def negotiate_encoding(accept_encoding: str):
+    """Choisit l'encodage de réponse d'après Accept-Encoding (None = identity)"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        if not part.strip():
+            continue
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+# ============================================================================
+# MIDDLEWARES
+# ============================================================================
+
+class RequestDecompressionMiddleware:
+    """Décompression en streaming des corps de requête gzip / zstd"""
+
+    def __init__(self, app, max_size: int = None):
+        self.app = app
+        self.max_size = max_size or MAX_DECOMPRESSED_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = Headers(scope=scope).get("content-encoding", "").strip().lower()
+        if encoding in ("", "identity"):
+            await self.app(scope, receive, send)
+            return
+
+        if encoding not in _DECODERS or (encoding == "zstd" and zstandard is None):
+            response = PlainTextResponse(f"Content-Encoding non supporté: {encoding}", status_code=415)
+            await response(scope, receive, send)
+            return
+
+        decoder = _DECODERS[encoding]()
+        total = 0
+        failure = None
+        started = False
+        replied = False
+
+        # Le corps décompressé n'a plus la même taille ni le même encodage
+        scope = dict(scope)
+        scope["headers"] = [
+            (k, v) for k, v in scope["headers"]
+            if k not in (b"content-encoding", b"content-length")
+        ]
+
+        async def receive_decompressed():
+            nonlocal total, failure
+            if failure is not None:
+                raise failure
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+
+            more_body = message.get("more_body", False)
+            # Une sortie de plus que le reste du budget suffit à détecter le dépassement
+            limit = self.max_size - total + 1
+            try:
+                body = decoder.decompress(message.get("body", b""), limit)
+                if not more_body and len(body) < limit:
+                    body += decoder.flush()
+            except Exception as e:
+                failure = DecompressionError(f"Corps {encoding} invalide: {e}", 400)
+                raise failure
+
+            total += len(body)
+            if total > self.max_size:
+                failure = DecompressionError(f"Corps décompressé > {self.max_size} octets", 413)
+                raise failure
+
+            return {"type": "http.request", "body": body, "more_body": more_body}
+
+        async def send_checked(message):
+            # Erreur de décompression : la réponse de l'app (souvent un 400 générique
+            # de FastAPI sur le parsing du corps) est remplacée par la nôtre
+            nonlocal started
+            if failure is not None and not started:
+                started = True
+                await reject(failure)
+            if replied:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        async def reject(error):
+            nonlocal replied
+            replied = True
+            response = PlainTextResponse(str(error), status_code=error.status_code)
+            await response(scope, receive, send)
+
+        try:
+            await self.app(scope, receive_decompressed, send_checked)
+        except DecompressionError as e:
+            if not started:
+                started = True
+                await reject(e)
+            elif not replied:
+                raise
+
+
+class CompressionMiddleware:
+    """Compression en streaming des réponses selon Accept-Encoding"""
+
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = Headers(raw=message["headers"])
+                passthrough = "content-encoding" in headers
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if passthrough:
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                await send(message)
+                return
+
+            if start_message is not None:
+                # Petite réponse complète : pas de compression
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                encoder = _ENCODERS[encoding]()
+                await send(start_message)
+                start_message = None
+
+            data = encoder.compress(body) if body else b""
+            if not more_body:
+                data += encoder.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
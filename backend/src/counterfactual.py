@@ -0,0 +1,144 @@
+# api/counterfactual.py
+"""
+Recherche d'actions de rétention (contrefactuels)
+
+Pour un client, grille de perturbations sur les champs actionnables
+(transactions, inactivité, contacts, produits détenus, limite de crédit),
+scorée en un seul batch vectorisé. Retourne les plus petits changements qui
+font passer la probabilité de churn sous le seuil visé.
+
+Coût d'un candidat = somme des changements exprimés en "pas" de chaque champ
+(ex. 10 transactions = 1 pas) ; à coût égal, moins de champs modifiés d'abord.
+Les champs dérivés (avg_open_to_buy, avg_utilization_ratio) sont recalculés
+pour rester cohérents avec la limite de crédit.
+"""
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+from scoring import apply_preprocessor, preprocess_raw_churn
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+COUNTERFACTUAL_MAX_CANDIDATES = int(os.getenv("COUNTERFACTUAL_MAX_CANDIDATES", "20000"))
+
+# Champ -> (type de changement, niveaux, valeur d'un pas, bornes (min, max))
+#   "add" : valeur + niveau ; "mul" : valeur * niveau (le pas est alors relatif)
+ACTIONABLE_FIELDS = {
+    "total_trans_ct": ("add", [5, 10, 15, 20, 30, 40, 60], 10, (0, None)),
+    "total_trans_amt": ("mul", [1.1, 1.25, 1.5, 2.0, 3.0], 0.25, (0, None)),
+    "months_inactive_12_mon": ("add", [-1, -2, -3, -4], 1, (0, 12)),
+    "contacts_count_12_mon": ("add", [-1, -2, -3, -4], 1, (0, None)),
+    "total_relationship_count": ("add", [1, 2, 3], 1, (1, 6)),
+    "credit_limit": ("mul", [1.2, 1.5], 0.25, (0, None)),
+}
+
+
+def field_options(value, kind: str, levels, step: float, bounds) -> tuple:
+    """
+    Valeurs atteignables d'un champ (valeur actuelle en premier, sans doublons
+    après bornage et arrondi) et coût de chacune en pas
+    """
+    low, high = bounds
+    values, costs = [value], [0.0]
+    for level in levels:
+        new = value + level if kind == "add" else value * level
+        new = max(new, low) if low is not None else new
+        new = min(new, high) if high is not None else new
+        if isinstance(value, int):
+            new = int(round(new))
+        if new in values:
+            continue
+        values.append(new)
+        costs.append(abs(new - value) / step if kind == "add" else abs(level - 1.0) / step)
+    return values, costs
+
+
+class CounterfactualGrid:
+    """Candidats (DataFrame) et changements appliqués à chaque champ, pour un client"""
+
+    def __init__(self, customer: dict, fields: dict = None, max_changes: int = 3):
+        fields = ACTIONABLE_FIELDS if fields is None else fields
+        self.customer = customer
+        self.fields = [f for f in fields if f in customer]
+        options = [field_options(customer[f], *fields[f]) for f in self.fields]
+
+        # Produit cartésien des indices de valeurs (indice 0 = inchangé),
+        # limité à max_changes champs modifiés ; la ligne 0 est le client tel quel
+        combos = np.array(list(itertools.product(*[range(len(v)) for v, _ in options])), dtype=np.int64)
+        combos = combos[(combos != 0).sum(axis=1) <= max_changes][:COUNTERFACTUAL_MAX_CANDIDATES]
+
+        n = len(combos)
+        frame = pd.DataFrame({k: np.repeat(v, n) for k, v in customer.items()})
+        self.values = {}
+        self.cost = np.zeros(n)
+        for j, (field, (values, costs)) in enumerate(zip(self.fields, options)):
+            self.values[field] = np.asarray(values)[combos[:, j]]
+            self.cost += np.asarray(costs)[combos[:, j]]
+            frame[field] = self.values[field]
+        self.changed = combos != 0
+
+        # Cohérence des champs dérivés de la limite de crédit
+        if "credit_limit" in self.fields and {"total_revolving_bal", "avg_open_to_buy"} <= set(frame.columns):
+            limit = frame["credit_limit"].to_numpy(dtype=float)
+            revolving = frame["total_revolving_bal"].to_numpy(dtype=float)
+            frame["avg_open_to_buy"] = np.maximum(limit - revolving, 0.0)
+            if "avg_utilization_ratio" in frame.columns:
+                frame["avg_utilization_ratio"] = np.where(limit > 0, revolving / np.maximum(limit, 1e-9), 0.0)
+
+        self.frame = frame
+
+    def __len__(self):
+        return len(self.frame)
+
+    def changes_of(self, i: int) -> dict:
+        return {
+            f: {"from": self.customer[f], "to": self.values[f][i].item()}
+            for j, f in enumerate(self.fields) if self.changed[i, j]
+        }
+
+
+def search_counterfactuals(grid: CounterfactualGrid, model, preprocessor, feature_names,
+                           target_probability: float = 0.5, top_k: int = 5, deadline=None) -> dict:
+    """
+    Score la grille de candidats en un batch et retourne les top_k changements
+    les moins coûteux qui ramènent la probabilité de churn sous target_probability
+    """
+    if deadline is not None:
+        deadline.check()
+
+    # Une seule passe sur les arbres : predict_proba seul (pas de predict en plus)
+    X = apply_preprocessor(preprocess_raw_churn(grid.frame), preprocessor, feature_names)
+    if hasattr(model, "predict_proba"):
+        churn_proba = model.predict_proba(X)[:, 1]
+    else:
+        churn_proba = np.asarray(model.predict(X), dtype=float)
+
+    # Ligne 0 = client inchangé (tous les niveaux à l'indice 0)
+    baseline = float(churn_proba[0])
+    n_changed = grid.changed.sum(axis=1)
+    flipped = np.flatnonzero((churn_proba < target_probability) & (n_changed > 0))
+    order = flipped[np.lexsort((churn_proba[flipped], n_changed[flipped], grid.cost[flipped]))]
+
+    actions = [
+        {
+            "changes": grid.changes_of(i),
+            "churn_probability": round(float(churn_proba[i]), 4),
+            "cost": round(float(grid.cost[i]), 3),
+        }
+        for i in order[:top_k]
+    ]
+
+    return {
+        "baseline_churn_probability": round(baseline, 4),
+        "target_probability": target_probability,
+        "already_below_target": baseline < target_probability,
+        "candidates_scored": len(grid),
+        "candidates_flipped": int(len(flipped)),
+        "actions": actions,
+    }
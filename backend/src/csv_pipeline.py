@@ -0,0 +1,354 @@
+# api/csv_pipeline.py
+"""
+Mode pipeliné pour /predict-csv
+
+Quatre étages reliés par des queues bornées, chacun dans son thread :
+
+    parse (read_csv par chunks) -> transform -> infer -> serialize (to_csv)
+
+Pendant que le chunk N est inféré, le chunk N+1 est parsé et le chunk N-1
+sérialisé. Les queues bornées (backpressure) limitent la mémoire à quelques
+chunks en vol, quelle que soit la taille du fichier.
+
+La sortie est identique au mode batch tant que les types des colonnes sont
+stables d'un chunk à l'autre (même limite que read_csv en low_memory).
+
+Mode résumé (summarize_csv) : même lecture par chunks, mais seuls des
+agrégats sont conservés (comptes, taux de churn, histogramme des
+probabilités, ventilation par catégorie) ; aucun CSV de sortie n'est construit.
+"""
+import os
+import queue
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from scoring import preprocess_raw_churn, apply_preprocessor, predict_transformed, empty_predictions
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# "batch" (historique) ou "pipelined"
+CSV_SCORING_MODE = os.getenv("CSV_SCORING_MODE", "batch")
+
+# Lignes par chunk dans le mode pipeliné
+CSV_PIPELINE_CHUNK_SIZE = int(os.getenv("CSV_PIPELINE_CHUNK_SIZE", "5000"))
+
+# Taille max de chaque queue entre deux étages
+CSV_PIPELINE_QUEUE_SIZE = int(os.getenv("CSV_PIPELINE_QUEUE_SIZE", "2"))
+
+# Mode résumé : nombre de classes de l'histogramme et colonnes ventilées
+CSV_SUMMARY_BINS = int(os.getenv("CSV_SUMMARY_BINS", "10"))
+CSV_SUMMARY_GROUP_COLUMNS = [
+    c.strip().lower()
+    for c in os.getenv("CSV_SUMMARY_GROUP_COLUMNS", "card_category,income_category").split(",")
+    if c.strip()
+]
+
+_END = object()
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def attach_predictions(df_input: pd.DataFrame, predictions, probas, ood=None) -> pd.DataFrame:
+    """
+    Ajoute les colonnes de prédiction au DataFrame d'entrée (format /predict-csv)
+    ood : ood.OODResult optionnel -> colonnes ood_score / ood_flag
+    """
+    df_result = df_input.copy()
+    df_result['churn_prediction'] = predictions
+    if probas is not None:
+        df_result['proba_non_churn'] = probas[:, 0]
+        df_result['proba_churn'] = probas[:, 1]
+    if ood is not None:
+        df_result['ood_score'] = ood.scores.round(4)
+        df_result['ood_flag'] = ood.flags.astype(int)
+    return df_result
+
+
+def iter_csv_chunks(df_result: pd.DataFrame, chunk_size: int = None):
+    """Sérialise un DataFrame en CSV par tranches de lignes (pas de chaîne unique géante)"""
+    chunk_size = chunk_size or CSV_PIPELINE_CHUNK_SIZE
+    if len(df_result) == 0:
+        yield df_result.to_csv(index=False)
+        return
+    for start in range(0, len(df_result), chunk_size):
+        yield df_result.iloc[start:start + chunk_size].to_csv(index=False, header=(start == 0))
+
+
+class _StageError:
+    """Exception levée par un étage, transmise jusqu'au consommateur"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def detach_upload(fileobj):
+    """
+    Copie un upload dans un fichier temporaire propre au pipeline
+
+    FastAPI ferme l'UploadFile dès que l'endpoint retourne, avant la fin du
+    streaming de la réponse. La copie se fait par blocs (mémoire bornée).
+    """
+    fileobj.seek(0)
+    tmp = tempfile.TemporaryFile()
+    shutil.copyfileobj(fileobj, tmp, length=1024 * 1024)
+    tmp.seek(0)
+    return tmp
+
+
+def count_csv_rows(fileobj) -> int:
+    """
+    Nombre de lignes de données d'un CSV (sans le parser), puis rembobine
+    Approximation si des champs entre guillemets contiennent des retours à la ligne
+    """
+    fileobj.seek(0)
+    newlines = 0
+    last = b"\n"
+    for block in iter(lambda: fileobj.read(1024 * 1024), b""):
+        newlines += block.count(b"\n")
+        last = block[-1:]
+    fileobj.seek(0)
+    # Dernière ligne sans retour final, moins l'en-tête
+    return max(newlines + (last != b"\n") - 1, 0)
+
+
+def _put(q: queue.Queue, item, stop: threading.Event):
+    """put bloquant (backpressure) mais interruptible par stop"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+
+def _run_stage(fn, q_in, q_out, stop):
+    """Boucle d'un étage : lit q_in, applique fn, écrit q_out"""
+    try:
+        while True:
+            item = _get(q_in, stop)
+            if item is _END or isinstance(item, _StageError):
+                _put(q_out, item, stop)
+                return
+            if not _put(q_out, fn(item), stop):
+                return
+    except BaseException as e:
+        _put(q_out, _StageError(e), stop)
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+def pipelined_predict_csv(source, model, preprocessor, feature_names,
+                          chunk_size: int = None, queue_size: int = None,
+                          on_chunk=None, close_source: bool = False, cascade_model=None,
+                          deadline=None, ood_scorer=None, on_scored=None):
+    """
+    Générateur des morceaux CSV (str) de la sortie, en mode pipeliné
+
+    source : chemin ou objet fichier lisible par pd.read_csv
+    on_chunk : callback optionnel appelé avec le nombre de lignes de chaque chunk parsé
+    close_source : fermer source à la fin du générateur (fichier issu de detach_upload)
+    cascade_model : modèle léger de la cascade (None = modèle complet seul)
+    deadline : deadlines.Deadline vérifiée à chaque chunk avant parsing et inférence
+    ood_scorer : ood.OODScorer optionnel (colonnes ood_score / ood_flag)
+    on_scored : callback optionnel on_scored(chunk, predictions, probas) après l'inférence
+    """
+    chunk_size = chunk_size or CSV_PIPELINE_CHUNK_SIZE
+    queue_size = queue_size or CSV_PIPELINE_QUEUE_SIZE
+
+    stop = threading.Event()
+    q_parsed = queue.Queue(maxsize=queue_size)
+    q_transformed = queue.Queue(maxsize=queue_size)
+    q_scored = queue.Queue(maxsize=queue_size)
+    q_out = queue.Queue(maxsize=queue_size)
+
+    def parse():
+        try:
+            for chunk in pd.read_csv(source, chunksize=chunk_size):
+                if deadline is not None:
+                    deadline.check("parse")
+                if on_chunk is not None:
+                    on_chunk(len(chunk))
+                if not _put(q_parsed, chunk, stop):
+                    return
+            _put(q_parsed, _END, stop)
+        except BaseException as e:
+            _put(q_parsed, _StageError(e), stop)
+
+    def transform(chunk):
+        # CSV sans ligne de données : un chunk vide, servi comme en mode batch (en-tête seul)
+        if len(chunk) == 0:
+            return chunk, None
+        X = apply_preprocessor(preprocess_raw_churn(chunk), preprocessor, feature_names)
+        return chunk, X
+
+    def infer(item):
+        chunk, X = item
+        if deadline is not None:
+            deadline.check()
+        if X is None:
+            predictions, probas = empty_predictions(model)
+        else:
+            predictions, probas = predict_transformed(X, model, cascade_model)
+        if on_scored is not None:
+            on_scored(chunk, predictions, probas)
+        ood = ood_scorer.score(chunk, endpoint="/predict-csv") if ood_scorer is not None else None
+        return attach_predictions(chunk, predictions, probas, ood)
+
+    first = [True]
+
+    def serialize(df_result):
+        text = df_result.to_csv(index=False, header=first[0])
+        first[0] = False
+        return text
+
+    threads = [
+        threading.Thread(target=parse, name="csv-parse", daemon=True),
+        threading.Thread(target=_run_stage, args=(transform, q_parsed, q_transformed, stop),
+                         name="csv-transform", daemon=True),
+        threading.Thread(target=_run_stage, args=(infer, q_transformed, q_scored, stop),
+                         name="csv-infer", daemon=True),
+        threading.Thread(target=_run_stage, args=(serialize, q_scored, q_out, stop),
+                         name="csv-serialize", daemon=True),
+    ]
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            item = _get(q_out, stop)
+            if item is _END:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        # Fin normale, erreur ou client déconnecté (generator.close())
+        stop.set()
+        for t in threads:
+            t.join(timeout=1)
+        if close_source:
+            source.close()
+
+
+# ============================================================================
+# MODE RÉSUMÉ
+# ============================================================================
+
+class ScoringSummary:
+    """Agrégats de scoring mis à jour chunk par chunk (mémoire indépendante du nombre de lignes)"""
+
+    def __init__(self, bins: int = None, group_columns=None):
+        self.bins = bins or CSV_SUMMARY_BINS
+        self.group_columns = CSV_SUMMARY_GROUP_COLUMNS if group_columns is None else group_columns
+        self.edges = np.linspace(0.0, 1.0, self.bins + 1)
+        self.rows = 0
+        self.churn = 0
+        self.proba_sum = 0.0
+        self.histogram = np.zeros(self.bins, dtype=np.int64)
+        self.ood_flagged = None
+        # colonne -> modalité -> [lignes, churn, somme des probas]
+        self.groups = {c: {} for c in self.group_columns}
+
+    def update(self, chunk: pd.DataFrame, predictions, probas, ood=None):
+        predictions = np.asarray(predictions).astype(int)
+        churn_proba = probas[:, 1] if probas is not None else predictions.astype(float)
+
+        self.rows += len(predictions)
+        self.churn += int(predictions.sum())
+        self.proba_sum += float(churn_proba.sum())
+        if probas is not None:
+            self.histogram += np.histogram(np.clip(churn_proba, 0.0, 1.0), bins=self.edges)[0]
+        if ood is not None:
+            self.ood_flagged = (self.ood_flagged or 0) + ood.flagged
+
+        columns = {c.lower(): c for c in chunk.columns}
+        for col in self.group_columns:
+            if col not in columns:
+                continue
+            stats = pd.DataFrame({
+                "key": chunk[columns[col]].astype(str).to_numpy(),
+                "churn": predictions,
+                "proba": churn_proba,
+            }).groupby("key").agg(rows=("churn", "size"), churn=("churn", "sum"), proba=("proba", "sum"))
+            acc = self.groups[col]
+            for key, rows, churn, proba in stats.itertuples():
+                entry = acc.setdefault(key, [0, 0, 0.0])
+                entry[0] += int(rows)
+                entry[1] += int(churn)
+                entry[2] += float(proba)
+
+    def as_dict(self) -> dict:
+        rows = self.rows
+        result = {
+            "total_rows": rows,
+            "predicted_churn": self.churn,
+            "predicted_non_churn": rows - self.churn,
+            "churn_rate": round(self.churn / rows, 4) if rows else None,
+            "mean_churn_probability": round(self.proba_sum / rows, 4) if rows else None,
+            "probability_histogram": {
+                "bin_edges": [round(float(e), 4) for e in self.edges],
+                "counts": self.histogram.tolist(),
+            },
+            "breakdowns": {
+                col: {
+                    key: {
+                        "rows": n,
+                        "predicted_churn": churn,
+                        "churn_rate": round(churn / n, 4),
+                        "mean_churn_probability": round(proba / n, 4),
+                    }
+                    for key, (n, churn, proba) in sorted(acc.items(), key=lambda kv: -kv[1][0])
+                }
+                for col, acc in self.groups.items() if acc
+            },
+        }
+        if self.ood_flagged is not None:
+            result["ood_flagged"] = self.ood_flagged
+        return result
+
+
+def summarize_csv(source, model, preprocessor, feature_names, chunk_size: int = None,
+                  cascade_model=None, deadline=None, ood_scorer=None, on_scored=None) -> dict:
+    """
+    Score un CSV par chunks et ne retourne que les agrégats (ScoringSummary.as_dict)
+
+    source : chemin ou objet fichier lisible par pd.read_csv
+    deadline : deadlines.Deadline vérifiée à chaque chunk
+    on_scored : callback optionnel on_scored(chunk, predictions, probas) après l'inférence
+    """
+    summary = ScoringSummary()
+    for chunk in pd.read_csv(source, chunksize=chunk_size or CSV_PIPELINE_CHUNK_SIZE):
+        if deadline is not None:
+            deadline.check("parse")
+        if len(chunk) == 0:
+            continue
+        X = apply_preprocessor(preprocess_raw_churn(chunk), preprocessor, feature_names)
+        if deadline is not None:
+            deadline.check()
+        predictions, probas = predict_transformed(X, model, cascade_model)
+        if on_scored is not None:
+            on_scored(chunk, predictions, probas)
+        ood = ood_scorer.score(chunk, endpoint="/predict-csv") if ood_scorer is not None else None
+        summary.update(chunk, predictions, probas, ood)
+    return summary.as_dict()
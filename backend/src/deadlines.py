@@ -0,0 +1,136 @@
+# api/deadlines.py
+"""
+Deadlines par requête et annulation du travail abandonné
+
+Le client fixe son budget avec le header X-Request-Timeout (secondes), sinon
+une valeur par défaut par endpoint s'applique (alignée sur les timeouts du
+frontend Streamlit). Le travail encore en file dont la deadline est passée
+est abandonné avant l'inférence ; les jobs découpés en chunks s'arrêtent au
+chunk suivant si le client s'est déconnecté.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from metrics import METRICS
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEADLINE_DEFAULTS = {
+    "/predict": float(os.getenv("DEADLINE_PREDICT_S", "10")),
+    "/predict-batch": float(os.getenv("DEADLINE_BATCH_S", "60")),
+    "/predict-csv": float(os.getenv("DEADLINE_CSV_S", "300")),
+    "/ws/predict": float(os.getenv("DEADLINE_WS_S", "10")),
+    "/counterfactual": float(os.getenv("DEADLINE_COUNTERFACTUAL_S", "10")),
+}
+DEADLINE_MAX_S = float(os.getenv("DEADLINE_MAX_S", "3600"))
+
+# Intervalle de détection d'une déconnexion client
+DISCONNECT_POLL_S = float(os.getenv("DISCONNECT_POLL_S", "0.5"))
+
+METRICS.describe("churn_deadline_expired_total", "Travail abandonné car la deadline de la requête est dépassée")
+METRICS.describe("churn_cancelled_total", "Travail abandonné car le client s'est déconnecté")
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class WorkCancelled(Exception):
+    pass
+
+
+class Deadline:
+    """
+    Budget d'une requête ; check() est appelé aux frontières de chunks
+    (thread-safe, le compteur n'est incrémenté qu'une fois par requête)
+    """
+
+    def __init__(self, seconds: float, endpoint: str, started_at: float = None):
+        self.seconds = seconds
+        self.endpoint = endpoint
+        self.expires_at = (started_at or time.monotonic()) + seconds
+        self.cancelled = threading.Event()
+        self._counted = False
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def should_stop(self) -> bool:
+        return self.cancelled.is_set() or self.expired()
+
+    def _count(self, metric: str, stage: str):
+        with self._lock:
+            if self._counted:
+                return
+            self._counted = True
+        METRICS.inc(metric, endpoint=self.endpoint, stage=stage)
+
+    def check(self, stage: str = "inference"):
+        """Lève WorkCancelled / DeadlineExceeded si le travail doit s'arrêter"""
+        if self.cancelled.is_set():
+            self._count("churn_cancelled_total", stage)
+            raise WorkCancelled(f"Client déconnecté ({stage})")
+        if self.expired():
+            self._count("churn_deadline_expired_total", stage)
+            raise DeadlineExceeded(f"Deadline de {self.seconds:g}s dépassée ({stage})")
+
+
+def deadline_for(endpoint: str, timeout_header=None, started_at: float = None) -> Deadline:
+    """
+    Deadline depuis X-Request-Timeout (secondes) ou le défaut de l'endpoint
+    started_at : arrivée de la requête (ArrivalTimeMiddleware), sinon maintenant
+    Header invalide, non fini (nan, inf) ou <= 0 : défaut de l'endpoint
+    """
+    seconds = DEADLINE_DEFAULTS.get(endpoint, DEADLINE_MAX_S)
+    if timeout_header:
+        try:
+            requested = float(timeout_header)
+        except ValueError:
+            requested = None
+        if requested is not None and math.isfinite(requested) and requested > 0:
+            seconds = requested
+    return Deadline(min(max(seconds, 0.0), DEADLINE_MAX_S), endpoint, started_at)
+
+
+@asynccontextmanager
+async def cancel_on_disconnect(request, deadline: Deadline):
+    """Surveille la connexion HTTP pendant le bloc et annule la deadline si le client part"""
+
+    async def watch():
+        while not deadline.cancelled.is_set():
+            if await request.is_disconnected():
+                deadline.cancel()
+                return
+            await asyncio.sleep(DISCONNECT_POLL_S)
+
+    watcher = asyncio.create_task(watch())
+    try:
+        yield deadline
+    finally:
+        watcher.cancel()
+
+
+class ArrivalTimeMiddleware:
+    """Horodate l'arrivée de la requête : l'attente avant l'endpoint compte dans la deadline"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            scope.setdefault("state", {})["arrived_at"] = time.monotonic()
+        await self.app(scope, receive, send)
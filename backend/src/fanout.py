@@ -0,0 +1,290 @@
+# api/fanout.py
+"""
+Fan-out des gros jobs de scoring sur plusieurs répliques du backend
+
+La réplique qui reçoit le job (coordinateur) le découpe en chunks de
+FANOUT_CHUNK_SIZE lignes et les distribue aux répliques de PEER_REPLICAS
+(endpoint interne /internal/score-chunk), en plus d'elle-même si
+FANOUT_INCLUDE_SELF. Un thread par réplique tire les chunks d'une file
+commune : une réplique rapide en traite plus.
+
+Un chunk en échec (connexion, timeout, 429, 5xx) est remis en file pour une
+autre réplique, au plus FANOUT_RETRIES fois ; la réplique fautive est
+écartée pendant FANOUT_PEER_COOLDOWN_S (ou Retry-After), puis reprend des
+chunks du même job. Les résultats sont recollés dans l'ordre des chunks :
+la sortie est identique au scoring sur une réplique.
+
+Le job est admis une fois, sur le coordinateur. Les chunks authentifiés par
+FANOUT_TOKEN ne sont pas recomptés dans la limite par client des répliques
+(seul leur plafond de lignes en cours s'applique) ; le token est donc
+obligatoire dès que PEER_REPLICAS est défini.
+
+Transport : CSV gzip vers la réplique (décompressé par
+RequestDecompressionMiddleware), JSON en retour. Uniquement la stdlib.
+"""
+import gzip
+import hmac
+import json
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import nullcontext
+
+import numpy as np
+
+from metrics import METRICS
+from profiler import current_endpoint_tag, endpoint_tag
+from scoring import split_chunks
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# URLs des autres répliques, séparées par des virgules (vide = fan-out désactivé)
+PEER_REPLICAS = [u.strip().rstrip("/") for u in os.getenv("PEER_REPLICAS", "").split(",") if u.strip()]
+FANOUT_MIN_ROWS = int(os.getenv("FANOUT_MIN_ROWS", "20000"))
+FANOUT_CHUNK_SIZE = int(os.getenv("FANOUT_CHUNK_SIZE", "5000"))
+FANOUT_RETRIES = int(os.getenv("FANOUT_RETRIES", "2"))
+FANOUT_TIMEOUT_S = float(os.getenv("FANOUT_TIMEOUT_S", "60"))
+FANOUT_PEER_COOLDOWN_S = float(os.getenv("FANOUT_PEER_COOLDOWN_S", "30"))
+FANOUT_INCLUDE_SELF = os.getenv("FANOUT_INCLUDE_SELF", "true").lower() == "true"
+
+# Secret partagé entre répliques pour l'endpoint interne, obligatoire avec PEER_REPLICAS
+# (vide : endpoint interne ouvert mais soumis à la limite par client comme /predict-csv)
+FANOUT_TOKEN = os.getenv("FANOUT_TOKEN", "")
+
+INTERNAL_PATH = "/internal/score-chunk"
+LOCAL = "local"
+
+# Statuts HTTP d'une réplique qui justifient un nouvel essai ailleurs
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+METRICS.describe("churn_fanout_chunks_total", "Chunks de fan-out, par cible et résultat")
+
+
+class FanoutFailed(Exception):
+    pass
+
+
+class PeerError(Exception):
+    """Échec d'une réplique pour un chunk ; retryable : à retenter sur une autre"""
+
+    def __init__(self, message: str, retryable: bool = True, retry_after: float = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class Peer:
+
+    def __init__(self, url: str):
+        self.url = url
+        self.down_until = 0.0
+        self.chunks = 0
+        self.rows = 0
+        self.failures = 0
+        self.last_error = None
+
+    def available(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self, error: Exception, cooldown: float):
+        self.failures += 1
+        self.last_error = str(error)
+        self.down_until = time.monotonic() + cooldown
+
+    def status(self) -> dict:
+        return {
+            "url": self.url,
+            "available": self.available(),
+            "chunks_scored": self.chunks,
+            "rows_scored": self.rows,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+def post_chunk(url: str, chunk, headers: dict = None, timeout: float = None):
+    """Envoie un chunk (DataFrame brut) à une réplique, retourne (predictions, probas)"""
+    body = gzip.compress(chunk.to_csv(index=False).encode("utf-8"), compresslevel=1)
+    request = urllib.request.Request(
+        url + INTERNAL_PATH,
+        data=body,
+        method="POST",
+        headers={
+            "Content-Type": "text/csv",
+            "Content-Encoding": "gzip",
+            **(headers or {}),
+        },
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout or FANOUT_TIMEOUT_S) as response:
+            payload = json.load(response)
+    except urllib.error.HTTPError as e:
+        retry_after = e.headers.get("Retry-After") if e.headers else None
+        raise PeerError(
+            f"{url}: HTTP {e.code}",
+            retryable=e.code in RETRYABLE_STATUS,
+            retry_after=float(retry_after) if retry_after else None,
+        )
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise PeerError(f"{url}: {e}")
+
+    predictions = np.asarray(payload["predictions"])
+    probas = np.asarray(payload["probas"]) if payload.get("probas") is not None else None
+    if len(predictions) != len(chunk):
+        raise PeerError(f"{url}: {len(predictions)} prédictions pour {len(chunk)} lignes")
+    return predictions, probas
+
+
+class FanoutCoordinator:
+
+    def __init__(self, peers=None, min_rows: int = None, chunk_size: int = None,
+                 retries: int = None, include_self: bool = None, cooldown: float = None):
+        self.peers = [Peer(u) for u in (PEER_REPLICAS if peers is None else peers)]
+        if self.peers and not FANOUT_TOKEN:
+            raise ValueError("PEER_REPLICAS nécessite FANOUT_TOKEN (secret partagé de /internal/score-chunk)")
+        self.min_rows = FANOUT_MIN_ROWS if min_rows is None else min_rows
+        self.chunk_size = chunk_size or FANOUT_CHUNK_SIZE
+        self.retries = FANOUT_RETRIES if retries is None else retries
+        self.include_self = FANOUT_INCLUDE_SELF if include_self is None else include_self
+        self.cooldown = FANOUT_PEER_COOLDOWN_S if cooldown is None else cooldown
+        self.jobs = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.peers)
+
+    def should_fan_out(self, rows: int) -> bool:
+        return self.enabled and rows >= self.min_rows and any(p.available() for p in self.peers)
+
+    def score(self, df, local_score, headers: dict = None, deadline=None):
+        """
+        Score df réparti sur les répliques disponibles (+ local_score(chunk) en local)
+        headers : transmis aux répliques (modèle, client) ; X-Request-Timeout est
+        recalculé depuis la deadline à chaque envoi
+        Retourne (predictions, probas) dans l'ordre des lignes de df
+        """
+        chunks = split_chunks(df, self.chunk_size)
+        results = [None] * len(chunks)
+        todo = queue.Queue()
+        for i in range(len(chunks)):
+            todo.put((i, 0))
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        state = {"done": 0, "error": None, "workers": 0}
+
+        def fail(error):
+            with lock:
+                if state["error"] is None:
+                    state["error"] = error
+            stop.set()
+
+        tag = current_endpoint_tag()
+
+        def run(target):
+            with endpoint_tag(tag) if tag else nullcontext():
+                work(target)
+
+        def work(target):
+            try:
+                while not stop.is_set():
+                    try:
+                        i, attempt = todo.get(timeout=0.05)
+                    except queue.Empty:
+                        continue
+                    chunk = chunks[i]
+                    try:
+                        if deadline is not None:
+                            deadline.check()
+                        if target is LOCAL:
+                            result = local_score(chunk)
+                        else:
+                            extra = dict(headers or {})
+                            if deadline is not None:
+                                extra["X-Request-Timeout"] = f"{max(deadline.remaining(), 0.001):.3f}"
+                            extra["X-Fanout-Token"] = FANOUT_TOKEN
+                            result = post_chunk(target.url, chunk, extra)
+                    except PeerError as e:
+                        METRICS.inc("churn_fanout_chunks_total", target=target.url, outcome="failed")
+                        target.mark_down(e, max(self.cooldown, e.retry_after or 0))
+                        print(f"⚠️ Fan-out: {e} (chunk {i}, essai {attempt + 1})")
+                        if not e.retryable or attempt >= self.retries:
+                            fail(FanoutFailed(f"Chunk {i} en échec après {attempt + 1} essai(s): {e}"))
+                            return
+                        todo.put((i, attempt + 1))
+                        # La réplique reste dans le job : elle reprend des chunks après sa mise à l'écart
+                        pause = target.down_until - time.monotonic()
+                        if deadline is not None:
+                            pause = min(pause, max(deadline.remaining(), 0))
+                        stop.wait(max(pause, 0))
+                        continue
+                    except Exception as e:
+                        fail(e)
+                        return
+
+                    results[i] = result
+                    name = LOCAL if target is LOCAL else target.url
+                    METRICS.inc("churn_fanout_chunks_total", target=name, outcome="ok")
+                    if target is not LOCAL:
+                        target.chunks += 1
+                        target.rows += len(chunk)
+                    with lock:
+                        state["done"] += 1
+                        if state["done"] == len(chunks):
+                            stop.set()
+            finally:
+                with lock:
+                    state["workers"] -= 1
+
+        targets = [p for p in self.peers if p.available()]
+        if self.include_self:
+            targets.append(LOCAL)
+        threads = [threading.Thread(target=run, args=(t,), name="fanout", daemon=True) for t in targets]
+        state["workers"] = len(threads)
+        for t in threads:
+            t.start()
+
+        # Attente : fin, erreur, ou plus aucune réplique pour les chunks restants
+        while not stop.wait(0.05):
+            with lock:
+                idle = state["workers"] == 0
+            if idle:
+                fail(FanoutFailed("Aucune réplique disponible pour les chunks restants"))
+
+        self.jobs += 1
+        if state["error"] is not None:
+            raise state["error"]
+
+        predictions = np.concatenate([r[0] for r in results])
+        probas = None
+        if results[0][1] is not None:
+            probas = np.vstack([r[1] for r in results])
+        return predictions, probas
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "min_rows": self.min_rows,
+            "chunk_size": self.chunk_size,
+            "include_self": self.include_self,
+            "jobs": self.jobs,
+            "peers": [p.status() for p in self.peers],
+        }
+
+
+def fanout_peer_authenticated(token) -> bool:
+    """Chunk envoyé par un coordinateur authentifié (job déjà admis chez lui)"""
+    return bool(FANOUT_TOKEN) and check_fanout_token(token)
+
+
+def check_fanout_token(token) -> bool:
+    """Contrôle du secret partagé sur l'endpoint interne (toujours vrai sans FANOUT_TOKEN)"""
+    if not FANOUT_TOKEN:
+        return True
+    return bool(token) and hmac.compare_digest(token, FANOUT_TOKEN)
@@ -2,19 +2,74 @@
 import os
 import sys
 import pandas as pd
-import numpy as np
 import pickle
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket, Header, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 import io
+import itertools
+import asyncio
+import threading
+import time
+import tracemalloc
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from scoring import (
+    score_frame,
+    score_dataframe,
+    shutdown_pool,
+    _limit_model_threads,
+)
+from csv_pipeline import (
+    CSV_SCORING_MODE,
+    attach_predictions,
+    count_csv_rows,
+    detach_upload,
+    iter_csv_chunks,
+    pipelined_predict_csv,
+    summarize_csv,
+)
+from compression import CompressionMiddleware, RequestDecompressionMiddleware
+from cascade import CASCADE_ENABLED, CASCADE_LOW, CASCADE_HIGH, cascade_status
+from streaming import ScoringStream
+from model_pool import ModelNotFound, ModelPool, ScoringArtifacts
+from admission import (
+    BULK,
+    INTERACTIVE,
+    AdmissionController,
+    AdmissionRejected,
+    client_id_from,
+    release_after,
+)
+from deadlines import (
+    ArrivalTimeMiddleware,
+    DeadlineExceeded,
+    WorkCancelled,
+    cancel_on_disconnect,
+    deadline_for,
+)
+from metrics import METRICS
+from ood import load_ood_scorer
+from counterfactual import CounterfactualGrid, search_counterfactuals
+from fanout import FanoutCoordinator, check_fanout_token, fanout_peer_authenticated
+from rollups import RollupStore
+from prediction_log import PredictionLog
+from profiler import (
+    PROFILER_MAX_SECONDS,
+    ProfilerBusy,
+    SamplingProfiler,
+    allocation_snapshot,
+    check_admin_token,
+    endpoint_tag,
+    profiler_enabled,
+)
+
 app = FastAPI(
     title="Bank Churn Prediction API",
     description="API pour prédire le churn des clients bancaires",
@@ -30,6 +85,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression gzip/zstd des requêtes et réponses (bulk endpoints)
+app.add_middleware(RequestDecompressionMiddleware)
+app.add_middleware(CompressionMiddleware)
+
+# Horodatage d'arrivée (deadlines) : middleware le plus externe
+app.add_middleware(ArrivalTimeMiddleware)
+
 # ============================================================================
 # CONFIGURATION & GLOBAL VARIABLES
 # ============================================================================
@@ -39,12 +101,60 @@ MODEL_PATH = os.path.join(PROCESSORS_DIR, "models", "best_model_final.pkl")
 PREPROCESSOR_PATH = os.path.join(PROCESSORS_DIR, "preprocessor.pkl")
 FEATURE_NAMES_PATH = os.path.join(PROCESSORS_DIR, "feature_names.pkl")
 METADATA_PATH = os.path.join(PROCESSORS_DIR, "models", "best_model_final_metadata.pkl")
+CASCADE_MODEL_PATH = os.path.join(PROCESSORS_DIR, "models", "cascade_model.pkl")
+
+# Modèle sans les étapes d'entraînement (SMOTE) exporté par Jenkins : pas d'import d'imblearn
+INFERENCE_MODEL_PATH = os.path.join(PROCESSORS_DIR, "models", "best_model_inference.pkl")
+SERVING_MODEL_PATH = INFERENCE_MODEL_PATH if os.path.exists(INFERENCE_MODEL_PATH) else MODEL_PATH
+
+# Chargement des artefacts en arrière-plan : le serveur accepte les connexions
+# pendant l'import de sklearn / LightGBM ; /predict attend au plus STARTUP_WAIT_S
+BACKGROUND_LOADING = os.getenv("BACKGROUND_LOADING", "true").lower() == "true"
+STARTUP_WAIT_S = float(os.getenv("STARTUP_WAIT_S", "30"))
+
+# Threads LightGBM du modèle servi (0 = défaut du modèle) ; 1 en mode pré-fork
+MODEL_THREADS = int(os.getenv("MODEL_THREADS", "0"))
+
+# Chemins rechargés par les workers du pool de scoring
+ARTIFACT_PATHS = (
+    SERVING_MODEL_PATH,
+    PREPROCESSOR_PATH,
+    FEATURE_NAMES_PATH,
+    CASCADE_MODEL_PATH if CASCADE_ENABLED else None,
+)
 
 # Global variables
 model = None
 preprocessor = None
 feature_names = None
 model_metadata = {}
+cascade_model = None
+ood_scorer = None
+
+artifacts_ready = threading.Event()
+startup_timings = {}
+
+# Versions du registry chargées à la demande (header X-Model-Name / X-Model-Version)
+model_pool = ModelPool(
+    default_preprocessor_path=PREPROCESSOR_PATH,
+    default_feature_names_path=FEATURE_NAMES_PATH,
+)
+
+# Rate limiting par client (lignes/s) + plafond de lignes en cours
+admission = AdmissionController()
+
+# Répartition des gros jobs sur les autres répliques (PEER_REPLICAS)
+fanout = FanoutCoordinator()
+
+# Agrégats incrémentaux des prédictions (page Analytics)
+rollups = RollupStore()
+prediction_log = PredictionLog()
+
+
+def record_scored(df: pd.DataFrame, predictions, probas, source: str):
+    """Batch scoré -> rollups (/analytics) et journal des prédictions (drift en continu)"""
+    rollups.record(df, predictions, probas, source=source)
+    prediction_log.record(df, predictions, probas, source=source)
 
 
 # ============================================================================
@@ -101,83 +211,22 @@ class CustomerInput(BaseModel):
         }
 
 
-# ============================================================================
-# PREPROCESSING FUNCTIONS
-# ============================================================================
-
-def preprocess_raw_churn(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Applique le preprocessing churn (feature engineering)
-    Reprend la logique du notebook preprocessing.ipynb
-    """
-    df = df.copy()
-    
-    # Lowercase columns
-    df.columns = df.columns.str.lower()
-    
-    # Convert to categorical
-    categorical_cols = ['gender', 'education_level', 'marital_status', 'income_category', 'card_category']
-    for col in categorical_cols:
-        if col in df.columns:
-            df[col] = df[col].astype('category')
-    
-    # Fill missing values (si nécessaire)
-    if 'marital_status' in df.columns:
-        df['marital_status'] = df['marital_status'].replace('Unknown', 'Married')
-    
-    if 'income_category' in df.columns:
-        df['income_category'] = df['income_category'].replace('Unknown', 'Less than $40K')
-    
-    # Feature Engineering (engineered features du notebook)
-    if 'months_on_book' in df.columns and 'customer_age' in df.columns:
-        df['tenure_per_age'] = df['months_on_book'] / (df['customer_age'] * 12)
-    
-    if 'avg_utilization_ratio' in df.columns and 'customer_age' in df.columns:
-        df['utilisation_per_age'] = df['avg_utilization_ratio'] / df['customer_age']
-    
-    if 'credit_limit' in df.columns and 'customer_age' in df.columns:
-        df['credit_lim_per_age'] = df['credit_limit'] / df['customer_age']
-    
-    if 'total_trans_amt' in df.columns and 'credit_limit' in df.columns:
-        df['total_trans_amt_per_credit_lim'] = df['total_trans_amt'] / df['credit_limit']
-    
-    if 'total_trans_ct' in df.columns and 'credit_limit' in df.columns:
-        df['total_trans_ct_per_credit_lim'] = df['total_trans_ct'] / df['credit_limit']
-    
-    return df
-
-
-def apply_preprocessor(df: pd.DataFrame, preprocessor, feature_names) -> np.ndarray:
-    """
-    Applique le ColumnTransformer sklearn
-    """
-    # Transform avec le preprocessor (StandardScaler + OneHotEncoder)
-    X_transformed = preprocessor.transform(df)
-    
-    # Vérifier la cohérence des features
-    if feature_names is not None:
-        expected_features = len(feature_names)
-        actual_features = X_transformed.shape[1]
-        
-        if expected_features != actual_features:
-            print(f"⚠️ Warning: Expected {expected_features} features, got {actual_features}")
-    
-    return X_transformed
-
-
 # ============================================================================
 # STARTUP EVENT - CHARGEMENT DU MODÈLE
 # ============================================================================
 
-@app.on_event("startup")
-async def startup_event():
-    global model, preprocessor, feature_names, model_metadata
+def load_artifacts():
+    """Charge modèle, preprocessor et artefacts optionnels, puis fait un scoring de chauffe"""
+    global model, preprocessor, feature_names, model_metadata, cascade_model, ood_scorer
     
-    print("="*80)
-    print("🚀 DÉMARRAGE DE L'API CHURN PREDICTION")
-    print("="*80)
+    started = time.perf_counter()
+    
+    def step_done(name, since):
+        startup_timings[name] = round(time.perf_counter() - since, 3)
+        return time.perf_counter()
     
-    # 1. Load Preprocessor
+    # 1. Load Preprocessor (importe sklearn au dépickling)
+    t = time.perf_counter()
     try:
         with open(PREPROCESSOR_PATH, 'rb') as f:
             preprocessor = pickle.load(f)
@@ -185,6 +234,7 @@ async def startup_event():
     except Exception as e:
         print(f"❌ Erreur chargement preprocessor: {e}")
         preprocessor = None
+    t = step_done("preprocessor", t)
     
     # 2. Load Feature Names
     try:
@@ -195,14 +245,18 @@ async def startup_event():
         print(f"❌ Erreur chargement feature_names: {e}")
         feature_names = None
     
-    # 3. Load Model
+    # 3. Load Model (importe LightGBM au dépickling)
+    t = time.perf_counter()
     try:
-        with open(MODEL_PATH, 'rb') as f:
+        with open(SERVING_MODEL_PATH, 'rb') as f:
             model = pickle.load(f)
-        print(f"✅ Modèle chargé: {MODEL_PATH}")
+        if MODEL_THREADS > 0:
+            _limit_model_threads(model, MODEL_THREADS)
+        print(f"✅ Modèle chargé: {SERVING_MODEL_PATH}")
     except Exception as e:
         print(f"❌ Erreur chargement modèle: {e}")
         model = None
+    t = step_done("model", t)
     
     # 4. Load Metadata
     try:
@@ -216,12 +270,75 @@ async def startup_event():
         print(f"⚠️ Métadonnées non disponibles: {e}")
         model_metadata = {}
     
+    # 5. Load Cascade Model (optionnel)
+    if CASCADE_ENABLED:
+        try:
+            with open(CASCADE_MODEL_PATH, 'rb') as f:
+                cascade_model = pickle.load(f)
+            print(f"✅ Modèle cascade chargé: bande d'incertitude [{CASCADE_LOW}, {CASCADE_HIGH}]")
+        except Exception as e:
+            print(f"⚠️ Cascade désactivée, modèle léger non disponible: {e}")
+            cascade_model = None
+    
+    # 6. Load Reference Profile (flags OOD, optionnel)
+    try:
+        ood_scorer = load_ood_scorer()
+        if ood_scorer is not None:
+            print(f"✅ Profil de référence chargé: flags OOD actifs (seuil {ood_scorer.threshold})")
+        else:
+            print("ℹ️ Pas de profil de référence (Jenkins/build_reference_profile.py), flags OOD désactivés")
+    except Exception as e:
+        print(f"⚠️ Profil de référence illisible, flags OOD désactivés: {e}")
+        ood_scorer = None
+    
+    # 7. Warm-up : premier scoring hors requête (chemins paresseux de pandas / sklearn / LightGBM)
+    t = time.perf_counter()
+    if model and preprocessor:
+        try:
+            score_frame(pd.DataFrame([CustomerInput().dict()]), model, preprocessor, feature_names, cascade_model)
+        except Exception as e:
+            print(f"⚠️ Warm-up échoué: {e}")
+    step_done("warmup", t)
+    step_done("total", started)
+    
     print("="*80)
     
     if not model or not preprocessor:
         print("⚠️ API démarrée en mode dégradé (prédictions non disponibles)")
     else:
-        print("✅ API prête pour les prédictions!")
+        print(f"✅ API prête pour les prédictions! (artefacts chargés en {startup_timings['total']:.2f}s)")
+    
+    artifacts_ready.set()
+
+
+@app.on_event("startup")
+async def startup_event():
+    print("="*80)
+    print("🚀 DÉMARRAGE DE L'API CHURN PREDICTION")
+    print("="*80)
+    
+    if artifacts_ready.is_set():
+        # Worker pré-forké : artefacts déjà chargés et chauffés par le parent (prefork.py)
+        print(f"✅ Artefacts hérités du processus parent (pid {os.getpid()})")
+    elif BACKGROUND_LOADING:
+        threading.Thread(target=load_artifacts, name="artifact-loader", daemon=True).start()
+    else:
+        load_artifacts()
+
+
+async def wait_until_ready():
+    """Attend la fin du chargement des artefacts (requêtes arrivées pendant le cold start)"""
+    if not artifacts_ready.is_set():
+        await run_in_threadpool(artifacts_ready.wait, STARTUP_WAIT_S)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_pool()
+    rollups.flush()
+    rollups.stop()
+    prediction_log.flush()
+    prediction_log.stop()
 
 
 # ============================================================================
@@ -241,17 +358,36 @@ def read_root():
 @app.get("/health")
 def health_check():
     """Vérification de l'état de l'API"""
-    status = "healthy" if (model and preprocessor) else "degraded"
+    if not artifacts_ready.is_set():
+        status = "starting"
+    else:
+        status = "healthy" if (model and preprocessor) else "degraded"
     
     return {
         "status": status,
         "model_loaded": model is not None,
         "preprocessor_loaded": preprocessor is not None,
         "feature_names_loaded": feature_names is not None,
+        "cascade": cascade_status(cascade_model is not None),
+        "model_pool": model_pool.status(),
+        "admission": admission.status(),
+        "ood_enabled": ood_scorer is not None,
+        "fanout": fanout.status(),
+        "startup_timings_sec": startup_timings,
         "timestamp": datetime.now().isoformat()
     }
 
 
+@app.get("/ready")
+def readiness_check():
+    """Readiness : 200 une fois les artefacts chargés (autoscaling / load balancer)"""
+    if not artifacts_ready.is_set():
+        raise HTTPException(status_code=503, detail="Chargement des artefacts en cours", headers={"Retry-After": "1"})
+    if not model or not preprocessor:
+        raise HTTPException(status_code=503, detail="Service non disponible")
+    return {"status": "ready", "startup_timings_sec": startup_timings}
+
+
 @app.get("/model-info")
 def get_model_info():
     """Informations sur le modèle chargé"""
@@ -280,72 +416,260 @@ def get_features():
     }
 
 
+@app.get("/metrics")
+def metrics():
+    """Compteurs du backend (format texte Prometheus)"""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/analytics")
+def analytics(days: int = Query(30, ge=1, le=366)):
+    """Agrégats des prédictions des `days` derniers jours (rollups incrémentaux)"""
+    if not rollups.enabled:
+        raise HTTPException(status_code=404, detail="Rollups désactivés (ROLLUPS_ENABLED=false)")
+    return {**rollups.summary(days), "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/models")
+def list_models():
+    """Modèles et versions disponibles dans le registry"""
+    return {
+        "models": model_pool.list_models(),
+        "pool": model_pool.status()
+    }
+
+
+async def resolve_artifacts(model_name: Optional[str] = None, version: Optional[str] = None) -> ScoringArtifacts:
+    """
+    Artefacts de scoring de la requête : modèle par défaut du déploiement,
+    ou version du registry sélectionnée par header / paramètre de chemin
+    (chargement du pickle et attente d'un chargement concurrent hors de la boucle asyncio)
+    """
+    if not model_name:
+        if not artifacts_ready.is_set():
+            raise HTTPException(status_code=503, detail="Chargement des artefacts en cours", headers={"Retry-After": "1"})
+        if not model or not preprocessor:
+            raise HTTPException(status_code=503, detail="Service non disponible")
+        return ScoringArtifacts(model, preprocessor, feature_names, cascade_model, ARTIFACT_PATHS, model_metadata)
+    
+    try:
+        return await run_in_threadpool(model_pool.get, model_name, version)
+    except ModelNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Modèle {model_name} non disponible: {str(e)}")
+
+
+def admit(request: Request, rows: int, priority: str, charge_client: bool = True):
+    """Réserve `rows` lignes pour le client de la requête, 429 + Retry-After sinon"""
+    # X-Client-Id retenu pour les chunks de fan-out authentifiés (client du job d'origine)
+    client_id = client_id_from(request, trusted=fanout_peer_authenticated(request.headers.get("x-fanout-token")))
+    try:
+        return admission.admit(client_id, rows, priority, charge_client=charge_client)
+    except AdmissionRejected as e:
+        METRICS.inc("churn_admission_rejected_total", priority=priority)
+        raise HTTPException(status_code=429, detail=e.reason, headers=e.headers())
+
+
+def admit_stream(websocket: WebSocket, rows: int):
+    """Micro-batch WebSocket : admis comme trafic interactif (AdmissionRejected si refusé)"""
+    try:
+        return admission.admit(client_id_from(websocket), rows, INTERACTIVE)
+    except AdmissionRejected:
+        METRICS.inc("churn_admission_rejected_total", priority=INTERACTIVE)
+        raise
+
+
+def request_deadline(request: Request, endpoint: str, timeout_header: Optional[str]):
+    """Deadline de la requête, comptée depuis son arrivée (ArrivalTimeMiddleware)"""
+    arrived_at = request.scope.get("state", {}).get("arrived_at")
+    return deadline_for(endpoint, timeout_header, arrived_at)
+
+
+def abandoned_work_error(e: Exception) -> HTTPException:
+    """504 si la deadline est dépassée, 499 si le client est parti"""
+    if isinstance(e, WorkCancelled):
+        return HTTPException(status_code=499, detail=str(e))
+    return HTTPException(status_code=504, detail=str(e))
+
+
+def score_bulk(df: pd.DataFrame, artifacts: ScoringArtifacts, request: Request, deadline, endpoint: str,
+               model_name: Optional[str] = None, version: Optional[str] = None):
+    """
+    Scoring d'un gros DataFrame : réparti sur les répliques (fan-out) au-delà
+    de FANOUT_MIN_ROWS si PEER_REPLICAS est configuré, sinon pool local.
+    Exécuté dans le threadpool, hors de la pile de l'endpoint : le thread est
+    marqué `endpoint` pour le profiler.
+    """
+    with endpoint_tag(endpoint):
+        return _score_bulk(df, artifacts, request, deadline, model_name, version)
+
+
+def _score_bulk(df, artifacts, request, deadline, model_name, version):
+    if fanout.should_fan_out(len(df)):
+        headers = {"X-Client-Id": client_id_from(request)}
+        if model_name:
+            headers["X-Model-Name"] = model_name
+        if version:
+            headers["X-Model-Version"] = version
+        return fanout.score(
+            df,
+            lambda chunk: score_frame(
+                chunk, artifacts.model, artifacts.preprocessor, artifacts.feature_names, artifacts.cascade_model
+            ),
+            headers=headers,
+            deadline=deadline,
+        )
+    return score_dataframe(
+        df, artifacts.model, artifacts.preprocessor, artifacts.feature_names,
+        artifact_paths=artifacts.artifact_paths, cascade_model=artifacts.cascade_model,
+        deadline=deadline
+    )
+
+
 @app.post("/predict")
-async def predict_single(customer: CustomerInput):
+@app.post("/models/{model_name}/predict")
+async def predict_single(
+    customer: CustomerInput,
+    request: Request,
+    model_name: Optional[str] = None,
+    version: Optional[str] = None,
+    x_model_name: Optional[str] = Header(None),
+    x_model_version: Optional[str] = Header(None),
+    x_request_timeout: Optional[str] = Header(None),
+):
     """
     Prédiction pour un client unique
     """
-    if not model or not preprocessor:
-        raise HTTPException(status_code=503, detail="Service non disponible")
+    await wait_until_ready()
+    artifacts = await resolve_artifacts(model_name or x_model_name, version or x_model_version)
+    deadline = request_deadline(request, "/predict", x_request_timeout)
+    ticket = admit(request, 1, INTERACTIVE)
     
     try:
         # Convertir en DataFrame
         df_input = pd.DataFrame([customer.dict()])
         
-        # 1. Feature Engineering
-        df_processed = preprocess_raw_churn(df_input)
-        
-        # 2. Apply preprocessor (scaling + encoding)
-        X = apply_preprocessor(df_processed, preprocessor, feature_names)
+        # Feature Engineering + preprocessor + predict
+        with ticket:
+            # Requête restée trop longtemps en file : pas d'inférence
+            deadline.check()
+            predictions, probas = score_frame(
+                df_input, artifacts.model, artifacts.preprocessor, artifacts.feature_names, artifacts.cascade_model
+            )
+        record_scored(df_input, predictions, probas, "predict")
+        prediction = predictions[0]
         
-        # 3. Predict
-        prediction = model.predict(X)[0]
-        
-        # 4. Predict proba (si disponible)
         proba = None
-        if hasattr(model, 'predict_proba'):
-            proba_array = model.predict_proba(X)[0]
+        if probas is not None:
             proba = {
-                "non_churn": float(proba_array[0]),
-                "churn": float(proba_array[1])
+                "non_churn": float(probas[0][0]),
+                "churn": float(probas[0][1])
             }
         
-        return {
+        response = {
             "prediction": int(prediction),
             "prediction_label": "Churn" if prediction == 1 else "Non-Churn",
             "probabilities": proba,
             "timestamp": datetime.now().isoformat()
         }
         
+        if ood_scorer is not None:
+            response["ood"] = ood_scorer.score(df_input, endpoint="/predict").as_dict(0)
+        
+        return response
+        
+    except (DeadlineExceeded, WorkCancelled) as e:
+        raise abandoned_work_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur de prédiction: {str(e)}")
 
 
+@app.post("/counterfactual")
+@app.post("/models/{model_name}/counterfactual")
+async def counterfactual(
+    customer: CustomerInput,
+    request: Request,
+    target_probability: float = Query(0.5, gt=0, lt=1),
+    max_changes: int = Query(3, ge=1, le=6),
+    top_k: int = Query(5, ge=1, le=50),
+    model_name: Optional[str] = None,
+    version: Optional[str] = None,
+    x_model_name: Optional[str] = Header(None),
+    x_model_version: Optional[str] = Header(None),
+    x_request_timeout: Optional[str] = Header(None),
+):
+    """
+    Actions de rétention : plus petits changements des champs actionnables
+    (transactions, inactivité, contacts, produits, limite de crédit) qui font
+    passer la probabilité de churn sous target_probability
+    Tous les candidats sont scorés en un seul batch
+    """
+    await wait_until_ready()
+    artifacts = await resolve_artifacts(model_name or x_model_name, version or x_model_version)
+    deadline = request_deadline(request, "/counterfactual", x_request_timeout)
+    
+    # Une ligne par candidat dans le rate limiting (quelques centaines à quelques milliers)
+    grid = CounterfactualGrid(customer.dict(), max_changes=max_changes)
+    ticket = admit(request, len(grid), INTERACTIVE)
+    
+    try:
+        with ticket:
+            result = await run_in_threadpool(
+                search_counterfactuals,
+                grid, artifacts.model, artifacts.preprocessor, artifacts.feature_names,
+                target_probability=target_probability, top_k=top_k, deadline=deadline
+            )
+        return {**result, "timestamp": datetime.now().isoformat()}
+    
+    except (DeadlineExceeded, WorkCancelled) as e:
+        raise abandoned_work_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur de recherche contrefactuelle: {str(e)}")
+
+
 @app.post("/predict-batch")
-async def predict_batch(customers: List[CustomerInput]):
+@app.post("/models/{model_name}/predict-batch")
+async def predict_batch(
+    customers: List[CustomerInput],
+    request: Request,
+    model_name: Optional[str] = None,
+    version: Optional[str] = None,
+    x_model_name: Optional[str] = Header(None),
+    x_model_version: Optional[str] = Header(None),
+    x_request_timeout: Optional[str] = Header(None),
+    x_rollup_skip: Optional[str] = Header(None),
+):
     """
     Prédiction pour plusieurs clients
+    X-Rollup-Skip: true pour des lignes synthétiques (ex. grilles what-if du
+    frontend) qui ne doivent compter ni dans /analytics, ni dans le journal des prédictions,
+    ni dans les métriques OOD
     """
-    if not model or not preprocessor:
-        raise HTTPException(status_code=503, detail="Service non disponible")
+    await wait_until_ready()
+    artifacts = await resolve_artifacts(model_name or x_model_name, version or x_model_version)
+    deadline = request_deadline(request, "/predict-batch", x_request_timeout)
+    ticket = admit(request, len(customers), BULK)
     
     try:
         # Convertir en DataFrame
         df_input = pd.DataFrame([c.dict() for c in customers])
         
-        # 1. Feature Engineering
-        df_processed = preprocess_raw_churn(df_input)
-        
-        # 2. Apply preprocessor
-        X = apply_preprocessor(df_processed, preprocessor, feature_names)
+        # Scoring (parallèle par chunks pour les gros batchs), hors de la boucle asyncio
+        # (arrêt au chunk suivant si deadline dépassée ou client déconnecté)
+        with ticket:
+            async with cancel_on_disconnect(request, deadline):
+                predictions, probas = await run_in_threadpool(
+                    score_bulk, df_input, artifacts, request, deadline, "/predict-batch",
+                    model_name or x_model_name, version or x_model_version
+                )
         
-        # 3. Predict
-        predictions = model.predict(X)
-        
-        # 4. Predict proba
-        probas = None
-        if hasattr(model, 'predict_proba'):
-            probas = model.predict_proba(X)
+        # Lignes synthétiques (grille what-if du frontend) : ni rollups, ni journal, ni métriques OOD
+        synthetic = (x_rollup_skip or "").lower() == "true"
+        if not synthetic:
+            record_scored(df_input, predictions, probas, "predict-batch")
+        ood_endpoint = None if synthetic else "/predict-batch"
+        ood = ood_scorer.score(df_input, endpoint=ood_endpoint) if ood_scorer is not None else None
         
         # Format results
         results = []
@@ -362,74 +686,312 @@ async def predict_batch(customers: List[CustomerInput]):
                     "churn": float(probas[i][1])
                 }
             
+            if ood is not None:
+                result["ood"] = ood.as_dict(i)
+            
             results.append(result)
         
-        return {
+        response = {
             "count": len(results),
             "predictions": results,
             "timestamp": datetime.now().isoformat()
         }
         
+        if ood is not None:
+            response["ood_flagged"] = ood.flagged
+        
+        return response
+        
+    except (DeadlineExceeded, WorkCancelled) as e:
+        raise abandoned_work_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur de prédiction batch: {str(e)}")
 
 
+def record_csv_chunk(chunk: pd.DataFrame, predictions, probas):
+    record_scored(chunk, predictions, probas, "predict-csv")
+
+
+def open_csv_upload(fileobj, detach: bool):
+    """Source du scoring (copie détachée en mode pipeliné) et nombre de lignes"""
+    source = detach_upload(fileobj) if detach else fileobj
+    return source, count_csv_rows(source)
+
+
+def finish_csv_batch(df_input: pd.DataFrame, predictions, probas) -> pd.DataFrame:
+    """Rollups, journal, OOD et colonnes de résultat du fichier complet (threadpool)"""
+    record_scored(df_input, predictions, probas, "predict-csv")
+    ood = ood_scorer.score(df_input, endpoint="/predict-csv") if ood_scorer is not None else None
+    return attach_predictions(df_input, predictions, probas, ood)
+
+
 @app.post("/predict-csv")
-async def predict_csv(file: UploadFile = File(...)):
+@app.post("/models/{model_name}/predict-csv")
+async def predict_csv(
+    request: Request,
+    file: UploadFile = File(...),
+    mode: Optional[str] = None,
+    model_name: Optional[str] = None,
+    version: Optional[str] = None,
+    x_model_name: Optional[str] = Header(None),
+    x_model_version: Optional[str] = Header(None),
+    x_request_timeout: Optional[str] = Header(None),
+):
     """
     Upload CSV, obtenir prédictions, télécharger résultat
+    mode : "batch" (défaut) ou "pipelined" (parse / transform / infer / serialize en parallèle)
+           ou "summary" (agrégats JSON seulement : comptes, taux de churn, histogramme, ventilations)
     """
-    if not model or not preprocessor:
-        raise HTTPException(status_code=503, detail="Service non disponible")
+    await wait_until_ready()
+    artifacts = await resolve_artifacts(model_name or x_model_name, version or x_model_version)
     
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Le fichier doit être un CSV")
     
+    mode = mode or CSV_SCORING_MODE
+    if mode not in ("batch", "pipelined", "summary"):
+        raise HTTPException(status_code=400, detail=f"Mode inconnu: {mode}")
+    
+    headers = {
+        "Content-Disposition": f"attachment; filename=churn_predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    }
+    
+    deadline = request_deadline(request, "/predict-csv", x_request_timeout)
+    
+    # Admission sur le nombre de lignes, avant tout parsing (copie et comptage
+    # lisent tout l'upload : hors de la boucle asyncio)
+    source, rows = await run_in_threadpool(open_csv_upload, file.file, mode == "pipelined")
     try:
-        # Read CSV
-        contents = await file.read()
-        df_input = pd.read_csv(io.BytesIO(contents))
-        
-        print(f"📥 CSV reçu: {len(df_input)} lignes, {len(df_input.columns)} colonnes")
-        
-        # 1. Feature Engineering
-        df_processed = preprocess_raw_churn(df_input)
+        ticket = admit(request, rows, BULK)
+    except HTTPException:
+        if source is not file.file:
+            source.close()
+        raise
+    
+    try:
+        if mode == "summary":
+            print(f"📥 CSV reçu (mode résumé): {file.filename}")
+            try:
+                async with cancel_on_disconnect(request, deadline):
+                    summary = await run_in_threadpool(
+                        summarize_csv,
+                        source, artifacts.model, artifacts.preprocessor, artifacts.feature_names,
+                        cascade_model=artifacts.cascade_model, deadline=deadline, ood_scorer=ood_scorer,
+                        on_scored=record_csv_chunk
+                    )
+            finally:
+                ticket.release()
+            return {**summary, "timestamp": datetime.now().isoformat()}
         
-        # 2. Apply preprocessor
-        X = apply_preprocessor(df_processed, preprocessor, feature_names)
+        if mode == "pipelined":
+            chunks = pipelined_predict_csv(
+                source, artifacts.model, artifacts.preprocessor, artifacts.feature_names,
+                close_source=True, cascade_model=artifacts.cascade_model, deadline=deadline,
+                ood_scorer=ood_scorer, on_scored=record_csv_chunk
+            )
+            
+            # Premier chunk calculé avant de répondre : les erreurs de format restent des 500
+            # (ensuite, une déconnexion ferme le générateur et arrête le pipeline)
+            async with cancel_on_disconnect(request, deadline):
+                first_chunk = await run_in_threadpool(next, chunks, "")
+            print(f"📥 CSV reçu (mode pipeliné): {file.filename}")
+            
+            return StreamingResponse(
+                release_after(itertools.chain([first_chunk], chunks), ticket),
+                media_type="text/csv",
+                headers=headers
+            )
         
-        # 3. Predict
-        predictions = model.predict(X)
+        # Read CSV
+        df_input = await run_in_threadpool(pd.read_csv, source)
         
-        # 4. Probabilities
-        if hasattr(model, 'predict_proba'):
-            probas = model.predict_proba(X)
-            df_result = df_input.copy()
-            df_result['churn_prediction'] = predictions
-            df_result['proba_non_churn'] = probas[:, 0]
-            df_result['proba_churn'] = probas[:, 1]
-        else:
-            df_result = df_input.copy()
-            df_result['churn_prediction'] = predictions
+        print(f"📥 CSV reçu: {len(df_input)} lignes, {len(df_input.columns)} colonnes")
         
-        # Save to buffer
-        output = io.StringIO()
-        df_result.to_csv(output, index=False)
-        output.seek(0)
+        # Scoring (parallèle par chunks pour les gros fichiers), hors de la boucle asyncio
+        async with cancel_on_disconnect(request, deadline):
+            predictions, probas = await run_in_threadpool(
+                score_bulk, df_input, artifacts, request, deadline, "/predict-csv",
+                model_name or x_model_name, version or x_model_version
+            )
+        df_result = await run_in_threadpool(finish_csv_batch, df_input, predictions, probas)
         
-        # Return file
+        # Return file (sérialisé par tranches, compressé à la volée si Accept-Encoding)
         return StreamingResponse(
-            iter([output.getvalue()]),
+            release_after(iter_csv_chunks(df_result), ticket),
             media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=churn_predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            }
+            headers=headers
         )
         
+    except (DeadlineExceeded, WorkCancelled) as e:
+        ticket.release()
+        raise abandoned_work_error(e)
     except Exception as e:
+        ticket.release()
         raise HTTPException(status_code=500, detail=f"Erreur traitement CSV: {str(e)}")
 
 
+@app.post("/internal/score-chunk", include_in_schema=False)
+async def score_chunk(
+    request: Request,
+    x_model_name: Optional[str] = Header(None),
+    x_model_version: Optional[str] = Header(None),
+    x_request_timeout: Optional[str] = Header(None),
+    x_fanout_token: Optional[str] = Header(None),
+):
+    """
+    Chunk CSV envoyé par une réplique coordinatrice (fan-out) : prédictions brutes en JSON
+    Jamais redistribué : le scoring reste local
+    """
+    if not check_fanout_token(x_fanout_token):
+        raise HTTPException(status_code=403, detail="Token de fan-out invalide")
+    
+    await wait_until_ready()
+    artifacts = await resolve_artifacts(x_model_name, x_model_version)
+    deadline = request_deadline(request, "/predict-csv", x_request_timeout)
+    
+    body = await request.body()
+    try:
+        df_chunk = await run_in_threadpool(pd.read_csv, io.BytesIO(body))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Chunk illisible: {str(e)}")
+    
+    # Job déjà admis (et décompté au client) par le coordinateur : plafond en cours seulement
+    ticket = admit(request, len(df_chunk), BULK, charge_client=not fanout_peer_authenticated(x_fanout_token))
+    try:
+        with ticket:
+            async with cancel_on_disconnect(request, deadline):
+                predictions, probas = await run_in_threadpool(
+                    score_dataframe,
+                    df_chunk, artifacts.model, artifacts.preprocessor, artifacts.feature_names,
+                    artifact_paths=artifacts.artifact_paths, cascade_model=artifacts.cascade_model,
+                    deadline=deadline
+                )
+    except (DeadlineExceeded, WorkCancelled) as e:
+        raise abandoned_work_error(e)
+    
+    # JSONResponse direct : pas de jsonable_encoder sur des milliers de valeurs
+    return JSONResponse({
+        "predictions": predictions.tolist(),
+        "probas": probas.tolist() if probas is not None else None,
+    })
+
+
+def score_records(records: List[dict]) -> List[dict]:
+    """Score une liste de clients déjà validés (utilisé par le streaming WebSocket)"""
+    df_input = pd.DataFrame(records)
+    predictions, probas = score_frame(df_input, model, preprocessor, feature_names, cascade_model)
+    record_scored(df_input, predictions, probas, "ws")
+    ood = ood_scorer.score(df_input, endpoint="/ws/predict") if ood_scorer is not None else None
+    
+    results = []
+    for i, pred in enumerate(predictions):
+        result = {
+            "prediction": int(pred),
+            "prediction_label": "Churn" if pred == 1 else "Non-Churn"
+        }
+        if probas is not None:
+            result["probabilities"] = {
+                "non_churn": float(probas[i][0]),
+                "churn": float(probas[i][1])
+            }
+        if ood is not None:
+            result["ood"] = ood.as_dict(i)
+        results.append(result)
+    
+    return results
+
+
+@app.websocket("/ws/predict")
+async def predict_stream(websocket: WebSocket):
+    """
+    Scoring en streaming : {"id": ..., "customer": {...}} -> résultats taggés par id
+    Micro-batching interne, résultats potentiellement dans le désordre
+    """
+    await wait_until_ready()
+    if not model or not preprocessor:
+        await websocket.close(code=1013, reason="Service non disponible")
+        return
+    
+    await ScoringStream(
+        websocket, CustomerInput, score_records,
+        admit=lambda rows: admit_stream(websocket, rows),
+    ).run()
+
+
+# ============================================================================
+# DEBUG (admin)
+# ============================================================================
+
+def endpoint_code_map() -> dict:
+    """{code object -> chemin} des endpoints, pour attribuer les échantillons du profiler"""
+    codes = {}
+    for route in app.routes:
+        endpoint = getattr(route, "endpoint", None)
+        if endpoint is None or not hasattr(endpoint, "__code__"):
+            continue
+        # Endpoint exposé sur plusieurs chemins : on garde le chemin sans paramètre
+        if endpoint.__code__ not in codes or "{" not in route.path:
+            codes[endpoint.__code__] = route.path
+    # Le scoring WebSocket tourne dans l'executor, hors de la pile de l'endpoint
+    codes[score_records.__code__] = "/ws/predict"
+    return codes
+
+
+@app.get("/debug/profile")
+async def debug_profile(
+    seconds: float = 10,
+    interval_ms: Optional[float] = None,
+    allocations: bool = False,
+    format: str = "json",
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    Profiling par échantillonnage du worker pendant `seconds` secondes
+    Désactivé sans ADMIN_TOKEN ; format=collapsed pour flamegraph.pl / speedscope
+    """
+    if not profiler_enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not check_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Token admin invalide")
+    if format not in ("json", "collapsed"):
+        raise HTTPException(status_code=400, detail="format doit être 'json' ou 'collapsed'")
+    
+    seconds = max(0.1, min(seconds, PROFILER_MAX_SECONDS))
+    profiler = SamplingProfiler(endpoint_code_map(), interval_ms=interval_ms)
+    
+    started_tracemalloc = allocations and not tracemalloc.is_tracing()
+    try:
+        profiler.start()
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    try:
+        if started_tracemalloc:
+            tracemalloc.start()
+        # La boucle asyncio reste libre : les requêtes continuent d'être servies
+        await asyncio.sleep(seconds)
+        allocation_stats = allocation_snapshot() if allocations else None
+    finally:
+        profiler.stop()
+        if started_tracemalloc:
+            tracemalloc.stop()
+    
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    
+    response = {
+        "duration_seconds": seconds,
+        "interval_ms": profiler.interval * 1000,
+        "samples": profiler.samples,
+        "by_endpoint": profiler.summary(),
+        "timestamp": datetime.now().isoformat()
+    }
+    if allocation_stats is not None:
+        response["allocations"] = allocation_stats
+    
+    return response
+
+
 # ============================================================================
 # RUN
 # ============================================================================
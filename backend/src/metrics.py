@@ -0,0 +1,60 @@
+# api/metrics.py
+"""
+Compteurs du backend exportés sur /metrics (format texte Prometheus)
+"""
+import math
+import threading
+from collections import defaultdict
+
+
+def format_value(value) -> str:
+    """Entiers exacts (pas de notation 1.23457e+06 au-delà de 6 chiffres), floats complets"""
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counters:
+    """Compteurs monotones avec labels, thread-safe"""
+
+    def __init__(self):
+        self._values = defaultdict(int)
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] += value
+
+    def get(self, name: str, **labels) -> float:
+        return self._values.get((name, tuple(sorted(labels.items()))), 0)
+
+    def render(self) -> str:
+        with self._lock:
+            items = sorted(self._values.items())
+
+        lines = []
+        seen = set()
+        for (name, labels), value in items:
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+            value = format_value(value)
+            lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Counters()
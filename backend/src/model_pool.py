@@ -0,0 +1,279 @@
+# api/model_pool.py
+"""
+Pool de modèles multi-versions (un modèle par portefeuille bancaire)
+
+Layout du registry (copié par Jenkins/register_best_model.py) :
+    <MODEL_REGISTRY_DIR>/<model_name>/production.pkl + metadata.json
+    <MODEL_REGISTRY_DIR>/<model_name>/<version>/production.pkl + metadata.json
+Chaque version peut embarquer son preprocessor.pkl / feature_names.pkl ;
+sinon ceux du déploiement (processors/) sont utilisés.
+
+Les versions sont chargées à la première requête et gardées en mémoire dans
+un LRU borné en nombre (MODEL_POOL_MAX_MODELS) et en taille
+(MODEL_POOL_MAX_MB, estimée par la taille des pickles sur disque). Le
+listing du registry est mis en cache MODEL_POOL_RESOLVE_TTL_S secondes : une
+nouvelle version est visible au plus tard après ce délai.
+"""
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+try:
+    from packaging.version import InvalidVersion, Version
+except ImportError:  # packaging optionnel : tri par chaîne
+    Version = None
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+MODEL_REGISTRY_DIR = os.getenv(
+    "MODEL_REGISTRY_DIR",
+    os.path.join(os.path.dirname(__file__), "processors", "registry")
+)
+MODEL_POOL_MAX_MODELS = int(os.getenv("MODEL_POOL_MAX_MODELS", "4"))
+MODEL_POOL_MAX_MB = float(os.getenv("MODEL_POOL_MAX_MB", "1024"))
+# Durée de cache des versions lues dans le registry (0 = relu à chaque requête)
+MODEL_POOL_RESOLVE_TTL_S = float(os.getenv("MODEL_POOL_RESOLVE_TTL_S", "5"))
+
+MODEL_FILENAMES = ("production.pkl", "model.pkl")
+DEFAULT_VERSION = "production"
+
+# Artefacts nécessaires au scoring d'une version
+ScoringArtifacts = namedtuple(
+    "ScoringArtifacts",
+    ["model", "preprocessor", "feature_names", "cascade_model", "artifact_paths", "metadata"]
+)
+
+
+class ModelNotFound(KeyError):
+    pass
+
+
+def _load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _find_model_file(directory):
+    for filename in MODEL_FILENAMES:
+        path = os.path.join(directory, filename)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def version_key(version: str):
+    """Tri des versions : PEP 440 si possible ("10" > "9"), sinon par chaîne, avant les versions valides"""
+    if Version is not None:
+        try:
+            return (1, Version(version), version)
+        except InvalidVersion:
+            pass
+    return (0, version)
+
+
+def _read_metadata(directory):
+    path = os.path.join(directory, "metadata.json")
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Métadonnées illisibles ({path}): {e}")
+        return {}
+
+
+class ModelPool:
+    """
+    default_preprocessor_path / default_feature_names_path : artefacts du
+    déploiement, utilisés pour les versions qui n'embarquent pas les leurs.
+    """
+
+    def __init__(self, registry_dir: str = None, default_preprocessor_path: str = None,
+                 default_feature_names_path: str = None, max_models: int = None, max_mb: float = None,
+                 resolve_ttl_s: float = None):
+        self.registry_dir = registry_dir or MODEL_REGISTRY_DIR
+        self.default_preprocessor_path = default_preprocessor_path
+        self.default_feature_names_path = default_feature_names_path
+        self.max_models = max_models or MODEL_POOL_MAX_MODELS
+        self.max_bytes = (max_mb or MODEL_POOL_MAX_MB) * 1024 * 1024
+        self.resolve_ttl_s = MODEL_POOL_RESOLVE_TTL_S if resolve_ttl_s is None else resolve_ttl_s
+
+        self._versions = {}  # name -> (expiration monotonic, {version -> dossier})
+
+        self._entries = OrderedDict()  # (name, version) -> (ScoringArtifacts, taille)
+        self._lock = threading.Lock()
+        self._loading = {}  # (name, version) -> Lock : un seul chargement par version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------------
+    # REGISTRY
+    # ------------------------------------------------------------------------
+
+    def list_versions(self, name: str) -> dict:
+        """{version -> dossier} ; la version à la racine du modèle est "production" """
+        model_dir = os.path.join(self.registry_dir, name)
+        if not os.path.isdir(model_dir):
+            return {}
+
+        versions = {}
+        if _find_model_file(model_dir):
+            versions[DEFAULT_VERSION] = model_dir
+            root_version = _read_metadata(model_dir).get("version")
+            if root_version:
+                versions[str(root_version)] = model_dir
+
+        for entry in sorted(os.listdir(model_dir)):
+            version_dir = os.path.join(model_dir, entry)
+            if os.path.isdir(version_dir) and _find_model_file(version_dir):
+                versions[entry] = version_dir
+
+        return versions
+
+    def list_models(self) -> dict:
+        if not os.path.isdir(self.registry_dir):
+            return {}
+        models = {}
+        for name in sorted(os.listdir(self.registry_dir)):
+            versions = self.list_versions(name)
+            if versions:
+                models[name] = sorted(versions, key=version_key)
+        return models
+
+    def _cached_versions(self, name: str) -> dict:
+        """list_versions avec cache TTL (seuls les modèles existants sont mis en cache)"""
+        now = time.monotonic()
+        cached = self._versions.get(name)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        versions = self.list_versions(name)
+        if versions and self.resolve_ttl_s > 0:
+            self._versions[name] = (now + self.resolve_ttl_s, versions)
+        else:
+            self._versions.pop(name, None)
+        return versions
+
+    def _resolve(self, name: str, version: str = None):
+        # Noms de dossier uniquement : pas de "../" dans un header
+        if not name or os.path.basename(name) != name or name.startswith("."):
+            raise ModelNotFound(f"Modèle inconnu: {name}")
+
+        versions = self._cached_versions(name)
+        if not versions:
+            raise ModelNotFound(f"Modèle inconnu: {name}")
+
+        if version is None:
+            version = DEFAULT_VERSION if DEFAULT_VERSION in versions else max(versions, key=version_key)
+        if version not in versions:
+            raise ModelNotFound(f"Version inconnue pour {name}: {version} (disponibles: {sorted(versions, key=version_key)})")
+
+        # Alias ("1.0.0" lu dans metadata.json) -> une seule entrée dans le pool
+        directory = versions[version]
+        if directory == os.path.join(self.registry_dir, name):
+            version = DEFAULT_VERSION
+
+        return version, directory
+
+    # ------------------------------------------------------------------------
+    # CHARGEMENT + LRU
+    # ------------------------------------------------------------------------
+
+    def _load(self, directory):
+        model_path = _find_model_file(directory)
+
+        preprocessor_path = os.path.join(directory, "preprocessor.pkl")
+        if not os.path.exists(preprocessor_path):
+            preprocessor_path = self.default_preprocessor_path
+
+        feature_names_path = os.path.join(directory, "feature_names.pkl")
+        if not os.path.exists(feature_names_path):
+            feature_names_path = self.default_feature_names_path
+
+        model = _load_pickle(model_path)
+        preprocessor = _load_pickle(preprocessor_path)
+        feature_names = None
+        if feature_names_path and os.path.exists(feature_names_path):
+            feature_names = _load_pickle(feature_names_path)
+
+        # Les artefacts partagés du déploiement ne comptent pas dans le budget
+        size = os.path.getsize(model_path)
+        if preprocessor_path != self.default_preprocessor_path:
+            size += os.path.getsize(preprocessor_path)
+
+        artifacts = ScoringArtifacts(
+            model=model,
+            preprocessor=preprocessor,
+            feature_names=feature_names,
+            cascade_model=None,
+            artifact_paths=(model_path, preprocessor_path, feature_names_path, None),
+            metadata=_read_metadata(directory),
+        )
+        return artifacts, size
+
+    def _evict(self, keep):
+        total = sum(size for _, size in self._entries.values())
+        while len(self._entries) > 1 and (len(self._entries) > self.max_models or total > self.max_bytes):
+            key, (_, size) = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            total -= size
+            self.evictions += 1
+            print(f"♻️ Modèle évincé du pool: {key[0]}@{key[1]}")
+
+    def get(self, name: str, version: str = None) -> ScoringArtifacts:
+        version, directory = self._resolve(name, version)
+        key = (name, version)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Chargé entre-temps par une autre requête ?
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+
+            try:
+                artifacts, size = self._load(directory)
+                print(f"✅ Modèle chargé dans le pool: {name}@{version} ({size / 1024 / 1024:.1f} MB)")
+
+                with self._lock:
+                    self.misses += 1
+                    self._entries[key] = (artifacts, size)
+                    self._evict(keep=key)
+            finally:
+                # Y compris en cas d'échec : pas de verrou orphelin par version
+                with self._lock:
+                    self._loading.pop(key, None)
+
+        return artifacts
+
+    def status(self) -> dict:
+        with self._lock:
+            loaded = [f"{name}@{version}" for name, version in self._entries]
+            total = sum(size for _, size in self._entries.values())
+        return {
+            "registry_dir": self.registry_dir,
+            "loaded": loaded,
+            "loaded_mb": round(total / 1024 / 1024, 1),
+            "max_models": self.max_models,
+            "max_mb": self.max_bytes / 1024 / 1024,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
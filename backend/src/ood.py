@@ -0,0 +1,132 @@
+# api/ood.py
+"""
+Flags out-of-distribution (OOD) au moment du scoring
+
+Profil de référence (processors/reference_profile.json, construit par
+Jenkins/build_reference_profile.py depuis churn2.csv) : quantiles des
+features numériques et fréquences des modalités catégorielles.
+
+Score par feature :
+- numérique : dépassement au-delà de [q0.5%, q99.5%], en unités d'IQR
+- catégorielle : OOD_UNSEEN_CATEGORY_SCORE si la modalité est absente (ou
+  plus rare que OOD_MIN_CATEGORY_FREQ) dans la référence
+Score de la ligne = max des features ; flag si score > OOD_THRESHOLD.
+Calcul vectorisé, O(nombre de features) par ligne.
+"""
+import json
+import os
+
+import numpy as np
+
+from metrics import METRICS
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+OOD_PROFILE_PATH = os.getenv(
+    "OOD_PROFILE_PATH",
+    os.path.join(os.path.dirname(__file__), "processors", "reference_profile.json")
+)
+OOD_THRESHOLD = float(os.getenv("OOD_THRESHOLD", "1.0"))
+OOD_MIN_CATEGORY_FREQ = float(os.getenv("OOD_MIN_CATEGORY_FREQ", "0.001"))
+OOD_UNSEEN_CATEGORY_SCORE = float(os.getenv("OOD_UNSEEN_CATEGORY_SCORE", "10.0"))
+
+LOW_QUANTILE = "0.005"
+HIGH_QUANTILE = "0.995"
+
+METRICS.describe("churn_ood_rows_total", "Lignes scorées signalées hors distribution")
+METRICS.describe("churn_ood_feature_total", "Features hors distribution, par feature")
+
+
+class OODResult:
+    """Scores et flags d'un batch ; features_of(i) liste les features en cause"""
+
+    def __init__(self, scores, flags, feature_scores, feature_names, threshold):
+        self.scores = scores
+        self.flags = flags
+        self._feature_scores = feature_scores
+        self._feature_names = feature_names
+        self._threshold = threshold
+
+    @property
+    def flagged(self) -> int:
+        return int(self.flags.sum())
+
+    def features_of(self, i: int) -> list:
+        row = self._feature_scores[i]
+        return [self._feature_names[j] for j in np.flatnonzero(row > self._threshold)]
+
+    def as_dict(self, i: int) -> dict:
+        return {
+            "score": round(float(self.scores[i]), 4),
+            "flag": bool(self.flags[i]),
+            "features": self.features_of(i) if self.flags[i] else [],
+        }
+
+
+class OODScorer:
+
+    def __init__(self, profile: dict, threshold: float = None, min_category_freq: float = None):
+        self.threshold = OOD_THRESHOLD if threshold is None else threshold
+        min_freq = OOD_MIN_CATEGORY_FREQ if min_category_freq is None else min_category_freq
+
+        self.numeric_features = sorted(profile.get("numeric", {}))
+        stats = [profile["numeric"][f] for f in self.numeric_features]
+        self.low = np.array([s["quantiles"][LOW_QUANTILE] for s in stats], dtype=float)
+        self.high = np.array([s["quantiles"][HIGH_QUANTILE] for s in stats], dtype=float)
+        iqr = np.array([s["quantiles"]["0.75"] - s["quantiles"]["0.25"] for s in stats], dtype=float)
+        spread = np.array([s["max"] - s["min"] for s in stats], dtype=float)
+        # Features quasi constantes : repli sur l'étendue, puis 1
+        self.scale = np.where(iqr > 0, iqr, np.where(spread > 0, spread, 1.0))
+
+        self.categorical_features = sorted(profile.get("categorical", {}))
+        self.known_categories = {
+            f: [c for c, freq in profile["categorical"][f].items() if freq >= min_freq]
+            for f in self.categorical_features
+        }
+
+    def score(self, df, endpoint: str = None) -> OODResult:
+        """Scores OOD d'un DataFrame brut (noms de colonnes insensibles à la casse)"""
+        columns = {c.lower(): c for c in df.columns}
+        n = len(df)
+        names = []
+        blocks = []
+
+        num_idx = [i for i, f in enumerate(self.numeric_features) if f in columns]
+        if num_idx:
+            cols = [columns[self.numeric_features[i]] for i in num_idx]
+            X = df[cols].to_numpy(dtype=float)
+            excess = np.maximum(self.low[num_idx] - X, X - self.high[num_idx])
+            blocks.append(np.nan_to_num(np.clip(excess, 0, None) / self.scale[num_idx]))
+            names.extend(self.numeric_features[i] for i in num_idx)
+
+        for f in self.categorical_features:
+            if f not in columns:
+                continue
+            unseen = ~df[columns[f]].astype(str).isin(self.known_categories[f]).to_numpy()
+            blocks.append((unseen * OOD_UNSEEN_CATEGORY_SCORE)[:, None])
+            names.append(f)
+
+        feature_scores = np.hstack(blocks) if blocks else np.zeros((n, 0))
+        scores = feature_scores.max(axis=1) if feature_scores.shape[1] else np.zeros(n)
+        flags = scores > self.threshold
+        result = OODResult(scores, flags, feature_scores, names, self.threshold)
+
+        if endpoint is not None and result.flagged:
+            METRICS.inc("churn_ood_rows_total", result.flagged, endpoint=endpoint)
+            for name, count in zip(names, (feature_scores > self.threshold).sum(axis=0)):
+                if count:
+                    METRICS.inc("churn_ood_feature_total", int(count), feature=name)
+
+        return result
+
+
+def load_ood_scorer(path: str = None):
+    """OODScorer depuis le profil JSON, ou None (fonctionnalité désactivée) s'il est absent"""
+    path = path or OOD_PROFILE_PATH
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return OODScorer(json.load(f))
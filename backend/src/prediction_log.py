@@ -0,0 +1,132 @@
+# api/prediction_log.py
+"""
+Journal des prédictions (JSON lines), lu en continu par monitoring/stream_drift.py
+
+Une ligne par client scoré : horodatage, source, entrées brutes (noms de
+colonnes en minuscules, identifiants retirés), prediction et proba.
+
+Comme pour les rollups, record() ne fait que mettre le batch en file (non
+bloquant, batch perdu et compté si la file est pleine) ; un thread unique
+sérialise et écrit. Le fichier est renommé en <path>.1 au-delà de
+PREDICTION_LOG_MAX_MB (le lecteur détecte la rotation et repart du début).
+
+Désactivé tant que PREDICTION_LOG_PATH est vide.
+"""
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from metrics import METRICS
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+PREDICTION_LOG_PATH = os.getenv("PREDICTION_LOG_PATH", "")
+PREDICTION_LOG_QUEUE_SIZE = int(os.getenv("PREDICTION_LOG_QUEUE_SIZE", "1000"))
+PREDICTION_LOG_MAX_MB = float(os.getenv("PREDICTION_LOG_MAX_MB", "256"))
+
+# Part des lignes journalisées (1.0 = toutes) : borne le volume sur les gros CSV
+PREDICTION_LOG_SAMPLE = float(os.getenv("PREDICTION_LOG_SAMPLE", "1.0"))
+
+# Colonnes jamais journalisées (identifiants, artefacts d'export)
+EXCLUDED_COLUMNS = {"clientnum", "unnamed: 21"}
+
+METRICS.describe("churn_prediction_log_dropped_total", "Batchs de prédictions non journalisés (file pleine)")
+
+_STOP = object()
+
+
+class PredictionLog:
+
+    def __init__(self, path: str = None, sample: float = None):
+        self.path = PREDICTION_LOG_PATH if path is None else path
+        self.sample = PREDICTION_LOG_SAMPLE if sample is None else sample
+        self._queue = queue.Queue(maxsize=PREDICTION_LOG_QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def start(self):
+        with self._lock:
+            if self.enabled and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="prediction-log", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def record(self, df: pd.DataFrame, predictions, probas, source: str):
+        """Met en file un batch scoré (non bloquant) ; probas : (n, 2) ou None"""
+        if not self.enabled or len(predictions) == 0:
+            return
+        rows = slice(None)
+        if self.sample < 1.0:
+            rows = self._rng.random(len(predictions)) < self.sample
+            if not rows.any():
+                return
+        item = (
+            time.time(),
+            source,
+            df[rows] if self.sample < 1.0 else df,
+            np.asarray(predictions)[rows],
+            np.asarray(probas)[rows, 1] if probas is not None else None,
+        )
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            METRICS.inc("churn_prediction_log_dropped_total", source=source)
+
+    def flush(self, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self.write(*item)
+            except Exception as e:
+                print(f"⚠️ Journal des prédictions: batch non écrit ({e})")
+            finally:
+                self._queue.task_done()
+
+    def write(self, ts: float, source: str, df: pd.DataFrame, predictions, churn_proba):
+        records = df.rename(columns=str.lower)
+        records = records.drop(columns=[c for c in records.columns if c in EXCLUDED_COLUMNS])
+        records.insert(0, "source", source)
+        records.insert(0, "ts", round(ts, 3))
+        records["prediction"] = predictions.astype(int)
+        if churn_proba is not None:
+            records["proba"] = churn_proba.round(6)
+
+        self._rotate_if_needed()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            lines = records.to_json(orient="records", lines=True, force_ascii=False, double_precision=6)
+            f.write(lines if lines.endswith("\n") else lines + "\n")
+
+    def _rotate_if_needed(self):
+        try:
+            if os.path.getsize(self.path) > PREDICTION_LOG_MAX_MB * 1024 ** 2:
+                os.replace(self.path, self.path + ".1")
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,242 @@
+# api/prefork.py
+"""
+Mode pré-fork : un seul chargement du modèle partagé par tous les workers
+
+Le parent charge et chauffe les artefacts (main.load_artifacts), gèle le tas
+Python (gc.freeze : le GC ne réécrit plus les en-têtes des objets chargés,
+les pages restent partagées copy-on-write), ouvre le socket d'écoute puis
+fork N workers uvicorn qui servent main.app sur ce socket.
+
+Chaque worker est un processus mono-thread côté LightGBM (MODEL_THREADS=1,
+pas de thread OpenMP créé avant le fork) et score en-processus
+(SCORING_WORKERS=1) : le parallélisme vient des workers.
+
+Le parent relance un worker mort (fork depuis l'état déjà chauffé, quasi
+instantané) et affiche la mémoire réelle par worker (RSS / PSS / USS depuis
+/proc/<pid>/smaps_rollup) au démarrage, toutes les PREFORK_REPORT_INTERVAL_S
+secondes et sur SIGUSR1. L'économie est mesurée par rapport à un worker qui
+chargerait lui-même le modèle : mémoire anonyme allouée par load_artifacts
+dans le parent.
+
+Limite : admission, métriques et pool de versions restent par worker.
+
+Usage:
+    python prefork.py --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# Avant l'import de main : configuration lue à l'import des modules
+os.environ.setdefault("MODEL_THREADS", "1")
+os.environ.setdefault("SCORING_WORKERS", "1")
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+PREFORK_WORKERS = int(os.getenv("PREFORK_WORKERS", str(os.cpu_count() or 1)))
+PREFORK_REPORT_DELAY_S = float(os.getenv("PREFORK_REPORT_DELAY_S", "10"))
+PREFORK_REPORT_INTERVAL_S = float(os.getenv("PREFORK_REPORT_INTERVAL_S", "300"))
+
+SMAPS_FIELDS = ("Rss", "Pss", "Private_Clean", "Private_Dirty", "Shared_Clean", "Shared_Dirty", "Anonymous")
+
+
+# ============================================================================
+# MÉMOIRE PAR PROCESSUS
+# ============================================================================
+
+def process_memory(pid="self") -> dict:
+    """
+    Mémoire d'un processus en MB (Linux, /proc/<pid>/smaps_rollup)
+    rss : pages résidentes ; pss : part proportionnelle des pages partagées ;
+    uss : pages privées (ce que libérerait l'arrêt du processus) ;
+    anon : pages anonymes (tas, hors bibliothèques et fichiers mappés)
+    """
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in SMAPS_FIELDS:
+                    values[key] = int(rest.split()[0]) / 1024
+    except (OSError, ValueError):
+        return {}
+    return {
+        "rss_mb": round(values.get("Rss", 0), 1),
+        "pss_mb": round(values.get("Pss", 0), 1),
+        "uss_mb": round(values.get("Private_Clean", 0) + values.get("Private_Dirty", 0), 1),
+        "shared_mb": round(values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0), 1),
+        "anon_mb": round(values.get("Anonymous", 0), 1),
+    }
+
+
+def memory_report(parent_pid: int, worker_pids, model_mb: float = 0.0) -> dict:
+    """
+    Économie du pré-fork vs des workers qui chargent chacun le modèle
+
+    model_mb : mémoire anonyme allouée par load_artifacts dans le parent, ce
+    que paierait chaque worker indépendant. Un worker pré-forké paie au plus
+    son USS pour ces pages (copies copy-on-write + ses propres allocations) :
+    l'économie par worker est donc au moins model_mb - USS. Bibliothèques et
+    interpréteur (partagés dans les deux cas) ne sont pas comptés.
+    """
+    workers = {pid: process_memory(pid) for pid in worker_pids}
+    workers = {pid: m for pid, m in workers.items() if m}
+    pss = sum(m["pss_mb"] for m in workers.values())
+    uss = sum(m["uss_mb"] for m in workers.values())
+    mean_uss = uss / len(workers) if workers else 0.0
+    return {
+        "parent": process_memory(parent_pid),
+        "workers": workers,
+        "model_mb": round(model_mb, 1),
+        "total_pss_mb": round(pss, 1),
+        "total_uss_mb": round(uss, 1),
+        "saved_per_worker_mb": round(max(model_mb - mean_uss, 0.0), 1) if workers else 0.0,
+    }
+
+
+def print_memory_report(parent_pid: int, worker_pids, model_mb: float = 0.0):
+    report = memory_report(parent_pid, worker_pids, model_mb)
+    parent = report["parent"]
+    print("="*80)
+    print("🧠 MÉMOIRE PAR WORKER (MB)")
+    print(f"   {'pid':>8} {'RSS':>8} {'PSS':>8} {'USS':>8} {'partagé':>8}")
+    if parent:
+        print(f"   {'parent':>8} {parent['rss_mb']:8.1f} {parent['pss_mb']:8.1f} "
+              f"{parent['uss_mb']:8.1f} {parent['shared_mb']:8.1f}")
+    for pid, m in sorted(report["workers"].items()):
+        print(f"   {pid:>8} {m['rss_mb']:8.1f} {m['pss_mb']:8.1f} {m['uss_mb']:8.1f} {m['shared_mb']:8.1f}")
+    print(f"   Total PSS workers: {report['total_pss_mb']:.1f} MB, USS: {report['total_uss_mb']:.1f} MB")
+    print(f"   Modèle chargé dans le parent: {report['model_mb']:.1f} MB "
+          f"(coût de chaque worker indépendant)")
+    print(f"   Économie par worker: ≥ {report['saved_per_worker_mb']:.1f} MB")
+    print("="*80)
+    return report
+
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+def run_worker(app, sock: socket.socket, log_level: str):
+    """Processus enfant : uvicorn sur le socket hérité, sans recharger les artefacts"""
+    import uvicorn
+
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1):
+        signal.signal(sig, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=log_level, timeout_graceful_shutdown=10)
+    server = uvicorn.Server(config)
+    try:
+        server.run(sockets=[sock])
+    finally:
+        os._exit(0)
+
+
+def spawn_worker(app, sock, log_level) -> int:
+    pid = os.fork()
+    if pid == 0:
+        run_worker(app, sock, log_level)
+    return pid
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(host: str, port: int, workers: int, log_level: str = "info"):
+    import main
+
+    # 1. Chargement + warm-up une seule fois, dans le parent
+    before = process_memory()
+    main.load_artifacts()
+    model_mb = process_memory().get("anon_mb", 0.0) - before.get("anon_mb", 0.0)
+    if not main.model or not main.preprocessor:
+        print("⚠️ Modèle non chargé : les workers démarrent en mode dégradé")
+
+    # 2. Objets chargés déplacés dans la génération permanente du GC :
+    #    les collectes des workers ne touchent plus leurs pages
+    gc.collect()
+    gc.freeze()
+    print(f"🧊 Tas Python gelé: {gc.get_freeze_count()} objets partagés copy-on-write")
+
+    sock = bind_socket(host, port)
+    print(f"🚀 Pré-fork: {workers} workers sur http://{host}:{port}")
+
+    parent_pid = os.getpid()
+    children = set()
+    for _ in range(workers):
+        children.add(spawn_worker(main.app, sock, log_level))
+
+    stopping = False
+    report_requested = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def request_report(signum, frame):
+        nonlocal report_requested
+        report_requested = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, request_report)
+
+    next_report = time.monotonic() + PREFORK_REPORT_DELAY_S
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            children.discard(pid)
+            if not stopping:
+                print(f"⚠️ Worker {pid} arrêté (code {os.waitstatus_to_exitcode(status)}), relance")
+                children.add(spawn_worker(main.app, sock, log_level))
+            continue
+
+        now = time.monotonic()
+        if not stopping and (report_requested or now >= next_report):
+            print_memory_report(parent_pid, children, model_mb)
+            report_requested = False
+            next_report = now + PREFORK_REPORT_INTERVAL_S if PREFORK_REPORT_INTERVAL_S > 0 else float("inf")
+        time.sleep(0.2)
+
+    sock.close()
+    print("👋 Workers arrêtés")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=PREFORK_WORKERS)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        print("❌ Mode pré-fork indisponible sur cette plateforme (os.fork)")
+        sys.exit(1)
+
+    serve(args.host, args.port, max(args.workers, 1), args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# api/profiler.py
+"""
+Profiler par échantillonnage à la demande (endpoint admin /debug/profile)
+
+Un thread échantillonne les piles de tous les threads du worker
+(sys._current_frames) toutes les PROFILER_INTERVAL_MS pendant N secondes,
+puis renvoie des piles "collapsed" (format flame graph de Brendan Gregg)
+regroupées par endpoint. Option : snapshot d'allocations tracemalloc.
+
+Sûr en production : désactivé tant que ADMIN_TOKEN n'est pas défini, une
+seule session à la fois, durée bornée par PROFILER_MAX_SECONDS. Les workers
+du pool de scoring (processus séparés) ne sont pas échantillonnés.
+"""
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Vide = endpoint de profiling désactivé
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "30"))
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "10"))
+PROFILER_MAX_DEPTH = int(os.getenv("PROFILER_MAX_DEPTH", "64"))
+
+# Threads du mode pipeliné de /predict-csv (csv_pipeline.py)
+THREAD_PREFIX_ENDPOINTS = {"csv-": "/predict-csv"}
+
+_session_lock = threading.Lock()
+
+# Travail déporté hors de la pile de l'endpoint (run_in_threadpool, threads
+# du fan-out) : {thread ident -> endpoint}, posé par endpoint_tag()
+_thread_endpoints = {}
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def profiler_enabled() -> bool:
+    return bool(ADMIN_TOKEN)
+
+
+def check_admin_token(token) -> bool:
+    """Comparaison à temps constant du header X-Admin-Token"""
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+@contextmanager
+def endpoint_tag(endpoint: str):
+    """Attribue au endpoint les échantillons du thread courant pendant le bloc"""
+    ident = threading.get_ident()
+    previous = _thread_endpoints.get(ident)
+    _thread_endpoints[ident] = endpoint
+    try:
+        yield
+    finally:
+        if previous is None:
+            _thread_endpoints.pop(ident, None)
+        else:
+            _thread_endpoints[ident] = previous
+
+
+def current_endpoint_tag():
+    """Endpoint posé sur le thread courant (à propager aux threads qu'il lance)"""
+    return _thread_endpoints.get(threading.get_ident())
+
+
+class SamplingProfiler:
+    """
+    endpoint_codes : {code object -> chemin} des fonctions d'endpoint, pour
+    attribuer chaque échantillon à l'endpoint présent dans la pile.
+    """
+
+    def __init__(self, endpoint_codes: dict, interval_ms: float = None):
+        self.endpoint_codes = endpoint_codes
+        self.interval = (interval_ms or PROFILER_INTERVAL_MS) / 1000
+        self.stacks = defaultdict(Counter)
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _attribute(self, frames, thread_name: str, thread_id: int = None) -> str:
+        for frame in frames:
+            endpoint = self.endpoint_codes.get(frame.f_code)
+            if endpoint is not None:
+                return endpoint
+        endpoint = _thread_endpoints.get(thread_id)
+        if endpoint is not None:
+            return endpoint
+        for prefix, endpoint in THREAD_PREFIX_ENDPOINTS.items():
+            if thread_name.startswith(prefix):
+                return endpoint
+        return "other"
+
+    def _sample_once(self):
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+
+            frames = []
+            while frame is not None and len(frames) < PROFILER_MAX_DEPTH:
+                frames.append(frame)
+                frame = frame.f_back
+
+            thread_name = names.get(thread_id, str(thread_id))
+            endpoint = self._attribute(frames, thread_name, thread_id)
+            # Racine -> feuille, préfixé par le thread
+            stack = ";".join([thread_name] + [_frame_label(f) for f in reversed(frames)])
+            self.stacks[endpoint][stack] += 1
+
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            self._sample_once()
+            self._stop.wait(max(0.0, self.interval - (time.perf_counter() - start)))
+
+    def start(self):
+        if not _session_lock.acquire(blocking=False):
+            raise ProfilerBusy("Une session de profiling est déjà en cours")
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        _session_lock.release()
+
+    def collapsed(self, endpoint: str = None) -> str:
+        """Piles au format collapsed ("frame;frame;frame count"), endpoint en racine"""
+        lines = []
+        for name, counter in sorted(self.stacks.items()):
+            if endpoint is not None and name != endpoint:
+                continue
+            for stack, count in counter.most_common():
+                lines.append(f"{name};{stack} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, top: int = 20) -> dict:
+        by_endpoint = {}
+        for name, counter in sorted(self.stacks.items()):
+            total = sum(counter.values())
+            # Fonctions feuilles les plus fréquentes (self time)
+            leaves = Counter()
+            for stack, count in counter.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            by_endpoint[name] = {
+                "samples": total,
+                "top_functions": [{"frame": f, "samples": c} for f, c in leaves.most_common(top)],
+                "collapsed": self.collapsed(name),
+            }
+        return by_endpoint
+
+
+def allocation_snapshot(top: int = 25) -> list:
+    snapshot = tracemalloc.take_snapshot()
+    stats = snapshot.statistics("lineno")[:top]
+    return [
+        {"location": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+        for stat in stats
+    ]
@@ -0,0 +1,308 @@
+# api/rollups.py
+"""
+Agrégats incrémentaux des prédictions (page Analytics du frontend)
+
+Chaque scoring (endpoints /predict*, WebSocket, batches de monitoring
+ingérés en CLI) alimente des tables de rollup SQLite :
+
+    daily_rollup    (jour, source)              lignes, churn, somme des probas
+    segment_rollup  (jour, dimension, valeur)   idem, par card_category / income_category
+    risk_rollup     (jour, tranche de risque)   lignes
+
+Côté requête, record() ne fait qu'extraire quelques colonnes et les mettre
+en file ; un thread unique agrège le batch et fait les upserts
+(INSERT ... ON CONFLICT DO UPDATE). La lecture (summary) ne parcourt que
+la fenêtre de jours demandée, via les clés primaires : coût constant quelle
+que soit la profondeur de l'historique.
+
+Usage CLI (batchs de monitoring déjà scorés) :
+    python rollups.py ingest scored_batch.csv --source monitoring --day 2026-01-15
+"""
+import argparse
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from metrics import METRICS
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+ROLLUPS_ENABLED = os.getenv("ROLLUPS_ENABLED", "true").lower() == "true"
+ROLLUP_DB_PATH = os.getenv(
+    "ROLLUP_DB_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "rollups.sqlite")
+)
+ROLLUP_QUEUE_SIZE = int(os.getenv("ROLLUP_QUEUE_SIZE", "1000"))
+
+# Bornes des tranches de risque sur la probabilité de churn
+ROLLUP_RISK_EDGES = [float(x) for x in os.getenv("ROLLUP_RISK_EDGES", "0.3,0.7").split(",")]
+RISK_LABELS = ["low", "medium", "high"] if len(ROLLUP_RISK_EDGES) == 2 else \
+    [f"bucket_{i}" for i in range(len(ROLLUP_RISK_EDGES) + 1)]
+
+SEGMENT_DIMENSIONS = ["card_category", "income_category"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    day TEXT NOT NULL, source TEXT NOT NULL,
+    rows INTEGER NOT NULL, churn INTEGER NOT NULL, proba_sum REAL NOT NULL,
+    PRIMARY KEY (day, source)
+);
+CREATE TABLE IF NOT EXISTS segment_rollup (
+    day TEXT NOT NULL, dimension TEXT NOT NULL, value TEXT NOT NULL,
+    rows INTEGER NOT NULL, churn INTEGER NOT NULL, proba_sum REAL NOT NULL,
+    PRIMARY KEY (day, dimension, value)
+);
+CREATE TABLE IF NOT EXISTS risk_rollup (
+    day TEXT NOT NULL, bucket TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    PRIMARY KEY (day, bucket)
+);
+"""
+
+METRICS.describe("churn_rollup_dropped_total", "Batchs de prédictions non agrégés (file des rollups pleine)")
+
+_STOP = object()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class RollupStore:
+
+    def __init__(self, path: str = None, enabled: bool = None):
+        self.path = path or ROLLUP_DB_PATH
+        self.enabled = ROLLUPS_ENABLED if enabled is None else enabled
+        self._queue = queue.Queue(maxsize=ROLLUP_QUEUE_SIZE)
+        self._conn = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = _connect(self.path)
+        return self._conn
+
+    def start(self):
+        with self._lock:
+            if self.enabled and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rollup-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def record(self, df: pd.DataFrame, predictions, probas, source: str, day: str = None):
+        """
+        Met en file un batch scoré (non bloquant) ; df : entrées brutes
+        (colonnes insensibles à la casse), probas : (n, 2) ou None
+        """
+        if not self.enabled or len(predictions) == 0:
+            return
+        columns = {c.lower(): c for c in df.columns}
+        segments = {d: df[columns[d]].astype(str).to_numpy() for d in SEGMENT_DIMENSIONS if d in columns}
+        item = (
+            day or date.today().isoformat(),
+            source,
+            np.asarray(predictions).astype(int),
+            np.asarray(probas)[:, 1] if probas is not None else None,
+            segments,
+        )
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            METRICS.inc("churn_rollup_dropped_total", source=source)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self.apply(*item)
+            except Exception as e:
+                print(f"⚠️ Rollups: batch non agrégé ({e})")
+            finally:
+                self._queue.task_done()
+
+    def apply(self, day: str, source: str, predictions, churn_proba, segments: dict):
+        """Agrège un batch et l'ajoute aux tables (une transaction)"""
+        proba = churn_proba if churn_proba is not None else predictions.astype(float)
+        rows = len(predictions)
+
+        segment_rows = []
+        for dimension, values in segments.items():
+            stats = pd.DataFrame({"value": values, "churn": predictions, "proba": proba}) \
+                .groupby("value").agg(rows=("churn", "size"), churn=("churn", "sum"), proba=("proba", "sum"))
+            segment_rows.extend(
+                (day, dimension, value, int(n), int(churn), float(p))
+                for value, n, churn, p in stats.itertuples()
+            )
+
+        buckets = np.bincount(np.searchsorted(ROLLUP_RISK_EDGES, proba, side="right"),
+                              minlength=len(RISK_LABELS))
+        risk_rows = [(day, label, int(n)) for label, n in zip(RISK_LABELS, buckets) if n]
+
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO daily_rollup VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (day, source) DO UPDATE SET rows = rows + excluded.rows, "
+                "churn = churn + excluded.churn, proba_sum = proba_sum + excluded.proba_sum",
+                (day, source, rows, int(predictions.sum()), float(proba.sum()))
+            )
+            conn.executemany(
+                "INSERT INTO segment_rollup VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (day, dimension, value) DO UPDATE SET rows = rows + excluded.rows, "
+                "churn = churn + excluded.churn, proba_sum = proba_sum + excluded.proba_sum",
+                segment_rows
+            )
+            conn.executemany(
+                "INSERT INTO risk_rollup VALUES (?, ?, ?) "
+                "ON CONFLICT (day, bucket) DO UPDATE SET rows = rows + excluded.rows",
+                risk_rows
+            )
+
+    def flush(self, timeout: float = 5.0):
+        """Attend que les batchs en file soient écrits (tests, arrêt)"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    # ------------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------------
+
+    def summary(self, days: int = 30) -> dict:
+        """Agrégats des `days` derniers jours (séries quotidiennes, segments, risque)"""
+        since = (date.today() - timedelta(days=days - 1)).isoformat()
+        # Connexion de lecture dédiée (WAL : lecture concurrente de l'écriture)
+        with closing(_connect(self.path)) as conn:
+            return self._summary(conn, days, since)
+
+    def _summary(self, conn: sqlite3.Connection, days: int, since: str) -> dict:
+        daily = conn.execute(
+            "SELECT day, SUM(rows), SUM(churn), SUM(proba_sum) FROM daily_rollup "
+            "WHERE day >= ? GROUP BY day ORDER BY day", (since,)
+        ).fetchall()
+        by_source = conn.execute(
+            "SELECT source, SUM(rows), SUM(churn) FROM daily_rollup WHERE day >= ? GROUP BY source", (since,)
+        ).fetchall()
+        segments = conn.execute(
+            "SELECT dimension, value, SUM(rows), SUM(churn), SUM(proba_sum) FROM segment_rollup "
+            "WHERE day >= ? GROUP BY dimension, value", (since,)
+        ).fetchall()
+        risk = dict(conn.execute(
+            "SELECT bucket, SUM(rows) FROM risk_rollup WHERE day >= ? GROUP BY bucket", (since,)
+        ).fetchall())
+
+        total_rows = sum(r[1] for r in daily)
+        total_churn = sum(r[2] for r in daily)
+        total_proba = sum(r[3] for r in daily)
+
+        breakdowns = {}
+        for dimension, value, n, churn, proba in segments:
+            breakdowns.setdefault(dimension, {})[value] = {
+                "rows": n,
+                "predicted_churn": churn,
+                "churn_rate": round(churn / n, 4) if n else None,
+                "mean_churn_probability": round(proba / n, 4) if n else None,
+            }
+
+        return {
+            "window_days": days,
+            "since": since,
+            "total_rows": total_rows,
+            "predicted_churn": total_churn,
+            "churn_rate": round(total_churn / total_rows, 4) if total_rows else None,
+            "mean_churn_probability": round(total_proba / total_rows, 4) if total_rows else None,
+            "daily": [
+                {"day": d, "rows": n, "predicted_churn": c, "churn_rate": round(c / n, 4) if n else None}
+                for d, n, c, _ in daily
+            ],
+            "by_source": {s: {"rows": n, "predicted_churn": c} for s, n, c in by_source},
+            "breakdowns": breakdowns,
+            "risk_buckets": {
+                "edges": ROLLUP_RISK_EDGES,
+                "counts": {label: risk.get(label, 0) for label in RISK_LABELS},
+            },
+        }
+
+
+# ============================================================================
+# CLI : ingestion de batchs déjà scorés (monitoring)
+# ============================================================================
+
+PREDICTION_COLUMNS = ["churn_prediction", "prediction"]
+PROBA_COLUMNS = ["proba_churn", "proba"]
+
+
+def ingest_scored_csv(store: RollupStore, path: str, source: str, day: str = None,
+                      chunk_size: int = 50000) -> int:
+    """Ajoute un CSV scoré (format /predict-csv ou monitoring/score_data.py) aux rollups"""
+    total = 0
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        columns = {c.lower(): c for c in chunk.columns}
+        pred_col = next((columns[c] for c in PREDICTION_COLUMNS if c in columns), None)
+        if pred_col is None:
+            raise ValueError(f"Colonne de prédiction absente ({' / '.join(PREDICTION_COLUMNS)})")
+        proba_col = next((columns[c] for c in PROBA_COLUMNS if c in columns), None)
+        segments = {d: chunk[columns[d]].astype(str).to_numpy() for d in SEGMENT_DIMENSIONS if d in columns}
+        store.apply(
+            day or date.today().isoformat(),
+            source,
+            chunk[pred_col].to_numpy().astype(int),
+            chunk[proba_col].to_numpy(dtype=float) if proba_col is not None else None,
+            segments,
+        )
+        total += len(chunk)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="ajouter un CSV scoré aux rollups")
+    ingest.add_argument("paths", nargs="+")
+    ingest.add_argument("--source", default="monitoring")
+    ingest.add_argument("--day", default=None, help="jour (YYYY-MM-DD), défaut aujourd'hui")
+    ingest.add_argument("--db", default=ROLLUP_DB_PATH)
+    args = parser.parse_args()
+
+    store = RollupStore(args.db, enabled=True)
+    for path in args.paths:
+        try:
+            rows = ingest_scored_csv(store, path, args.source, args.day)
+        except (OSError, ValueError) as e:
+            print(f"❌ {path}: {e}")
+            sys.exit(1)
+        print(f"✅ {path}: {rows} lignes ajoutées aux rollups ({args.source})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+# api/scoring.py
+"""
+Scoring des clients : feature engineering + preprocessor + modèle
+
+Les gros batchs (/predict-csv, /predict-batch) sont découpés en chunks de
+lignes scorés en parallèle dans un pool de processus, puis recollés dans
+l'ordre d'origine.
+"""
+import os
+import pickle
+import multiprocessing
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cascade import CASCADE_STATS, cascade_predict, record_cascade_stats
+from model_pool import MODEL_POOL_MAX_MB, MODEL_POOL_MAX_MODELS
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Nombre de lignes par chunk
+SCORING_CHUNK_SIZE = int(os.getenv("SCORING_CHUNK_SIZE", "20000"))
+
+# Processus web qui se partagent les coeurs (uvicorn --workers lit WEB_CONCURRENCY)
+WEB_CONCURRENCY = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+
+# Nombre de processus du pool par worker web (1 = scoring séquentiel) ;
+# par défaut les coeurs sont répartis entre les workers web
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(max((os.cpu_count() or 1) // WEB_CONCURRENCY, 1))))
+
+# Threads LightGBM par processus (évite la sur-souscription des coeurs)
+SCORING_WORKER_THREADS = int(os.getenv("SCORING_WORKER_THREADS", "1"))
+
+_pool = None
+_pool_lock = threading.Lock()
+# Cache par processus du pool : même budget que le ModelPool (+1 entrée pour le
+# modèle du déploiement), éviction LRU. artifact_paths -> (artefacts, taille)
+_worker_artifacts = OrderedDict()
+
+
+# ============================================================================
+# PREPROCESSING FUNCTIONS
+# ============================================================================
+
+def preprocess_raw_churn(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applique le preprocessing churn (feature engineering)
+    Reprend la logique du notebook preprocessing.ipynb
+    """
+    df = df.copy()
+
+    # Lowercase columns
+    df.columns = df.columns.str.lower()
+
+    # Convert to categorical
+    categorical_cols = ['gender', 'education_level', 'marital_status', 'income_category', 'card_category']
+    for col in categorical_cols:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    # Fill missing values (si nécessaire)
+    if 'marital_status' in df.columns:
+        df['marital_status'] = df['marital_status'].replace('Unknown', 'Married')
+
+    if 'income_category' in df.columns:
+        df['income_category'] = df['income_category'].replace('Unknown', 'Less than $40K')
+
+    # Feature Engineering (engineered features du notebook)
+    if 'months_on_book' in df.columns and 'customer_age' in df.columns:
+        df['tenure_per_age'] = df['months_on_book'] / (df['customer_age'] * 12)
+
+    if 'avg_utilization_ratio' in df.columns and 'customer_age' in df.columns:
+        df['utilisation_per_age'] = df['avg_utilization_ratio'] / df['customer_age']
+
+    if 'credit_limit' in df.columns and 'customer_age' in df.columns:
+        df['credit_lim_per_age'] = df['credit_limit'] / df['customer_age']
+
+    if 'total_trans_amt' in df.columns and 'credit_limit' in df.columns:
+        df['total_trans_amt_per_credit_lim'] = df['total_trans_amt'] / df['credit_limit']
+
+    if 'total_trans_ct' in df.columns and 'credit_limit' in df.columns:
+        df['total_trans_ct_per_credit_lim'] = df['total_trans_ct'] / df['credit_limit']
+
+    return df
+
+
+def apply_preprocessor(df: pd.DataFrame, preprocessor, feature_names) -> np.ndarray:
+    """
+    Applique le ColumnTransformer sklearn
+    """
+    # Transform avec le preprocessor (StandardScaler + OneHotEncoder)
+    X_transformed = preprocessor.transform(df)
+
+    # Vérifier la cohérence des features
+    if feature_names is not None:
+        expected_features = len(feature_names)
+        actual_features = X_transformed.shape[1]
+
+        if expected_features != actual_features:
+            print(f"⚠️ Warning: Expected {expected_features} features, got {actual_features}")
+
+    return X_transformed
+
+
+def predict_transformed(X, model, cascade_model=None):
+    """
+    Prédiction sur des features transformées, en cascade si un modèle léger est fourni
+    Retourne (predictions, probas) ; probas vaut None si le modèle n'a pas predict_proba
+    """
+    if cascade_model is not None and hasattr(model, 'predict_proba'):
+        return cascade_predict(X, model, cascade_model)
+
+    predictions = model.predict(X)
+
+    probas = None
+    if hasattr(model, 'predict_proba'):
+        probas = model.predict_proba(X)
+
+    return predictions, probas
+
+
+def empty_predictions(model):
+    """(predictions, probas) pour 0 ligne : le preprocessor refuse un tableau vide"""
+    classes = getattr(model, 'classes_', np.array([0, 1]))
+    probas = np.empty((0, len(classes))) if hasattr(model, 'predict_proba') else None
+    return np.empty(0, dtype=np.asarray(classes).dtype), probas
+
+
+def score_frame(df: pd.DataFrame, model, preprocessor, feature_names, cascade_model=None):
+    """
+    Feature engineering + preprocessor + prédiction sur un DataFrame brut
+    Retourne (predictions, probas) ; probas vaut None si le modèle n'a pas predict_proba
+    """
+    if len(df) == 0:
+        return empty_predictions(model)
+
+    # 1. Feature Engineering
+    df_processed = preprocess_raw_churn(df)
+
+    # 2. Apply preprocessor (scaling + encoding)
+    X = apply_preprocessor(df_processed, preprocessor, feature_names)
+
+    # 3. Predict (+ proba si disponible)
+    return predict_transformed(X, model, cascade_model)
+
+
+# ============================================================================
+# WORKER POOL
+# ============================================================================
+
+def _load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _limit_model_threads(model, n_threads):
+    """Fixe n_jobs sur le modèle (et les étapes d'un Pipeline) si le paramètre existe"""
+    if not hasattr(model, 'get_params'):
+        return
+    params = {k: n_threads for k in model.get_params() if k == 'n_jobs' or k.endswith('__n_jobs')}
+    if params:
+        try:
+            model.set_params(**params)
+        except Exception as e:
+            print(f"⚠️ Impossible de limiter les threads du modèle: {e}")
+
+
+def _load_worker_artifacts(artifact_paths):
+    model_path, preprocessor_path, feature_names_path, cascade_model_path = artifact_paths
+    model = _load_pickle(model_path)
+    _limit_model_threads(model, SCORING_WORKER_THREADS)
+    preprocessor = _load_pickle(preprocessor_path)
+    feature_names = None
+    if feature_names_path and os.path.exists(feature_names_path):
+        feature_names = _load_pickle(feature_names_path)
+    cascade_model = None
+    if cascade_model_path and os.path.exists(cascade_model_path):
+        cascade_model = _load_pickle(cascade_model_path)
+    # Taille estimée comme dans model_pool : pickles sur disque
+    size = os.path.getsize(model_path) + os.path.getsize(preprocessor_path)
+    return (model, preprocessor, feature_names, cascade_model), size
+
+
+def _evict_worker_artifacts(keep):
+    max_entries = MODEL_POOL_MAX_MODELS + 1
+    max_bytes = MODEL_POOL_MAX_MB * 1024 * 1024
+    total = sum(size for _, size in _worker_artifacts.values())
+    while len(_worker_artifacts) > 1 and (len(_worker_artifacts) > max_entries or total > max_bytes):
+        key, (_, size) = next(iter(_worker_artifacts.items()))
+        if key == keep:
+            break
+        del _worker_artifacts[key]
+        total -= size
+
+
+def _score_chunk_task(artifact_paths, chunk: pd.DataFrame):
+    """
+    Tâche exécutée dans un processus du pool
+    Les artefacts sont chargés une seule fois par processus (cache LRU par chemins)
+    """
+    entry = _worker_artifacts.get(artifact_paths)
+    if entry is None:
+        entry = _load_worker_artifacts(artifact_paths)
+        _worker_artifacts[artifact_paths] = entry
+        _evict_worker_artifacts(keep=artifact_paths)
+    else:
+        _worker_artifacts.move_to_end(artifact_paths)
+    artifacts = entry[0]
+
+    before = dict(CASCADE_STATS)
+    predictions, probas = score_frame(chunk, *artifacts)
+    stats_delta = {k: CASCADE_STATS[k] - before.get(k, 0) for k in CASCADE_STATS}
+
+    return predictions, probas, stats_delta
+
+
+def get_pool():
+    """Crée le pool de processus à la première utilisation (un seul, même sous requêtes concurrentes)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn : pas de fork d'un processus qui tourne déjà une boucle asyncio + threads
+            ctx = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=SCORING_WORKERS, mp_context=ctx)
+            print(f"✅ Pool de scoring démarré: {SCORING_WORKERS} workers, chunks de {SCORING_CHUNK_SIZE} lignes")
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def split_chunks(df: pd.DataFrame, chunk_size: int):
+    """Découpe un DataFrame en chunks de lignes consécutives"""
+    return [df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size)]
+
+
+def score_dataframe(df: pd.DataFrame, model, preprocessor, feature_names,
+                    artifact_paths=None, chunk_size: int = None, workers: int = None,
+                    cascade_model=None, deadline=None):
+    """
+    Score un DataFrame brut, en parallèle par chunks s'il est assez gros
+
+    artifact_paths : (model_path, preprocessor_path, feature_names_path, cascade_model_path)
+    utilisés par les workers pour recharger les artefacts. Sans eux, ou pour
+    un petit batch, le scoring reste séquentiel dans le processus courant.
+    deadline : deadlines.Deadline vérifiée avant chaque chunk (requête expirée
+    ou client déconnecté -> les chunks restants ne sont pas soumis)
+    """
+    chunk_size = chunk_size or SCORING_CHUNK_SIZE
+    workers = SCORING_WORKERS if workers is None else workers
+
+    if artifact_paths is None or workers <= 1 or len(df) <= chunk_size:
+        if deadline is not None:
+            deadline.check()
+        return score_frame(df, model, preprocessor, feature_names, cascade_model)
+
+    chunks = split_chunks(df, chunk_size)
+    artifact_paths = tuple(artifact_paths)
+    pool = get_pool()
+
+    # Au plus `workers` chunks soumis d'avance : un arrêt ne laisse rien en file
+    pending = deque()
+    results = []
+    try:
+        for chunk in chunks:
+            if deadline is not None:
+                deadline.check()
+            pending.append(pool.submit(_score_chunk_task, artifact_paths, chunk))
+            if len(pending) >= workers:
+                results.append(pending.popleft().result())
+        while pending:
+            results.append(pending.popleft().result())
+    finally:
+        for future in pending:
+            future.cancel()
+
+    for r in results:
+        record_cascade_stats(r[2])
+
+    predictions = np.concatenate([r[0] for r in results])
+    probas = None
+    if results[0][1] is not None:
+        probas = np.vstack([r[1] for r in results])
+
+    return predictions, probas
@@ -0,0 +1,233 @@
+# api/streaming.py
+"""
+Scoring en streaming via WebSocket (/ws/predict)
+
+Protocole (JSON) :
+    client -> serveur : {"id": "<id client>", "customer": {...CustomerInput...}}
+                        (ou une liste de ces objets dans un même message)
+    serveur -> client : {"type": "ready", "max_in_flight": N, "max_batch": M}
+                        {"type": "results", "results": [{"id": ..., "prediction": ...}, ...]}
+                        {"type": "error", "id": ..., "detail": ...}
+                        {"type": "error", "id": ..., "detail": ..., "retry_after": s}  (admission refusée)
+
+Les enregistrements sont regroupés en micro-batchs (WS_MAX_BATCH lignes ou
+WS_MAX_WAIT_MS), scorés hors de la boucle asyncio, et renvoyés dès qu'un
+batch est prêt : les résultats peuvent arriver dans le désordre, l'id client
+sert à les rapprocher.
+
+Flow control : au plus WS_MAX_IN_FLIGHT enregistrements en cours par
+connexion. Au-delà, le serveur arrête de lire la socket (backpressure TCP).
+Un enregistrement resté en file plus de deadline_s secondes est abandonné
+avant l'inférence (erreur "Deadline dépassée" renvoyée au client).
+
+Admission : chaque micro-batch passe par admit(rows) (trafic interactif,
+même limite par client que /predict) ; refusé, ses enregistrements
+reçoivent une erreur avec retry_after.
+"""
+import asyncio
+import json
+import os
+import time
+
+from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from admission import AdmissionRejected
+from deadlines import DEADLINE_DEFAULTS
+from metrics import METRICS
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+WS_MAX_BATCH = int(os.getenv("WS_MAX_BATCH", "256"))
+WS_MAX_WAIT_MS = float(os.getenv("WS_MAX_WAIT_MS", "10"))
+WS_MAX_IN_FLIGHT = int(os.getenv("WS_MAX_IN_FLIGHT", "2048"))
+WS_MAX_MESSAGE_BYTES = int(os.getenv("WS_MAX_MESSAGE_BYTES", str(1024 * 1024)))
+WS_MAX_CONNECTIONS = int(os.getenv("WS_MAX_CONNECTIONS", "64"))
+
+# Codes de fermeture WebSocket (RFC 6455)
+WS_CLOSE_TOO_BIG = 1009
+WS_CLOSE_TRY_AGAIN = 1013
+
+_active_connections = 0
+
+
+class ScoringStream:
+    """
+    Une connexion WebSocket de scoring
+
+    schema : classe pydantic de validation (CustomerInput)
+    score_records : fonction bloquante list[dict] -> list[dict] (un résultat par ligne)
+    admit : admit(rows) -> Ticket, lève AdmissionRejected (None = pas d'admission)
+    """
+
+    def __init__(self, websocket: WebSocket, schema, score_records,
+                 max_batch: int = None, max_wait_ms: float = None, max_in_flight: int = None,
+                 deadline_s: float = None, admit=None):
+        self.websocket = websocket
+        self.schema = schema
+        self.score_records = score_records
+        self.admit = admit
+        self.max_batch = max_batch or WS_MAX_BATCH
+        self.max_wait = (WS_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+        self.max_in_flight = max_in_flight or WS_MAX_IN_FLIGHT
+        self.deadline_s = deadline_s or DEADLINE_DEFAULTS["/ws/predict"]
+
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.max_in_flight)
+        self.send_lock = asyncio.Lock()
+        self.tasks = set()
+
+    async def run(self):
+        global _active_connections
+
+        if _active_connections >= WS_MAX_CONNECTIONS:
+            await self.websocket.close(code=WS_CLOSE_TRY_AGAIN, reason="Trop de connexions")
+            return
+
+        _active_connections += 1
+        try:
+            await self.websocket.accept()
+            await self._send({
+                "type": "ready",
+                "max_in_flight": self.max_in_flight,
+                "max_batch": self.max_batch,
+            })
+
+            batcher = asyncio.create_task(self._batch_loop())
+            try:
+                await self._receive_loop()
+            finally:
+                batcher.cancel()
+                for task in list(self.tasks):
+                    task.cancel()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            _active_connections -= 1
+
+    # ------------------------------------------------------------------------
+    # RECEPTION
+    # ------------------------------------------------------------------------
+
+    async def _receive_loop(self):
+        while True:
+            # receive() plutôt que receive_text() : une trame binaire lèverait KeyError('text')
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+            data = message.get("text")
+            if data is None:
+                data = message.get("bytes") or b""
+
+            if len(data) > WS_MAX_MESSAGE_BYTES:
+                await self.websocket.close(code=WS_CLOSE_TOO_BIG, reason="Message trop volumineux")
+                return
+
+            # Trame binaire : JSON encodé en UTF-8 accepté, sinon erreur
+            try:
+                text = data if isinstance(data, str) else data.decode("utf-8")
+            except UnicodeDecodeError as e:
+                await self._send({"type": "error", "id": None, "detail": f"Trame binaire non UTF-8: {e}"})
+                continue
+
+            try:
+                payload = json.loads(text)
+            except json.JSONDecodeError as e:
+                await self._send({"type": "error", "id": None, "detail": f"JSON invalide: {e}"})
+                continue
+
+            for item in (payload if isinstance(payload, list) else [payload]):
+                await self._accept_record(item)
+
+    async def _accept_record(self, item):
+        record_id = item.get("id") if isinstance(item, dict) else None
+        if not isinstance(item, dict) or "customer" not in item:
+            await self._send({"type": "error", "id": record_id, "detail": "Format attendu: {\"id\": ..., \"customer\": {...}}"})
+            return
+
+        try:
+            customer = self.schema(**item["customer"])
+        except (ValidationError, TypeError) as e:
+            await self._send({"type": "error", "id": record_id, "detail": str(e)})
+            return
+
+        # Backpressure : on ne lit plus la socket tant que le quota est atteint
+        await self.slots.acquire()
+        await self.queue.put((record_id, customer.dict(), time.monotonic()))
+
+    # ------------------------------------------------------------------------
+    # MICRO-BATCHING
+    # ------------------------------------------------------------------------
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Plusieurs batchs peuvent être en vol : résultats dans le désordre
+            task = asyncio.create_task(self._score_batch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _score_batch(self, batch):
+        try:
+            # Enregistrements restés trop longtemps en file : abandonnés avant l'inférence
+            cutoff = time.monotonic() - self.deadline_s
+            expired = [record_id for record_id, _, queued_at in batch if queued_at < cutoff]
+            if expired:
+                METRICS.inc("churn_deadline_expired_total", len(expired), endpoint="/ws/predict", stage="queue")
+                for record_id in expired:
+                    await self._send({"type": "error", "id": record_id, "detail": "Deadline dépassée"})
+
+            live = [(record_id, record) for record_id, record, queued_at in batch if queued_at >= cutoff]
+            if not live:
+                return
+            ids = [record_id for record_id, _ in live]
+
+            try:
+                ticket = self.admit(len(live)) if self.admit is not None else None
+            except AdmissionRejected as e:
+                retry_after = round(e.retry_after, 3)
+                for record_id in ids:
+                    await self._send({"type": "error", "id": record_id, "detail": e.reason, "retry_after": retry_after})
+                return
+
+            try:
+                loop = asyncio.get_running_loop()
+                try:
+                    results = await loop.run_in_executor(None, self.score_records, [record for _, record in live])
+                finally:
+                    if ticket is not None:
+                        ticket.release()
+                await self._send({
+                    "type": "results",
+                    "results": [dict(result, id=record_id) for record_id, result in zip(ids, results)],
+                })
+            except Exception as e:
+                for record_id in ids:
+                    await self._send({"type": "error", "id": record_id, "detail": f"Erreur de prédiction: {e}"})
+        finally:
+            for _ in batch:
+                self.slots.release()
+
+    async def _send(self, message: dict):
+        async with self.send_lock:
+            try:
+                await self.websocket.send_json(message)
+            except Exception:
+                # Client déconnecté : la boucle de réception s'arrêtera d'elle-même
+                pass
@@ -0,0 +1,316 @@
+"""
+Client HTTP du frontend vers le backend
+
+- Une seule requests.Session (pool de connexions keep-alive) partagée par
+  tous les reruns et toutes les sessions Streamlit (st.cache_resource)
+- /health, /model-info, /features et /analytics en cache avec TTL courts : une fois la
+  première valeur obtenue, un rendu n'attend jamais le réseau. Une entrée
+  expirée est servie telle quelle et rafraîchie en arrière-plan
+  (stale-while-revalidate)
+- Les échecs sont aussi mis en cache : un backend arrêté ne coûte pas un
+  timeout à chaque interaction
+- sweep : courbe what-if d'un champ scorée en un seul /predict-batch, points
+  déjà calculés pour le même client gardés en cache (LRU)
+- score_csv_chunked : gros CSV découpé en chunks scorés par /predict-csv
+  avec un nombre borné de requêtes concurrentes, chaque chunk retenté
+  individuellement en cas d'échec
+"""
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+FRONTEND_POOL_SIZE = int(os.getenv("FRONTEND_POOL_SIZE", "20"))
+FRONTEND_HEALTH_TTL_S = float(os.getenv("FRONTEND_HEALTH_TTL_S", "5"))
+FRONTEND_MODEL_INFO_TTL_S = float(os.getenv("FRONTEND_MODEL_INFO_TTL_S", "300"))
+FRONTEND_FEATURES_TTL_S = float(os.getenv("FRONTEND_FEATURES_TTL_S", "300"))
+FRONTEND_ANALYTICS_TTL_S = float(os.getenv("FRONTEND_ANALYTICS_TTL_S", "30"))
+
+# Durée de vie d'un échec en cache (backend arrêté : nouvel essai après ce délai)
+FRONTEND_ERROR_TTL_S = float(os.getenv("FRONTEND_ERROR_TTL_S", "5"))
+
+# Timeout des appels en cache (seul le tout premier rendu peut l'attendre)
+FRONTEND_CACHE_TIMEOUT_S = float(os.getenv("FRONTEND_CACHE_TIMEOUT_S", "3"))
+
+# Scoring CSV par chunks (Batch Analysis)
+FRONTEND_UPLOAD_CHUNK_ROWS = int(os.getenv("FRONTEND_UPLOAD_CHUNK_ROWS", "5000"))
+FRONTEND_UPLOAD_WORKERS = int(os.getenv("FRONTEND_UPLOAD_WORKERS", "4"))
+FRONTEND_UPLOAD_RETRIES = int(os.getenv("FRONTEND_UPLOAD_RETRIES", "3"))
+FRONTEND_CHUNK_TIMEOUT_S = float(os.getenv("FRONTEND_CHUNK_TIMEOUT_S", "60"))
+
+# What-if (Prediction) : nombre de courbes (client, champ) gardées et leur durée de vie
+FRONTEND_SWEEP_CACHE_SIZE = int(os.getenv("FRONTEND_SWEEP_CACHE_SIZE", "256"))
+FRONTEND_SWEEP_TTL_S = float(os.getenv("FRONTEND_SWEEP_TTL_S", "600"))
+FRONTEND_SWEEP_TIMEOUT_S = float(os.getenv("FRONTEND_SWEEP_TIMEOUT_S", "15"))
+
+# Statuts qui justifient un nouvel essai du chunk (surcharge, redémarrage, deadline)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class ApiError(Exception):
+    """Backend injoignable (status_code None) ou réponse en erreur"""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ChunkProgress:
+    """Avancement d'un scoring par chunks (passé au callback on_progress)"""
+
+    def __init__(self, total_rows: int, total_chunks: int):
+        self.total_rows = total_rows
+        self.total_chunks = total_chunks
+        self.rows_done = 0
+        self.chunks_done = 0
+        self.retries = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows_done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def fraction(self) -> float:
+        return self.rows_done / self.total_rows if self.total_rows else 1.0
+
+
+class _Entry:
+
+    def __init__(self, value=None, error: ApiError = None):
+        self.value = value
+        self.error = error
+        self.fetched_at = time.monotonic()
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+class ApiClient:
+
+    def __init__(self, base_url: str, pool_size: int = None):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or FRONTEND_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._cache = {}
+        self._refreshing = {}  # chemin -> Event du fetch en cours
+        self._sweeps = OrderedDict()  # (client sans le champ, champ) -> _Entry({valeur: proba})
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------------
+    # Appels directs (pool de connexions partagé)
+    # ------------------------------------------------------------------------
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.session.get(self.base_url + path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.session.post(self.base_url + path, **kwargs)
+
+    # ------------------------------------------------------------------------
+    # Cache TTL
+    # ------------------------------------------------------------------------
+
+    def _fetch(self, path: str, done: threading.Event):
+        try:
+            response = self.get(path, timeout=FRONTEND_CACHE_TIMEOUT_S)
+            if response.status_code == 200:
+                entry = _Entry(value=response.json())
+            else:
+                entry = _Entry(error=ApiError(f"HTTP {response.status_code}", response.status_code))
+        except (requests.RequestException, ValueError) as e:
+            entry = _Entry(error=ApiError(str(e)))
+        with self._lock:
+            self._cache[path] = entry
+            self._refreshing.pop(path, None)
+        done.set()
+
+    def _start_refresh(self, path: str) -> threading.Event:
+        """Lance (au plus un) fetch en arrière-plan pour ce chemin"""
+        with self._lock:
+            done = self._refreshing.get(path)
+            if done is None:
+                done = threading.Event()
+                self._refreshing[path] = done
+                threading.Thread(target=self._fetch, args=(path, done), name="api-refresh", daemon=True).start()
+        return done
+
+    def cached_json(self, path: str, ttl: float):
+        """
+        JSON de GET path, depuis le cache si possible
+        Entrée expirée : retournée immédiatement, rafraîchie en arrière-plan
+        Pas encore d'entrée : attend le premier fetch (FRONTEND_CACHE_TIMEOUT_S au plus)
+        Lève ApiError si la dernière tentative a échoué
+        """
+        entry = self._cache.get(path)
+        if entry is None:
+            self._start_refresh(path).wait(FRONTEND_CACHE_TIMEOUT_S + 1)
+            entry = self._cache.get(path)
+            if entry is None:
+                raise ApiError("Backend trop lent à répondre")
+        elif entry.age() > (ttl if entry.error is None else min(ttl, FRONTEND_ERROR_TTL_S)):
+            self._start_refresh(path)
+
+        if entry.error is not None:
+            raise entry.error
+        return entry.value
+
+    def prefetch(self):
+        """Remplit le cache en arrière-plan (au démarrage du frontend)"""
+        for path in ("/health", "/model-info", "/features"):
+            self._start_refresh(path)
+
+    def health(self) -> dict:
+        return self.cached_json("/health", FRONTEND_HEALTH_TTL_S)
+
+    def model_info(self) -> dict:
+        return self.cached_json("/model-info", FRONTEND_MODEL_INFO_TTL_S)
+
+    def features(self) -> dict:
+        return self.cached_json("/features", FRONTEND_FEATURES_TTL_S)
+
+    def analytics(self, days: int = 30) -> dict:
+        return self.cached_json(f"/analytics?days={int(days)}", FRONTEND_ANALYTICS_TTL_S)
+
+    # ------------------------------------------------------------------------
+    # What-if
+    # ------------------------------------------------------------------------
+
+    def _sweep_points(self, base: dict, field: str) -> dict:
+        """Points en cache (valeur -> proba) pour ce client et ce champ, entrée créée si absente"""
+        key = (tuple(sorted((k, v) for k, v in base.items() if k != field)), field)
+        with self._lock:
+            entry = self._sweeps.get(key)
+            if entry is None or entry.age() > FRONTEND_SWEEP_TTL_S:
+                entry = _Entry(value={})
+                self._sweeps[key] = entry
+            self._sweeps.move_to_end(key)
+            while len(self._sweeps) > FRONTEND_SWEEP_CACHE_SIZE:
+                self._sweeps.popitem(last=False)
+        return entry.value
+
+    def sweep(self, base: dict, field: str, values) -> tuple:
+        """
+        Probabilité de churn du client `base` pour chaque valeur de `field`
+        Seuls les points absents du cache partent au backend, en un seul POST
+        /predict-batch (X-Rollup-Skip : lignes synthétiques exclues de /analytics)
+        La clé ignore la valeur actuelle du champ : changer ce seul champ puis
+        relancer réutilise la courbe
+        Retourne (DataFrame [field, churn_probability], nombre de points scorés)
+        """
+        values = list(dict.fromkeys(values))
+        points = self._sweep_points(base, field)
+        missing = [v for v in values if v not in points]
+
+        if missing:
+            try:
+                response = self.post(
+                    "/predict-batch",
+                    json=[{**base, field: v} for v in missing],
+                    headers={
+                        "X-Request-Timeout": f"{FRONTEND_SWEEP_TIMEOUT_S:g}",
+                        "X-Rollup-Skip": "true",
+                    },
+                    timeout=FRONTEND_SWEEP_TIMEOUT_S,
+                )
+            except requests.RequestException as e:
+                raise ApiError(str(e))
+            if response.status_code != 200:
+                raise ApiError(f"HTTP {response.status_code}: {response.text[:200]}", response.status_code)
+
+            scored = [
+                p["probabilities"]["churn"] if p.get("probabilities") else float(p["prediction"])
+                for p in response.json()["predictions"]
+            ]
+            with self._lock:
+                points.update(zip(missing, scored))
+
+        curve = pd.DataFrame({field: values, "churn_probability": [points[v] for v in values]})
+        return curve, len(missing)
+
+    # ------------------------------------------------------------------------
+    # Scoring CSV par chunks
+    # ------------------------------------------------------------------------
+
+    def _score_chunk(self, chunk: pd.DataFrame, name: str, retries: int, progress: ChunkProgress,
+                     lock: threading.Lock) -> pd.DataFrame:
+        """POST d'un chunk sur /predict-csv, retenté (backoff, Retry-After) si l'échec est transitoire"""
+        payload = chunk.to_csv(index=False).encode("utf-8")
+        for attempt in range(retries + 1):
+            retry_after = None
+            try:
+                response = self.post(
+                    "/predict-csv",
+                    files={"file": (name, payload, "text/csv")},
+                    headers={"X-Request-Timeout": f"{FRONTEND_CHUNK_TIMEOUT_S:g}"},
+                    timeout=FRONTEND_CHUNK_TIMEOUT_S,
+                )
+                if response.status_code == 200:
+                    return pd.read_csv(io.BytesIO(response.content))
+                error = ApiError(f"HTTP {response.status_code}: {response.text[:200]}", response.status_code)
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise error
+                retry_after = response.headers.get("Retry-After")
+            except requests.RequestException as e:
+                error = ApiError(str(e))
+
+            if attempt == retries:
+                raise error
+            with lock:
+                progress.retries += 1
+            delay = float(retry_after) if retry_after else 0.5 * 2 ** attempt
+            time.sleep(min(delay, 30.0))
+
+    def score_csv_chunked(self, df: pd.DataFrame, chunk_rows: int = None, workers: int = None,
+                          retries: int = None, on_progress=None, name: str = "batch.csv") -> pd.DataFrame:
+        """
+        Score df par chunks de chunk_rows lignes, au plus `workers` requêtes en parallèle
+        on_progress(ChunkProgress) est appelé depuis le thread appelant à chaque chunk terminé
+        Retourne les résultats de /predict-csv dans l'ordre des lignes de df
+        Lève ApiError si un chunk échoue encore après `retries` nouveaux essais
+        """
+        chunk_rows = chunk_rows or FRONTEND_UPLOAD_CHUNK_ROWS
+        retries = FRONTEND_UPLOAD_RETRIES if retries is None else retries
+        starts = list(range(0, len(df), chunk_rows)) or [0]
+        progress = ChunkProgress(len(df), len(starts))
+        lock = threading.Lock()
+        results = [None] * len(starts)
+
+        executor = ThreadPoolExecutor(max_workers=workers or FRONTEND_UPLOAD_WORKERS)
+        try:
+            futures = {
+                executor.submit(
+                    self._score_chunk, df.iloc[start:start + chunk_rows], name, retries, progress, lock
+                ): i
+                for i, start in enumerate(starts)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                progress.rows_done += len(results[i])
+                progress.chunks_done += 1
+                if on_progress is not None:
+                    on_progress(progress)
+        finally:
+            # Échec d'un chunk : les chunks pas encore envoyés sont abandonnés
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return pd.concat(results, ignore_index=True)
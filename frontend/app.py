@@ -1,11 +1,14 @@
 import streamlit as st
-import requests
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
 import os
 
+import numpy as np
+
+from api_client import ApiClient, ApiError
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -15,12 +18,91 @@ API_URL = os.getenv(
     "http://backend:8000" if os.path.exists("/.dockerenv") else "http://127.0.0.1:8000"
 )
 
+# Champs du panneau what-if : (libellé, min, max, pas)
+# Les champs dérivés de la limite de crédit sont exclus (ils doivent rester cohérents)
+WHATIF_FIELDS = {
+    "total_trans_ct": ("Total transaction count", 0, 150, 1),
+    "total_trans_amt": ("Total transaction amount ($)", 0, 20000, 100),
+    "months_inactive_12_mon": ("Inactive months (last 12 months)", 0, 12, 1),
+    "contacts_count_12_mon": ("Contacts (last 12 months)", 0, 10, 1),
+    "total_relationship_count": ("Products count", 1, 6, 1),
+    "total_ct_chng_q4_q1": ("Transaction count change Q4/Q1", 0.0, 4.0, 0.05),
+    "total_amt_chng_q4_q1": ("Amount change Q4/Q1", 0.0, 4.0, 0.05),
+    "months_on_book": ("Tenure (months)", 0, 80, 1),
+    "customer_age": ("Age", 18, 100, 1),
+}
+
+
+def whatif_grid(low, high, step, points: int, current) -> list:
+    """Valeurs de la grille (alignées sur le pas, sans doublons) + valeur actuelle telle quelle"""
+    snapped = np.round(np.linspace(low, high, points) / step) * step
+    if isinstance(step, int):
+        grid = {int(v) for v in snapped}
+    else:
+        grid = {round(float(v), 4) for v in snapped}
+    # Valeur actuelle ajoutée sans arrondi : souvent hors du pas (ex. 1144 avec un pas de 100)
+    grid.add(current)
+    return sorted(grid)
+
+
+# Tris du tableau de résultats : libellé -> (colonne, décroissant) ; None = ordre du fichier
+RESULT_SORTS = {
+    "File order": None,
+    "Churn probability (high → low)": ("proba_churn", True),
+    "Churn probability (low → high)": ("proba_churn", False),
+}
+
+
+def filtered_result_rows(batch_result: dict, show: str, min_proba: float, sort_by: str) -> np.ndarray:
+    """
+    Positions des lignes à afficher, filtrées et triées sur les colonnes (numpy,
+    sans boucle Python). L'ordre de tri est calculé une fois par résultat et gardé
+    """
+    df = batch_result["df"]
+    mask = np.ones(len(df), dtype=bool)
+    if show != "All":
+        mask &= df["churn_prediction"].to_numpy() == (1 if show == "Churn only" else 0)
+    if min_proba > 0 and "proba_churn" in df.columns:
+        mask &= df["proba_churn"].to_numpy() >= min_proba
+
+    sort = RESULT_SORTS.get(sort_by)
+    if sort is None:
+        return np.flatnonzero(mask)
+
+    orders = batch_result["orders"]
+    if sort_by not in orders:
+        column, descending = sort
+        values = df[column].to_numpy()
+        orders[sort_by] = np.argsort(-values if descending else values, kind="stable")
+    order = orders[sort_by]
+    return order[mask[order]]
+
+
+def churn_row_styles(page: pd.DataFrame) -> pd.DataFrame:
+    """Fond de ligne churn / non-churn, calculé d'un bloc pour la page affichée"""
+    colors = np.where(
+        page["churn_prediction"].to_numpy() == 1, "background-color: #fff1f2", "background-color: #f0fdf4"
+    )
+    return pd.DataFrame(np.repeat(colors[:, None], page.shape[1], axis=1), index=page.index, columns=page.columns)
+
+
+
+@st.cache_resource(show_spinner=False)
+def get_api_client():
+    """Client partagé par tous les reruns et toutes les sessions (pool de connexions + cache)"""
+    client = ApiClient(API_URL)
+    client.prefetch()
+    return client
+
+
 st.set_page_config(
     page_title="Bank Churn Prediction",
     layout="wide",
     initial_sidebar_state="expanded"
 )
 
+api = get_api_client()
+
 # ============================================================================
 # CUSTOM CSS - WHITE / PREMIUM / ENGINEERING-GRADE
 # ============================================================================
@@ -304,20 +386,19 @@ with st.sidebar:
     st.markdown("**System status**")
 
     try:
-        response = requests.get(f"{API_URL}/health", timeout=3)
-        if response.status_code == 200:
-            data = response.json()
-            status = data.get("status", "unknown")
-            if status == "healthy":
-                st.success("API online")
-                st.info("Model loaded")
-            else:
-                st.warning(f"Status: {status}")
+        data = api.health()
+        status = data.get("status", "unknown")
+        if status == "healthy":
+            st.success("API online")
+            st.info("Model loaded")
         else:
+            st.warning(f"Status: {status}")
+    except ApiError as e:
+        if e.status_code is not None:
             st.error("API error")
-    except Exception as e:
-        st.error("API offline")
-        st.caption(f"Error: {str(e)[:70]}")
+        else:
+            st.error("API offline")
+            st.caption(f"Error: {str(e)[:70]}")
 
     st.markdown("<hr/>", unsafe_allow_html=True)
     st.markdown(
@@ -401,9 +482,8 @@ if page == "Dashboard":
     st.markdown("<div style='height: 14px;'></div>", unsafe_allow_html=True)
 
     try:
-        response = requests.get(f"{API_URL}/model-info", timeout=3)
-        if response.status_code == 200:
-            info = response.json()
+        info = api.model_info()
+        if info:
             metrics = info.get("metrics", {})
 
             st.markdown("<div class='paper'>", unsafe_allow_html=True)
@@ -615,9 +695,12 @@ elif page == "Prediction":
                 "avg_utilization_ratio": avg_utilization_ratio,
             }
 
+            st.session_state["whatif_base"] = payload
+
             with st.spinner("Processing..."):
                 try:
-                    response = requests.post(f"{API_URL}/predict", json=payload, timeout=10)
+                    response = api.post("/predict", json=payload, timeout=10,
+                                             headers={"X-Request-Timeout": "10"})
 
                     if response.status_code == 200:
                         result = response.json()
@@ -727,6 +810,82 @@ elif page == "Prediction":
 
     st.markdown("</div>", unsafe_allow_html=True)
 
+    # ------------------------------------------------------------------------
+    # What-if : courbe de probabilité sur un champ, un seul /predict-batch
+    # ------------------------------------------------------------------------
+
+    if "whatif_base" in st.session_state:
+        base = st.session_state["whatif_base"]
+
+        st.markdown("<div style='height: 14px;'></div>", unsafe_allow_html=True)
+        st.markdown("<div class='paper'>", unsafe_allow_html=True)
+        st.markdown("### What-if analysis")
+        st.caption("Vary one attribute of the last predicted customer, all other attributes unchanged.")
+
+        col_w1, col_w2, col_w3 = st.columns([2, 3, 1])
+        with col_w1:
+            whatif_field = st.selectbox(
+                "Attribute",
+                list(WHATIF_FIELDS),
+                format_func=lambda f: WHATIF_FIELDS[f][0],
+            )
+        label, low, high, step = WHATIF_FIELDS[whatif_field]
+        with col_w2:
+            sweep_range = st.slider(
+                "Range", min_value=low, max_value=high, value=(low, high), step=step,
+                key=f"whatif_range_{whatif_field}",
+            )
+        with col_w3:
+            points = st.number_input("Points", min_value=5, max_value=100, value=25, step=5)
+
+        current = base[whatif_field]
+        values = whatif_grid(sweep_range[0], sweep_range[1], step, int(points), current)
+
+        try:
+            curve, scored = api.sweep(base, whatif_field, values)
+
+            curve["churn_pct"] = curve["churn_probability"] * 100
+            fig_whatif = px.line(
+                curve,
+                x=whatif_field,
+                y="churn_pct",
+                markers=True,
+                labels={whatif_field: label, "churn_pct": "Churn probability (%)"},
+            )
+            at_current = curve.loc[np.isclose(curve[whatif_field], current), "churn_probability"]
+            current_proba = float(at_current.iloc[0]) if len(at_current) else None
+            if current_proba is not None:
+                fig_whatif.add_scatter(
+                    x=[current],
+                    y=[current_proba * 100],
+                    mode="markers",
+                    marker=dict(size=13, color="#dc2626"),
+                    name="Current value",
+                )
+            fig_whatif.add_hline(y=70, line_dash="dot", line_color="rgba(220,38,38,0.6)")
+            fig_whatif.add_hline(y=40, line_dash="dot", line_color="rgba(217,119,6,0.6)")
+            fig_whatif.update_layout(
+                paper_bgcolor="white",
+                plot_bgcolor="white",
+                height=380,
+                yaxis_range=[0, 100],
+                showlegend=False,
+                margin=dict(l=20, r=20, t=30, b=20),
+            )
+            st.plotly_chart(fig_whatif, use_container_width=True)
+
+            best = curve.loc[curve["churn_probability"].idxmin()]
+            current_text = f"Current: {current_proba * 100:.1f}% at {current}. " if current_proba is not None else ""
+            st.caption(
+                f"{len(curve)} points, {scored} scored by the API, {len(curve) - scored} from cache. "
+                f"{current_text}"
+                f"Lowest: {best['churn_probability'] * 100:.1f}% at {best[whatif_field]:g}."
+            )
+        except ApiError as e:
+            st.error(f"What-if unavailable: {str(e)[:200]}")
+
+        st.markdown("</div>", unsafe_allow_html=True)
+
 # ============================================================================
 # PAGE 3: BATCH ANALYSIS
 # ============================================================================
@@ -779,168 +938,204 @@ elif page == "Batch Analysis":
         with col2:
             process_btn = st.button("Run batch scoring", use_container_width=True)
 
+        # Résultats gardés en session (colonnaire, pas re-parsés) pour le fichier courant :
+        # pagination, tri et filtres ne relancent pas le scoring
+        file_key = (uploaded_file.name, uploaded_file.size)
+        if st.session_state.get("batch_result", {}).get("file_key") != file_key:
+            st.session_state.pop("batch_result", None)
+
         if process_btn:
             progress_bar = st.progress(0)
             status_text = st.empty()
 
-            status_text.text("Sending file to API...")
-            progress_bar.progress(25)
-
-            try:
-                uploaded_file.seek(0)
-                files = {"file": (uploaded_file.name, uploaded_file, "text/csv")}
-
-                status_text.text("Scoring in progress...")
-                progress_bar.progress(50)
+            def show_progress(p):
+                progress_bar.progress(min(p.fraction, 1.0))
+                retried = f" · {p.retries} retried" if p.retries else ""
+                status_text.text(
+                    f"Scored {p.rows_done:,} / {p.total_rows:,} rows "
+                    f"({p.chunks_done}/{p.total_chunks} chunks) · {p.rows_per_sec:,.0f} rows/s{retried}"
+                )
 
-                response = requests.post(f"{API_URL}/predict-csv", files=files, timeout=60)
+            status_text.text("Sending chunks to API...")
 
-                if response.status_code == 200:
-                    progress_bar.progress(75)
-                    status_text.text("Processing results...")
+            try:
+                result_df = api.score_csv_chunked(df, on_progress=show_progress, name=uploaded_file.name)
+                st.session_state["batch_result"] = {
+                    "file_key": file_key,
+                    "df": result_df,
+                    "orders": {},
+                }
+            except ApiError as e:
+                st.error(f"Erreur API: {str(e)}")
+            except Exception as e:
+                st.error(f"Erreur: {str(e)}")
 
-                    from io import BytesIO
-                    result_df = pd.read_csv(BytesIO(response.content))
+        batch_result = st.session_state.get("batch_result")
 
-                    progress_bar.progress(100)
-                    status_text.text("Done.")
+        if batch_result is not None:
+            result_df = batch_result["df"]
+            has_proba = "proba_churn" in result_df.columns
 
-                    st.markdown("<div style='height: 12px;'></div>", unsafe_allow_html=True)
+            st.markdown("<div style='height: 12px;'></div>", unsafe_allow_html=True)
 
-                    st.markdown("<div class='paper'>", unsafe_allow_html=True)
-                    st.markdown("<h2 style='margin: 0.1rem 0 0.9rem 0;'>Batch results</h2>", unsafe_allow_html=True)
+            st.markdown("<div class='paper'>", unsafe_allow_html=True)
+            st.markdown("<h2 style='margin: 0.1rem 0 0.9rem 0;'>Batch results</h2>", unsafe_allow_html=True)
 
-                    n_churn = result_df["churn_prediction"].sum()
-                    n_total = len(result_df)
-                    churn_rate = (n_churn / n_total) * 100
+            n_churn = int(result_df["churn_prediction"].sum())
+            n_total = len(result_df)
+            churn_rate = (n_churn / n_total) * 100
 
-                    k1, k2, k3, k4 = st.columns(4)
-                    with k1:
-                        st.markdown(
-                            f"""
-                            <div class="grid-card">
-                              <div class="kpi">
-                                <div class="label">Total customers</div>
-                                <div class="value">{n_total}</div>
-                                <div class="sub">Scored in this batch</div>
-                              </div>
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
-                    with k2:
-                        st.markdown(
-                            f"""
-                            <div class="grid-card">
-                              <div class="kpi">
-                                <div class="label">Churn risk</div>
-                                <div class="value" style="color: var(--bad);">{n_churn}</div>
-                                <div class="sub">Predicted churn</div>
-                              </div>
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
-                    with k3:
-                        st.markdown(
-                            f"""
-                            <div class="grid-card">
-                              <div class="kpi">
-                                <div class="label">Retained</div>
-                                <div class="value" style="color: var(--ok);">{n_total - n_churn}</div>
-                                <div class="sub">Predicted non-churn</div>
-                              </div>
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
-                    with k4:
-                        st.markdown(
-                            f"""
-                            <div class="grid-card">
-                              <div class="kpi">
-                                <div class="label">Churn rate</div>
-                                <div class="value" style="color: var(--warn);">{churn_rate:.1f}%</div>
-                                <div class="sub">Share of churn predictions</div>
-                              </div>
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
+            k1, k2, k3, k4 = st.columns(4)
+            with k1:
+                st.markdown(
+                    f"""
+                    <div class="grid-card">
+                      <div class="kpi">
+                        <div class="label">Total customers</div>
+                        <div class="value">{n_total}</div>
+                        <div class="sub">Scored in this batch</div>
+                      </div>
+                    </div>
+                    """,
+                    unsafe_allow_html=True
+                )
+            with k2:
+                st.markdown(
+                    f"""
+                    <div class="grid-card">
+                      <div class="kpi">
+                        <div class="label">Churn risk</div>
+                        <div class="value" style="color: var(--bad);">{n_churn}</div>
+                        <div class="sub">Predicted churn</div>
+                      </div>
+                    </div>
+                    """,
+                    unsafe_allow_html=True
+                )
+            with k3:
+                st.markdown(
+                    f"""
+                    <div class="grid-card">
+                      <div class="kpi">
+                        <div class="label">Retained</div>
+                        <div class="value" style="color: var(--ok);">{n_total - n_churn}</div>
+                        <div class="sub">Predicted non-churn</div>
+                      </div>
+                    </div>
+                    """,
+                    unsafe_allow_html=True
+                )
+            with k4:
+                st.markdown(
+                    f"""
+                    <div class="grid-card">
+                      <div class="kpi">
+                        <div class="label">Churn rate</div>
+                        <div class="value" style="color: var(--warn);">{churn_rate:.1f}%</div>
+                        <div class="sub">Share of churn predictions</div>
+                      </div>
+                    </div>
+                    """,
+                    unsafe_allow_html=True
+                )
 
-                    st.markdown("<div class='rule'></div>", unsafe_allow_html=True)
-                    st.markdown("</div>", unsafe_allow_html=True)
+            st.markdown("<div class='rule'></div>", unsafe_allow_html=True)
+            st.markdown("</div>", unsafe_allow_html=True)
 
-                    st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
+            st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
 
-                    col_viz1, col_viz2 = st.columns(2)
+            col_viz1, col_viz2 = st.columns(2)
 
-                    with col_viz1:
-                        st.markdown("<div class='paper'>", unsafe_allow_html=True)
-                        fig_pie = px.pie(
-                            values=[n_churn, n_total - n_churn],
-                            names=["Churn", "Non-Churn"],
-                            title="Churn distribution",
-                            hole=0.45,
-                        )
-                        fig_pie.update_layout(
-                            paper_bgcolor="white",
-                            plot_bgcolor="white",
-                            height=360,
-                            margin=dict(l=20, r=20, t=60, b=20),
-                        )
-                        st.plotly_chart(fig_pie, use_container_width=True)
-                        st.markdown("</div>", unsafe_allow_html=True)
+            with col_viz1:
+                st.markdown("<div class='paper'>", unsafe_allow_html=True)
+                fig_pie = px.pie(
+                    values=[n_churn, n_total - n_churn],
+                    names=["Churn", "Non-Churn"],
+                    title="Churn distribution",
+                    hole=0.45,
+                )
+                fig_pie.update_layout(
+                    paper_bgcolor="white",
+                    plot_bgcolor="white",
+                    height=360,
+                    margin=dict(l=20, r=20, t=60, b=20),
+                )
+                st.plotly_chart(fig_pie, use_container_width=True)
+                st.markdown("</div>", unsafe_allow_html=True)
 
-                    with col_viz2:
-                        if "proba_churn" in result_df.columns:
-                            st.markdown("<div class='paper'>", unsafe_allow_html=True)
-                            fig_hist = px.histogram(
-                                result_df,
-                                x="proba_churn",
-                                nbins=30,
-                                title="Churn probability distribution",
-                            )
-                            fig_hist.update_layout(
-                                paper_bgcolor="white",
-                                plot_bgcolor="white",
-                                height=360,
-                                xaxis_title="Churn probability",
-                                yaxis_title="Customers",
-                                margin=dict(l=20, r=20, t=60, b=20),
-                            )
-                            st.plotly_chart(fig_hist, use_container_width=True)
-                            st.markdown("</div>", unsafe_allow_html=True)
-
-                    st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
-
-                    col_dl1, col_dl2, col_dl3 = st.columns([1, 2, 1])
-                    with col_dl2:
-                        st.download_button(
-                            label="Download results (CSV)",
-                            data=response.content,
-                            file_name=f"churn_predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                            mime="text/csv",
-                            use_container_width=True,
-                        )
+            with col_viz2:
+                if has_proba:
+                    # Histogramme calculé ici : 30 barres envoyées au navigateur, pas une valeur par client
+                    counts, edges = np.histogram(result_df["proba_churn"].to_numpy(), bins=30, range=(0.0, 1.0))
+                    st.markdown("<div class='paper'>", unsafe_allow_html=True)
+                    fig_hist = px.bar(
+                        x=(edges[:-1] + edges[1:]) / 2,
+                        y=counts,
+                        title="Churn probability distribution",
+                    )
+                    fig_hist.update_traces(width=edges[1] - edges[0])
+                    fig_hist.update_layout(
+                        paper_bgcolor="white",
+                        plot_bgcolor="white",
+                        height=360,
+                        bargap=0.05,
+                        xaxis_title="Churn probability",
+                        yaxis_title="Customers",
+                        margin=dict(l=20, r=20, t=60, b=20),
+                    )
+                    st.plotly_chart(fig_hist, use_container_width=True)
+                    st.markdown("</div>", unsafe_allow_html=True)
 
-                    st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
+            st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
+
+            col_dl1, col_dl2, col_dl3 = st.columns([1, 2, 1])
+            with col_dl2:
+                # CSV sérialisé à la demande, pour ce rerun seulement : la session ne
+                # garde que le DataFrame colonnaire, pas une seconde copie en texte
+                if st.button("Prepare CSV download", use_container_width=True):
+                    st.download_button(
+                        label="Download results (CSV)",
+                        data=result_df.to_csv(index=False).encode("utf-8"),
+                        file_name=f"churn_predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                        mime="text/csv",
+                        use_container_width=True,
+                    )
 
-                    with st.expander("View full table"):
-                        def highlight_churn(row):
-                            if row["churn_prediction"] == 1:
-                                return ["background-color: #fff1f2"] * len(row)
-                            else:
-                                return ["background-color: #f0fdf4"] * len(row)
+            st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
 
-                        styled_df = result_df.style.apply(highlight_churn, axis=1)
-                        st.dataframe(styled_df, use_container_width=True, height=420)
+            with st.expander("View results table", expanded=True):
+                col_f1, col_f2, col_f3, col_f4 = st.columns([2, 2, 2, 1])
+                with col_f1:
+                    show = st.selectbox("Show", ["All", "Churn only", "Non-churn only"])
+                with col_f2:
+                    min_proba = st.slider(
+                        "Min churn probability", 0.0, 1.0, 0.0, 0.05, disabled=not has_proba
+                    )
+                with col_f3:
+                    sort_by = st.selectbox(
+                        "Sort by",
+                        list(RESULT_SORTS) if has_proba else ["File order"],
+                    )
+                with col_f4:
+                    page_size = st.selectbox("Rows / page", [25, 50, 100, 250], index=1)
 
-                else:
-                    st.error(f"Erreur API: {response.text}")
+                rows = filtered_result_rows(batch_result, show, min_proba, sort_by)
+                n_pages = max(1, -(-len(rows) // page_size))
+                page_number = st.number_input(
+                    f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1, step=1
+                )
+                start = (page_number - 1) * page_size
+                page_df = result_df.iloc[rows[start:start + page_size]]
 
-            except Exception as e:
-                st.error(f"Erreur: {str(e)}")
+                st.dataframe(
+                    page_df.style.apply(churn_row_styles, axis=None),
+                    use_container_width=True,
+                    height=min(420, 38 + 35 * len(page_df)),
+                )
+                st.caption(
+                    f"Rows {start + 1 if len(rows) else 0:,}–{start + len(page_df):,} "
+                    f"of {len(rows):,} matching ({n_total:,} scored)"
+                )
 
     else:
         st.info("No file selected yet. Upload a CSV to start batch scoring.")
@@ -965,128 +1160,197 @@ elif page == "Analytics":
 
     st.markdown("<div style='height: 14px;'></div>", unsafe_allow_html=True)
 
-    st.markdown("<div class='paper'>", unsafe_allow_html=True)
-    st.markdown("<h3 style='margin: 0.1rem 0 0.65rem 0;'>Key indicators</h3>", unsafe_allow_html=True)
+    window_days = st.selectbox(
+        "Period",
+        [7, 30, 90, 365],
+        index=1,
+        format_func=lambda d: f"Last {d} days",
+    )
 
-    col1, col2, col3, col4 = st.columns(4)
+    try:
+        analytics = api.analytics(window_days)
+    except ApiError as e:
+        analytics = None
+        st.error(f"Analytics unavailable: {str(e)[:120]}")
 
-    with col1:
-        st.markdown(
-            """
-            <div class="grid-card">
-              <div class="kpi">
-                <div class="label">Total predictions</div>
-                <div class="value">1,247</div>
-                <div class="sub">Rolling 30 days</div>
-              </div>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+    try:
+        model_metrics = api.model_info().get("metrics", {})
+    except ApiError:
+        model_metrics = {}
 
-    with col2:
-        st.markdown(
-            """
-            <div class="grid-card">
-              <div class="kpi">
-                <div class="label">Average churn rate</div>
-                <div class="value" style="color: var(--bad);">16.2%</div>
-                <div class="sub">Change vs previous month</div>
-              </div>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+    if analytics is not None and not analytics["total_rows"]:
+        st.info("No scored data in this period yet. Predictions and ingested monitoring batches will appear here.")
 
-    with col3:
-        st.markdown(
-            """
-            <div class="grid-card">
-              <div class="kpi">
-                <div class="label">Model accuracy</div>
-                <div class="value" style="color: var(--ok);">94.3%</div>
-                <div class="sub">Latest evaluation</div>
-              </div>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+    elif analytics is not None:
+        total_rows = analytics["total_rows"]
+        churn_rate_pct = (analytics["churn_rate"] or 0) * 100
+        risk_counts = analytics["risk_buckets"]["counts"]
+        high_risk = risk_counts.get("high", 0)
+        accuracy = model_metrics.get("accuracy")
 
-    with col4:
-        st.markdown(
-            """
-            <div class="grid-card">
-              <div class="kpi">
-                <div class="label">Saved customers</div>
-                <div class="value" style="color: var(--warn);">89</div>
-                <div class="sub">Preventive actions</div>
-              </div>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+        st.markdown("<div class='paper'>", unsafe_allow_html=True)
+        st.markdown("<h3 style='margin: 0.1rem 0 0.65rem 0;'>Key indicators</h3>", unsafe_allow_html=True)
 
-    st.markdown("</div>", unsafe_allow_html=True)
-    st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
+        col1, col2, col3, col4 = st.columns(4)
 
-    col_chart1, col_chart2 = st.columns(2)
+        with col1:
+            st.markdown(
+                f"""
+                <div class="grid-card">
+                  <div class="kpi">
+                    <div class="label">Total predictions</div>
+                    <div class="value">{total_rows:,}</div>
+                    <div class="sub">Rolling {window_days} days</div>
+                  </div>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+
+        with col2:
+            st.markdown(
+                f"""
+                <div class="grid-card">
+                  <div class="kpi">
+                    <div class="label">Average churn rate</div>
+                    <div class="value" style="color: var(--bad);">{churn_rate_pct:.1f}%</div>
+                    <div class="sub">Predicted churn share</div>
+                  </div>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+
+        with col3:
+            st.markdown(
+                f"""
+                <div class="grid-card">
+                  <div class="kpi">
+                    <div class="label">Model accuracy</div>
+                    <div class="value" style="color: var(--ok);">{f"{accuracy * 100:.1f}%" if accuracy else "N/A"}</div>
+                    <div class="sub">Latest evaluation</div>
+                  </div>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+
+        with col4:
+            st.markdown(
+                f"""
+                <div class="grid-card">
+                  <div class="kpi">
+                    <div class="label">High-risk customers</div>
+                    <div class="value" style="color: var(--warn);">{high_risk:,}</div>
+                    <div class="sub">Churn probability ≥ {analytics["risk_buckets"]["edges"][-1]:.0%}</div>
+                  </div>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
 
-    with col_chart1:
-        st.markdown("<div class='paper'>", unsafe_allow_html=True)
-        dates = pd.date_range(start="2025-01-01", periods=30, freq="D")
-        churn_rate = [15 + i * 0.1 + (i % 5) for i in range(30)]
-
-        fig_trend = px.line(
-            x=dates,
-            y=churn_rate,
-            title="Churn rate trend",
-            labels={"x": "Date", "y": "Churn rate (%)"},
-        )
-        fig_trend.update_layout(
-            paper_bgcolor="white",
-            plot_bgcolor="white",
-            height=360,
-            margin=dict(l=20, r=20, t=60, b=20),
-        )
-        st.plotly_chart(fig_trend, use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
+        st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
+
+        daily = pd.DataFrame(analytics["daily"])
+        by_card = pd.DataFrame.from_dict(
+            analytics["breakdowns"].get("card_category", {}), orient="index"
+        ).rename_axis("card_category").reset_index()
+
+        col_chart1, col_chart2 = st.columns(2)
+
+        with col_chart1:
+            st.markdown("<div class='paper'>", unsafe_allow_html=True)
+            fig_trend = px.line(
+                x=pd.to_datetime(daily["day"]),
+                y=daily["churn_rate"] * 100,
+                title="Churn rate trend",
+                labels={"x": "Date", "y": "Churn rate (%)"},
+                markers=len(daily) < 3,
+            )
+            fig_trend.update_layout(
+                paper_bgcolor="white",
+                plot_bgcolor="white",
+                height=360,
+                margin=dict(l=20, r=20, t=60, b=20),
+            )
+            st.plotly_chart(fig_trend, use_container_width=True)
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        with col_chart2:
+            st.markdown("<div class='paper'>", unsafe_allow_html=True)
+            if not by_card.empty:
+                by_card = by_card.sort_values("rows", ascending=False)
+                fig_bar = px.bar(
+                    x=by_card["card_category"],
+                    y=by_card["churn_rate"] * 100,
+                    title="Churn rate by card category",
+                    labels={"x": "Card category", "y": "Churn rate (%)"},
+                )
+                fig_bar.update_layout(
+                    paper_bgcolor="white",
+                    plot_bgcolor="white",
+                    height=360,
+                    showlegend=False,
+                    margin=dict(l=20, r=20, t=60, b=20),
+                )
+                st.plotly_chart(fig_bar, use_container_width=True)
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
 
-    with col_chart2:
         st.markdown("<div class='paper'>", unsafe_allow_html=True)
-        categories = ["Blue", "Silver", "Gold", "Platinum"]
-        churn_by_card = [18, 15, 12, 8]
-
-        fig_bar = px.bar(
-            x=categories,
-            y=churn_by_card,
-            title="Churn rate by card category",
-            labels={"x": "Card category", "y": "Churn rate (%)"},
+        fig_risk = px.bar(
+            x=[label.capitalize() for label in risk_counts],
+            y=list(risk_counts.values()),
+            title="Customers by risk bucket",
+            labels={"x": "Risk bucket", "y": "Customers"},
         )
-        fig_bar.update_layout(
+        fig_risk.update_layout(
             paper_bgcolor="white",
             plot_bgcolor="white",
-            height=360,
+            height=320,
             showlegend=False,
             margin=dict(l=20, r=20, t=60, b=20),
         )
-        st.plotly_chart(fig_bar, use_container_width=True)
+        st.plotly_chart(fig_risk, use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
-    st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
+        st.markdown("<div style='height: 10px;'></div>", unsafe_allow_html=True)
 
-    st.markdown(
-        """
-        <div class="paper">
-          <h3 style="margin: 0.1rem 0 0.65rem 0;">Actionable insights</h3>
-          <div style="color: rgba(15,23,42,0.70); font-size: 15px; line-height: 1.9;">
-            <ul style="margin-top: 0.25rem;">
-              <li><b>Alert:</b> churn rate increased by 2.1% this month (simulated).</li>
-              <li><b>Highest risk segment:</b> Blue card customers (simulated).</li>
-              <li><b>Operational:</b> 89 at-risk customers were successfully contacted (simulated).</li>
-              <li><b>Model:</b> accuracy at 94.3% on the latest evaluation (simulated).</li>
-            </ul>
-          </div>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+        insights = []
+        if len(daily) >= 2:
+            latest = daily["churn_rate"].iloc[-1] * 100
+            delta = latest - churn_rate_pct
+            insights.append(
+                f"<b>Trend:</b> latest day at {latest:.1f}% churn, "
+                f"{delta:+.1f} pts vs the {window_days}-day average."
+            )
+        significant = by_card[by_card["rows"] >= 30] if not by_card.empty else by_card
+        if not significant.empty:
+            top = significant.sort_values("churn_rate", ascending=False).iloc[0]
+            insights.append(
+                f"<b>Highest risk segment:</b> {top['card_category']} card customers "
+                f"({top['churn_rate'] * 100:.1f}% predicted churn, {int(top['rows']):,} scored)."
+            )
+        insights.append(
+            f"<b>Operational:</b> {high_risk:,} high-risk customers to prioritise for retention actions."
+        )
+        if accuracy:
+            insights.append(f"<b>Model:</b> accuracy at {accuracy * 100:.1f}% on the latest evaluation.")
+        sources = ", ".join(f"{name} ({v['rows']:,})" for name, v in analytics["by_source"].items())
+        insights.append(f"<b>Sources:</b> {sources}.")
+
+        st.markdown(
+            f"""
+            <div class="paper">
+              <h3 style="margin: 0.1rem 0 0.65rem 0;">Actionable insights</h3>
+              <div style="color: rgba(15,23,42,0.70); font-size: 15px; line-height: 1.9;">
+                <ul style="margin-top: 0.25rem;">
+                  {"".join(f"<li>{item}</li>" for item in insights)}
+                </ul>
+              </div>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+Moteur de drift natif (NumPy) : remplace Evidently dans la gate Jenkins
+
+Pour chaque colonne commune à la référence et au batch courant :
+- PSI et Jensen-Shannon sur histogrammes (bornes = quantiles de la référence
+  pour les numériques, modalités pour les catégorielles)
+- KS à deux échantillons (numériques, contre le sketch de répartition)
+- Chi² sur la table de contingence référence / courant
+- contrôles qualité : manquants, valeurs hors plage, modalités inconnues
+
+La référence n'est lue qu'à travers son profil (build_profile : histogrammes
+à bornes fixes, sketch de répartition, effectifs par modalité, statistiques),
+persisté par reference_profile.py : une comparaison ne fait qu'une passe sur
+le batch courant.
+
+Le test qui décide du drift suit la logique du DataDriftPreset d'Evidently :
+- petite référence (≤ DRIFT_SMALL_SAMPLE lignes) : KS (numériques) / chi²
+  (catégorielles), drift si p-value < DRIFT_PVALUE
+- sinon : PSI ≥ DRIFT_PSI_THRESHOLD (numériques), Jensen-Shannon ≥
+  DRIFT_JS_THRESHOLD (catégorielles) ; sur de gros volumes toutes les
+  p-values deviennent significatives
+
+Sortie : même structure que Report.as_dict() d'Evidently
+({"metrics": [{"metric": "DataDriftTable", "result": {"drift_by_columns": ...}}]}),
+consommée par generate_report.analyze_drift_results.
+
+Usage:
+    python drift_engine.py [reference.csv] [current.csv]
+"""
+
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# CONFIG
+# =========================
+DRIFT_BINS = int(os.getenv("DRIFT_BINS", "10"))
+DRIFT_SMALL_SAMPLE = int(os.getenv("DRIFT_SMALL_SAMPLE", "1000"))
+DRIFT_PVALUE = float(os.getenv("DRIFT_PVALUE", "0.05"))
+DRIFT_PSI_THRESHOLD = float(os.getenv("DRIFT_PSI_THRESHOLD", "0.2"))
+DRIFT_JS_THRESHOLD = float(os.getenv("DRIFT_JS_THRESHOLD", "0.1"))
+
+# Part de colonnes en drift au-delà de laquelle tout le dataset est en drift
+DRIFT_SHARE = float(os.getenv("DRIFT_SHARE", "0.5"))
+
+# Lissage des proportions nulles (PSI / Jensen-Shannon)
+EPS = 1e-4
+
+IGNORED_COLUMNS = ["CLIENTNUM", "Unnamed: 21"]
+
+# Profil de référence : taille du sketch de répartition, version du format
+# (changer la version invalide les profils persistés)
+PROFILE_SKETCH_SIZE = int(os.getenv("PROFILE_SKETCH_SIZE", "2048"))
+PROFILE_VERSION = 1
+
+# Contrôles qualité : hausse de la part de manquants, part hors plage / modalités inconnues
+QUALITY_MISSING_DELTA = float(os.getenv("QUALITY_MISSING_DELTA", "0.05"))
+QUALITY_MAX_SHARE = float(os.getenv("QUALITY_MAX_SHARE", "0.01"))
+
+
+# =========================
+# LOIS (p-values sans scipy)
+# =========================
+def chi2_sf(x: float, dof: int) -> float:
+    """
+    P(X > x) pour X ~ chi²(dof), exacte : Q(a, y) avec a = dof/2, y = x/2
+    Q(1/2, y) = erfc(√y), Q(1, y) = e^-y, Q(a+1, y) = Q(a, y) + y^a e^-y / Γ(a+1)
+    """
+    if dof <= 0:
+        return 1.0
+    if x <= 0:
+        return 1.0
+    y = x / 2.0
+    a = 0.5 if dof % 2 else 1.0
+    q = math.erfc(math.sqrt(y)) if dof % 2 else math.exp(-y)
+    while a < dof / 2.0:
+        q += math.exp(a * math.log(y) - y - math.lgamma(a + 1.0))
+        a += 1.0
+    return min(max(q, 0.0), 1.0)
+
+
+def kolmogorov_sf(d: float, n: int, m: int) -> float:
+    """p-value asymptotique du KS à deux échantillons (loi de Kolmogorov)"""
+    ne = n * m / (n + m)
+    lam = (math.sqrt(ne) + 0.12 + 0.11 / math.sqrt(ne)) * d
+    if lam < 0.2:
+        return 1.0
+    k = np.arange(1, 101)
+    p = 2.0 * np.sum((-1.0) ** (k - 1) * np.exp(-2.0 * k ** 2 * lam ** 2))
+    return float(min(max(p, 0.0), 1.0))
+
+
+# =========================
+# STATISTIQUES
+# =========================
+def psi(ref_prop: np.ndarray, cur_prop: np.ndarray) -> float:
+    """Population Stability Index"""
+    p = np.clip(ref_prop, EPS, None)
+    q = np.clip(cur_prop, EPS, None)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def jensenshannon(ref_prop: np.ndarray, cur_prop: np.ndarray) -> float:
+    """Distance de Jensen-Shannon (log naturel, comme scipy / Evidently)"""
+    p = np.clip(ref_prop, EPS, None)
+    q = np.clip(cur_prop, EPS, None)
+    p, q = p / p.sum(), q / q.sum()
+    m = (p + q) / 2.0
+    js = 0.5 * np.sum(p * np.log(p / m)) + 0.5 * np.sum(q * np.log(q / m))
+    return float(np.sqrt(max(js, 0.0)))
+
+
+def chi2_test(ref_counts: np.ndarray, cur_counts: np.ndarray) -> tuple:
+    """Chi² d'homogénéité sur la table 2 × bins (bins vides des deux côtés ignorés)"""
+    table = np.vstack([ref_counts, cur_counts]).astype(float)
+    table = table[:, table.sum(axis=0) > 0]
+    if table.shape[1] < 2 or (table.sum(axis=1) == 0).any():
+        return 0.0, 1.0
+    expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0, keepdims=True) / table.sum()
+    stat = float(np.sum((table - expected) ** 2 / expected))
+    return stat, chi2_sf(stat, table.shape[1] - 1)
+
+
+def ks_test(sketch_values: np.ndarray, sketch_cdf: np.ndarray, n: int, cur_sorted: np.ndarray) -> tuple:
+    """
+    KS à deux échantillons, référence résumée par son sketch de répartition
+    (exact si la colonne a au plus PROFILE_SKETCH_SIZE valeurs distinctes,
+    sinon erreur ≤ 1 / PROFILE_SKETCH_SIZE sur la statistique)
+    """
+    m = len(cur_sorted)
+    if n == 0 or m == 0 or len(sketch_values) == 0:
+        return 0.0, 1.0
+    points = np.concatenate([sketch_values, cur_sorted])
+    idx = np.searchsorted(sketch_values, points, side="right") - 1
+    cdf_ref = np.where(idx >= 0, sketch_cdf[np.maximum(idx, 0)], 0.0)
+    cdf_cur = np.searchsorted(cur_sorted, points, side="right") / m
+    d = float(np.max(np.abs(cdf_ref - cdf_cur)))
+    return d, kolmogorov_sf(d, n, m)
+
+
+# =========================
+# PROFILS
+# =========================
+def is_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def numeric_values(series: pd.Series) -> tuple:
+    """(valeurs triées sans NaN, nb manquants, nb non numériques)"""
+    originally_missing = int(series.isna().sum())
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    missing = np.isnan(values)
+    n_missing = int(missing.sum())
+    return np.sort(values[~missing]), n_missing, n_missing - originally_missing
+
+
+def category_values(series: pd.Series) -> pd.Series:
+    """Effectifs par modalité (espaces retirés, manquants exclus)"""
+    counts = series.value_counts()  # dropna : les manquants sont comptés à part
+    # Nettoyage sur les modalités distinctes seulement, pas sur chaque ligne
+    counts.index = counts.index.astype(str).str.strip()
+    return counts.groupby(level=0, sort=False).sum().sort_values(ascending=False)
+
+
+def quantile_edges(values_sorted: np.ndarray, bins: int) -> np.ndarray:
+    """Bornes intérieures des bins = quantiles de la référence (sans doublons)"""
+    if len(values_sorted) == 0:
+        return np.array([])
+    positions = (np.linspace(0.0, 1.0, bins + 1)[1:-1] * (len(values_sorted) - 1)).round().astype(np.int64)
+    return np.unique(values_sorted[positions])
+
+
+def sorted_counts(values_sorted: np.ndarray, inner_edges: np.ndarray) -> np.ndarray:
+    """Effectifs par bin (]-inf, e1], ]e1, e2], ..., ]ek, +inf[) sur des valeurs triées"""
+    cuts = np.searchsorted(values_sorted, inner_edges, side="right")
+    return np.diff(np.concatenate([[0], cuts, [len(values_sorted)]]))
+
+
+def cdf_sketch(values_sorted: np.ndarray, size: int) -> tuple:
+    """
+    Points (valeur, part des valeurs ≤ valeur) de la fonction de répartition :
+    toutes les valeurs distinctes s'il y en a au plus `size`, sinon `size` quantiles
+    """
+    n = len(values_sorted)
+    if n == 0:
+        return np.array([]), np.array([])
+    last = np.append(np.flatnonzero(np.diff(values_sorted)), n - 1)
+    if len(last) <= size:
+        return values_sorted[last], (last + 1) / n
+    positions = (np.linspace(0.0, 1.0, size) * (n - 1)).round().astype(np.int64)
+    values = np.unique(values_sorted[positions])
+    return values, np.searchsorted(values_sorted, values, side="right") / n
+
+
+def summary_stats(values_sorted: np.ndarray) -> dict:
+    if len(values_sorted) == 0:
+        return {}
+    quantile = lambda q: float(values_sorted[int(round(q * (len(values_sorted) - 1)))])
+    return {
+        "mean": float(values_sorted.mean()),
+        "std": float(values_sorted.std()),
+        "min": float(values_sorted[0]),
+        "p01": quantile(0.01),
+        "p50": quantile(0.5),
+        "p99": quantile(0.99),
+        "max": float(values_sorted[-1]),
+    }
+
+
+def profile_column(series: pd.Series, bins: int = None, sketch_size: int = None) -> dict:
+    """Profil d'une colonne de référence : tout ce qu'il faut pour la comparer sans la relire"""
+    if is_numeric(series):
+        values, missing, _ = numeric_values(series)
+        edges = quantile_edges(values, bins or DRIFT_BINS)
+        sketch_values, sketch_cdf = cdf_sketch(values, sketch_size or PROFILE_SKETCH_SIZE)
+        return {
+            "type": "num",
+            "count": int(len(values)),
+            "missing": missing,
+            "stats": summary_stats(values),
+            "edges": edges.tolist(),
+            "counts": sorted_counts(values, edges).tolist(),
+            "sketch": {"values": sketch_values.tolist(), "cdf": sketch_cdf.tolist()},
+        }
+
+    counts = category_values(series)
+    return {
+        "type": "cat",
+        "count": int(counts.sum()),
+        "missing": int(series.isna().sum()),
+        "categories": {str(k): int(v) for k, v in counts.items()},
+    }
+
+
+def build_profile(reference: pd.DataFrame, bins: int = None, sketch_size: int = None) -> dict:
+    """Profil de toutes les colonnes de la référence (sérialisable en JSON)"""
+    columns = [c for c in reference.columns if c not in IGNORED_COLUMNS]
+    return {
+        "version": PROFILE_VERSION,
+        "rows": len(reference),
+        "bins": bins or DRIFT_BINS,
+        "sketch_size": sketch_size or PROFILE_SKETCH_SIZE,
+        "columns": {c: profile_column(reference[c], bins, sketch_size) for c in columns},
+    }
+
+
+# =========================
+# DRIFT + QUALITÉ PAR COLONNE
+# =========================
+def drift_decision(kind: str, ref_counts: np.ndarray, cur_counts: np.ndarray,
+                   ks_stat, ks_pvalue, reference_rows: int) -> tuple:
+    """
+    Statistiques sur les effectifs par bin et test décisif (logique DataDriftPreset)
+    Retourne (stattests, nom du test, score, seuil, drift détecté)
+    """
+    ref_prop = ref_counts / max(ref_counts.sum(), 1)
+    cur_prop = cur_counts / max(cur_counts.sum(), 1)
+    chi2_stat, chi2_pvalue = chi2_test(ref_counts, cur_counts)
+
+    stattests = {
+        "psi": psi(ref_prop, cur_prop),
+        "ks": ks_stat,
+        "ks_pvalue": ks_pvalue,
+        "jensenshannon": jensenshannon(ref_prop, cur_prop),
+        "chi2": chi2_stat,
+        "chi2_pvalue": chi2_pvalue,
+    }
+
+    small = reference_rows <= DRIFT_SMALL_SAMPLE
+    if small and kind == "num" and ks_pvalue is not None:
+        return stattests, "K-S p_value", ks_pvalue, DRIFT_PVALUE, ks_pvalue < DRIFT_PVALUE
+    if small:
+        return stattests, "chi-square p_value", chi2_pvalue, DRIFT_PVALUE, chi2_pvalue < DRIFT_PVALUE
+    if kind == "num":
+        score = stattests["psi"]
+        return stattests, "PSI", score, DRIFT_PSI_THRESHOLD, score >= DRIFT_PSI_THRESHOLD
+    score = stattests["jensenshannon"]
+    return stattests, "Jensen-Shannon distance", score, DRIFT_JS_THRESHOLD, score >= DRIFT_JS_THRESHOLD
+
+
+def column_drift(ref: dict, cur: pd.Series, reference_rows: int) -> tuple:
+    """
+    Compare une colonne courante au profil de référence (une passe sur la colonne)
+    Retourne (drift au format Evidently, contrôles qualité)
+    """
+    rows = len(cur)
+
+    if ref["type"] == "num":
+        cur_sorted, cur_missing, invalid = numeric_values(cur)
+        edges = np.asarray(ref["edges"], dtype=np.float64)
+        ref_counts = np.asarray(ref["counts"])
+        cur_counts = sorted_counts(cur_sorted, edges)
+        ks_stat, ks_pvalue = ks_test(
+            np.asarray(ref["sketch"]["values"]), np.asarray(ref["sketch"]["cdf"]), ref["count"], cur_sorted
+        )
+        labels = [f"≤{e:g}" for e in edges] + [f">{edges[-1]:g}" if len(edges) else "all"]
+
+        low, high = ref["stats"].get("min", -np.inf), ref["stats"].get("max", np.inf)
+        outside = np.searchsorted(cur_sorted, low, side="left") + len(cur_sorted) - np.searchsorted(cur_sorted, high, side="right")
+        quality = {
+            "non_numeric": invalid,
+            "out_of_range_share": float(outside / rows) if rows else 0.0,
+        }
+    else:
+        cur_values = category_values(cur)
+        cur_missing = int(cur.isna().sum())
+        labels = list(ref["categories"]) + [c for c in cur_values.index if c not in ref["categories"]]
+        ref_counts = np.array([ref["categories"].get(c, 0) for c in labels])
+        cur_counts = cur_values.reindex(labels, fill_value=0).to_numpy()
+        ks_stat, ks_pvalue = None, None
+
+        unseen = [c for c in labels if c not in ref["categories"]]
+        quality = {
+            "unseen_categories": unseen[:20],
+            "unseen_share": float(cur_values.reindex(unseen).sum() / rows) if rows and unseen else 0.0,
+        }
+
+    quality["missing_share"] = {
+        "reference": ref["missing"] / reference_rows if reference_rows else 0.0,
+        "current": cur_missing / rows if rows else 0.0,
+    }
+
+    ref_prop = ref_counts / max(ref_counts.sum(), 1)
+    cur_prop = cur_counts / max(cur_counts.sum(), 1)
+    stattests, name, score, threshold, detected = drift_decision(
+        ref["type"], ref_counts, cur_counts, ks_stat, ks_pvalue, reference_rows
+    )
+
+    drift = {
+        "column_name": cur.name,
+        "column_type": ref["type"],
+        "stattest_name": name,
+        "stattest_threshold": threshold,
+        "drift_score": float(score),
+        "drift_detected": bool(detected),
+        "stattests": stattests,
+        "reference": {"small_distribution": {"x": labels, "y": ref_prop.round(6).tolist()}},
+        "current": {"small_distribution": {"x": labels, "y": cur_prop.round(6).tolist()}},
+    }
+    return drift, quality
+
+
+def quality_issues(column: str, quality: dict) -> list:
+    issues = []
+    missing = quality["missing_share"]
+    if missing["current"] - missing["reference"] > QUALITY_MISSING_DELTA:
+        issues.append(f"{column}: {missing['current']:.1%} de valeurs manquantes (référence {missing['reference']:.1%})")
+    if quality.get("non_numeric"):
+        issues.append(f"{column}: {quality['non_numeric']} valeur(s) non numérique(s)")
+    if quality.get("out_of_range_share", 0.0) > QUALITY_MAX_SHARE:
+        issues.append(f"{column}: {quality['out_of_range_share']:.1%} hors de la plage de référence")
+    if quality.get("unseen_share", 0.0) > QUALITY_MAX_SHARE:
+        issues.append(f"{column}: {quality['unseen_share']:.1%} de modalités inconnues {quality['unseen_categories']}")
+    return issues
+
+
+def compare_to_profile(profile: dict, current: pd.DataFrame, columns=None) -> dict:
+    """
+    Drift et qualité du batch courant contre un profil de référence
+    Une seule passe sur chaque colonne du batch ; la référence n'est pas relue
+    Retourne un dict au format Report.as_dict() d'Evidently
+    """
+    if columns is None:
+        columns = [c for c in profile["columns"] if c in current.columns]
+    missing_columns = [c for c in profile["columns"] if c not in current.columns]
+
+    drift_by_columns, quality_by_columns = {}, {}
+    issues = [f"{c}: colonne absente du batch courant" for c in missing_columns]
+    for c in columns:
+        drift_by_columns[c], quality_by_columns[c] = column_drift(profile["columns"][c], current[c], profile["rows"])
+        issues += quality_issues(c, quality_by_columns[c])
+
+    n_drifted = sum(d["drift_detected"] for d in drift_by_columns.values())
+    share = n_drifted / len(columns) if columns else 0.0
+
+    summary = {
+        "drift_share": DRIFT_SHARE,
+        "number_of_columns": len(columns),
+        "number_of_drifted_columns": n_drifted,
+        "share_of_drifted_columns": share,
+        "dataset_drift": bool(columns) and share >= DRIFT_SHARE,
+    }
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "engine": "native",
+        "rows": {"reference": profile["rows"], "current": len(current)},
+        "metrics": [
+            {"metric": "DatasetDriftMetric", "result": summary},
+            {"metric": "DataDriftTable", "result": {**summary, "drift_by_columns": drift_by_columns}},
+            {"metric": "DataQualityTable", "result": {
+                "issues": issues,
+                "missing_columns": missing_columns,
+                "quality_by_columns": quality_by_columns,
+            }},
+        ],
+    }
+
+
+def compute_drift(reference: pd.DataFrame, current: pd.DataFrame, columns=None, bins: int = None) -> dict:
+    """Drift de deux DataFrames (profil de la référence construit à la volée)"""
+    if columns is not None:
+        reference = reference[columns]
+    return compare_to_profile(build_profile(reference, bins), current, columns)
+
+
+def metric_result(report: dict, name: str) -> dict:
+    return next((m["result"] for m in report["metrics"] if m["metric"] == name), {})
+
+
+# =========================
+# RAPPORT HTML
+# =========================
+def distribution_svg(ref_y, cur_y, width: int = 160, height: int = 36) -> str:
+    """Mini histogramme référence (gris) / courant (bleu)"""
+    n = len(ref_y)
+    if n == 0:
+        return ""
+    top = max(max(ref_y), max(cur_y), 1e-9)
+    bar = width / n
+    rects = []
+    for i, (r, c) in enumerate(zip(ref_y, cur_y)):
+        for j, (v, color) in enumerate(((r, "#7f8ea8"), (c, "#4c8dff"))):
+            h = height * v / top
+            rects.append(
+                f'<rect x="{i * bar + j * bar / 2:.1f}" y="{height - h:.1f}" '
+                f'width="{bar / 2 - 0.5:.1f}" height="{h:.1f}" fill="{color}"/>'
+            )
+    return f'<svg width="{width}" height="{height}">{"".join(rects)}</svg>'
+
+
+def fmt(x, nd=3):
+    if x is None:
+        return "—"
+    return f"{x:.{nd}g}" if abs(x) < 1e-3 and x != 0 else f"{x:.{nd}f}"
+
+
+def build_drift_html(report: dict) -> str:
+    """Rapport HTML autonome (même thème que performance_report.html)"""
+    table = metric_result(report, "DataDriftTable")
+    issues = metric_result(report, "DataQualityTable").get("issues", [])
+    columns = sorted(table["drift_by_columns"].values(), key=lambda d: not d["drift_detected"])
+    issues_html = "".join(f"<li>{i}</li>" for i in issues) if issues else "<li>No data quality issues ✅</li>"
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    rows_html = "".join(
+        f"""
+        <tr>
+          <td>{d["column_name"]}</td>
+          <td>{d["column_type"]}</td>
+          <td>{distribution_svg(d["reference"]["small_distribution"]["y"], d["current"]["small_distribution"]["y"])}</td>
+          <td>{d["stattest_name"]}</td>
+          <td>{fmt(d["drift_score"])} <span class="muted">/ {d["stattest_threshold"]:g}</span></td>
+          <td>{fmt(d["stattests"]["psi"])}</td>
+          <td>{fmt(d["stattests"]["ks"])}</td>
+          <td>{fmt(d["stattests"]["jensenshannon"])}</td>
+          <td>{fmt(d["stattests"]["chi2_pvalue"])}</td>
+          <td><span class="pill {"bad" if d["drift_detected"] else "good"}">{"Drift" if d["drift_detected"] else "OK"}</span></td>
+        </tr>
+        """
+        for d in columns
+    )
+
+    return f"""
+<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8"/>
+  <meta name="viewport" content="width=device-width, initial-scale=1"/>
+  <title>Data Drift Monitoring</title>
+  <style>
+    :root {{
+      --bg: #0b0f17;
+      --card: #121a27;
+      --text: #e8eefc;
+      --muted: #9fb0d0;
+      --good: #1db954;
+      --bad: #ff4d4d;
+      --border: rgba(255,255,255,0.08);
+    }}
+    body {{ margin: 0; font-family: Inter, Arial, sans-serif; background: var(--bg); color: var(--text); }}
+    .container {{ max-width: 1200px; margin: 0 auto; padding: 28px; }}
+    h1 {{ margin: 0 0 6px 0; font-size: 32px; }}
+    .sub, .muted {{ color: var(--muted); }}
+    .sub {{ margin-bottom: 18px; }}
+    .grid {{ display: grid; grid-template-columns: repeat(4, 1fr); gap: 14px; }}
+    .card {{
+      background: var(--card); border: 1px solid var(--border); border-radius: 16px;
+      padding: 14px; box-shadow: 0 10px 25px rgba(0,0,0,0.25);
+    }}
+    .kpi-title {{ color: var(--muted); font-size: 13px; margin-bottom: 6px; }}
+    .kpi-val {{ font-size: 26px; font-weight: 700; }}
+    .section {{ margin-top: 18px; }}
+    table {{ width: 100%; border-collapse: collapse; font-size: 14px; }}
+    th, td {{ text-align: left; border-bottom: 1px solid var(--border); padding: 8px; }}
+    th {{ color: var(--muted); font-weight: 600; }}
+    .pill {{ display: inline-block; padding: 4px 10px; border-radius: 999px; border: 1px solid var(--border); font-weight: 700; }}
+    .pill.good {{ color: var(--good); }}
+    .pill.bad {{ color: var(--bad); }}
+  </style>
+</head>
+<body>
+  <div class="container">
+    <h1>Data Drift Monitoring</h1>
+    <div class="sub">
+      Generated: {now} • Reference: {report["rows"]["reference"]:,} rows • Current: {report["rows"]["current"]:,} rows
+    </div>
+
+    <div class="grid">
+      <div class="card"><div class="kpi-title">Columns</div><div class="kpi-val">{table["number_of_columns"]}</div></div>
+      <div class="card"><div class="kpi-title">Drifted columns</div><div class="kpi-val">{table["number_of_drifted_columns"]}</div></div>
+      <div class="card"><div class="kpi-title">Share drifted</div><div class="kpi-val">{table["share_of_drifted_columns"] * 100:.1f}%</div></div>
+      <div class="card"><div class="kpi-title">Dataset drift</div>
+        <div class="kpi-val" style="color: var(--{"bad" if table["dataset_drift"] else "good"});">{"Yes" if table["dataset_drift"] else "No"}</div></div>
+    </div>
+
+    <div class="section card">
+      <table>
+        <thead>
+          <tr>
+            <th>Column</th><th>Type</th><th>Reference / Current</th><th>Test</th><th>Score / threshold</th>
+            <th>PSI</th><th>KS</th><th>Jensen-Shannon</th><th>Chi² p-value</th><th>Status</th>
+          </tr>
+        </thead>
+        <tbody>{rows_html}</tbody>
+      </table>
+    </div>
+
+    <div class="section card">
+      <h2 style="font-size: 18px; margin: 0 0 10px 0;">Data quality</h2>
+      <ul>{issues_html}</ul>
+    </div>
+  </div>
+</body>
+</html>
+"""
+
+
+# =========================
+# MAIN
+# =========================
+if __name__ == "__main__":
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    ref_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(data_dir, "reference_data.csv")
+    cur_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(data_dir, "current_data.csv")
+
+    reference_data = pd.read_csv(ref_path)
+    current_data = pd.read_csv(cur_path)
+
+    start = time.perf_counter()
+    result = compute_drift(reference_data, current_data)
+    elapsed = time.perf_counter() - start
+
+    table = metric_result(result, "DataDriftTable")
+    for name, d in table["drift_by_columns"].items():
+        flag = "⚠️ " if d["drift_detected"] else "✅"
+        print(f"{flag} {name:28s} {d['stattest_name']:24s} {d['drift_score']:.4f}")
+    print(f"\n📊 {table['number_of_drifted_columns']}/{table['number_of_columns']} colonnes en drift "
+          f"({len(reference_data):,} / {len(current_data):,} lignes) en {elapsed:.2f}s")
+    for issue in metric_result(result, "DataQualityTable")["issues"]:
+        print(f"⚠️  Qualité: {issue}")
@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 """
 Script de monitoring combiné : Data Drift + Performance
-Compatible avec Evidently (versions récentes)
+Drift calculé par le moteur natif (drift_engine.py) ; Evidently reste
+utilisable avec DRIFT_ENGINE=evidently
 """
 
 import os
 import json
+import time
 from datetime import datetime
 
 import pandas as pd
+from score_data import load_scores, scored_profile, with_scores
 from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, f1_score,
     roc_auc_score, confusion_matrix
@@ -21,6 +24,9 @@ PRED = "prediction"
 PROBA = "proba"
 TARGET_CANDIDATES = ["churn", "Attrition_Flag"]
 
+# "native" (drift_engine.py, NumPy seul) ou "evidently"
+DRIFT_ENGINE = os.getenv("DRIFT_ENGINE", "native").lower()
+
 
 # =========================
 # HELPER FUNCTIONS
@@ -262,17 +268,63 @@ def build_performance_html(data: dict) -> str:
 # =========================
 # DRIFT PART
 # =========================
-def run_drift(reference_data: pd.DataFrame, current_data: pd.DataFrame, base_dir: str):
+def run_drift(ref_path: str, current_data: pd.DataFrame, base_dir: str, reference_scores: pd.DataFrame = None):
     """
-    Génère le rapport de drift avec Evidently
-    Essaie différents imports pour compatibilité
+    Génère le rapport de drift (monitoring_report.html + monitoring_tests.json)
+    La référence est lue à travers son profil persistant (reference_profile.py),
+    scores en cache inclus (drift des prédictions)
     """
     
     print("📊 Génération du rapport Data Drift...")
     
     # Nettoyage des colonnes inutiles
-    for df in (reference_data, current_data):
-        df.drop(columns=["CLIENTNUM", "Unnamed: 21"], errors="ignore", inplace=True)
+    current_data.drop(columns=["CLIENTNUM", "Unnamed: 21"], errors="ignore", inplace=True)
+    
+    if DRIFT_ENGINE == "evidently":
+        reference_data = pd.read_csv(ref_path).drop(columns=["CLIENTNUM", "Unnamed: 21"], errors="ignore")
+        if reference_scores is not None:
+            reference_data = with_scores(reference_data, reference_scores)
+        return run_evidently_drift(reference_data, current_data, base_dir)
+    
+    try:
+        from drift_engine import build_drift_html, compare_to_profile, metric_result
+        
+        print("✅ Utilisation du moteur de drift natif (PSI, KS, Jensen-Shannon, chi²)")
+        
+        profile = scored_profile(ref_path, reference_scores)
+        
+        start = time.perf_counter()
+        report_dict = compare_to_profile(profile, current_data)
+        print(f"   Comparaison au profil terminée en {time.perf_counter() - start:.2f}s")
+        
+        report_path = os.path.join(base_dir, "monitoring_report.html")
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(build_drift_html(report_dict))
+        print(f"✅ Rapport HTML sauvegardé: {report_path}")
+        
+        json_path = os.path.join(base_dir, "monitoring_tests.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report_dict, f, indent=2)
+        print(f"✅ Rapport JSON sauvegardé: {json_path}")
+        
+        analyze_drift_results(report_dict)
+        for issue in metric_result(report_dict, "DataQualityTable")["issues"]:
+            print(f"⚠️  Qualité: {issue}")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Erreur lors de la génération du rapport de drift: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def run_evidently_drift(reference_data: pd.DataFrame, current_data: pd.DataFrame, base_dir: str):
+    """
+    Génère le rapport de drift avec Evidently (DRIFT_ENGINE=evidently)
+    Essaie différents imports pour compatibilité
+    """
     
     try:
         # ===== TENTATIVE 1: API moderne (Evidently >= 0.4.0) =====
@@ -406,7 +458,7 @@ def main():
         print("❌ Erreur: Fichiers de données introuvables.")
         print(f"   Reference: {ref_path}")
         print(f"   Current: {cur_path}")
-        print("\n💡 Exécutez d'abord: python prepare_data.py && python score_data.py")
+        print("\n💡 Exécutez d'abord: python prepare_data.py (lance score_data.py)")
         return
 
     print(f"✅ Fichiers trouvés:")
@@ -415,14 +467,16 @@ def main():
 
     # Charger les données
     print("\n📥 Chargement des données...")
-    reference_data = pd.read_csv(ref_path)
+    # La référence complète n'est lue que pour construire son profil (une fois) :
+    # ici seulement la cible et les prédictions (cache de score_data.py), pour la performance
+    reference_data = load_scores(ref_path)
     current_data = pd.read_csv(cur_path)
+    current_scores = load_scores(cur_path)
 
-    print(f"   Reference shape: {reference_data.shape}")
     print(f"   Current shape: {current_data.shape}")
     
-    # Vérifier si les colonnes de prédiction existent
-    has_predictions = PRED in reference_data.columns and PRED in current_data.columns
+    # Vérifier si les scores sont en cache pour ces données et ce modèle
+    has_predictions = reference_data is not None and current_scores is not None
     
     if not has_predictions:
         print("\n⚠️ Colonnes de prédiction manquantes!")
@@ -436,9 +490,9 @@ def main():
                                   capture_output=True, text=True, cwd=base_dir)
             if result.returncode == 0:
                 print("✅ Scoring terminé avec succès!")
-                # Recharger les données
-                reference_data = pd.read_csv(ref_path)
-                current_data = pd.read_csv(cur_path)
+                # Recharger les scores
+                reference_data = load_scores(ref_path)
+                current_scores = load_scores(cur_path)
             else:
                 print("❌ Erreur lors du scoring:")
                 print(result.stderr)
@@ -454,7 +508,11 @@ def main():
     print("🔍 PARTIE 1: ANALYSE DU DRIFT")
     print("="*80)
     
-    drift_success = run_drift(reference_data.copy(), current_data.copy(), base_dir)
+    has_predictions = reference_data is not None and current_scores is not None
+    if has_predictions:
+        current_data = with_scores(current_data, current_scores)
+
+    drift_success = run_drift(ref_path, current_data.copy(), base_dir, reference_scores=reference_data)
 
     # ===== 2) PERFORMANCE =====
     print("\n" + "="*80)
@@ -462,7 +520,7 @@ def main():
     print("="*80)
 
     # Vérifier les colonnes nécessaires
-    if PRED not in reference_data.columns or PRED not in current_data.columns:
+    if not has_predictions:
         print("❌ Colonne 'prediction' toujours manquante après le scoring.")
         print("   Le monitoring de performance est ignoré.")
         return
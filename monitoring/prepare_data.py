@@ -4,6 +4,12 @@ import subprocess
 import sys
 import glob
 
+from reference_profile import file_sha256
+
+# Colonnes de scores : dans le cache de score_data.py, plus dans les CSV
+# (un reference_data.csv qui les contient date d'avant le cache et est réécrit)
+SCORE_COLUMNS = ["churn", "prediction", "proba"]
+
 def get_latest_prod_file(data_dir):
     """
     Trouve automatiquement le fichier de données le plus récent
@@ -60,11 +66,30 @@ def prepare_data():
     print(f"🆕 Current:   {os.path.basename(current_path)}")
     print("="*60 + "\n")
 
+    os.makedirs(data_dir, exist_ok=True)
+    ref_out = os.path.join(data_dir, "reference_data.csv")
+    cur_out = os.path.join(data_dir, "current_data.csv")
+
+    # La référence ne change jamais : reference_data.csv n'est relue et réécrite
+    # que si churn2.csv ou reference_data.csv lui-même ont changé (hash des deux
+    # mémorisés à côté : "<sha churn2.csv> <sha reference_data.csv>")
+    stamp_path = ref_out + ".sha256"
+    source_sha = file_sha256(reference_path)
+    stamp = ""
+    if os.path.exists(ref_out) and os.path.exists(stamp_path):
+        with open(stamp_path) as f:
+            stamp = f.read().strip()
+    reference_unchanged = (
+        stamp != ""
+        and stamp == f"{source_sha} {file_sha256(ref_out)}"
+        and not set(SCORE_COLUMNS) & set(pd.read_csv(ref_out, nrows=0).columns)
+    )
+
     # -----------------------------
     # LOAD CSV
     # -----------------------------
     try:
-        reference_data = pd.read_csv(reference_path)
+        reference_data = None if reference_unchanged else pd.read_csv(reference_path)
         current_data = pd.read_csv(current_path)
     except FileNotFoundError as e:
         print(f"❌ Error: {e}")
@@ -73,35 +98,41 @@ def prepare_data():
         print(f"❌ Error loading files: {e}")
         return
 
-    print(f"✅ Reference data loaded. Shape: {reference_data.shape}")
+    if reference_unchanged:
+        print(f"♻️ Reference inchangée (sha256 {source_sha[:12]}), reference_data.csv réutilisé")
+    else:
+        print(f"✅ Reference data loaded. Shape: {reference_data.shape}")
     print(f"✅ Current data loaded. Shape: {current_data.shape}")
 
     # -----------------------------
     # CLEANING
     # -----------------------------
     drop_cols = ["Unnamed: 21", "CLIENTNUM"]
-    reference_data = reference_data.drop(columns=drop_cols, errors="ignore")
     current_data = current_data.drop(columns=drop_cols, errors="ignore")
+    if not reference_unchanged:
+        reference_data = reference_data.drop(columns=drop_cols, errors="ignore")
 
     # Nettoyer les espaces dans les catégories
     cat_cols = ["Gender", "Education_Level", "Marital_Status", 
                 "Income_Category", "Card_Category", "Attrition_Flag"]
     
     for c in cat_cols:
-        if c in reference_data.columns:
+        if reference_data is not None and c in reference_data.columns:
             reference_data[c] = reference_data[c].astype(str).str.strip()
         if c in current_data.columns:
             current_data[c] = current_data[c].astype(str).str.strip()
 
     print(f"\n🧹 Nettoyage effectué")
-    print(f"   Reference shape: {reference_data.shape}")
     print(f"   Current shape: {current_data.shape}")
 
     # -----------------------------
     # Vérifier que les colonnes matchent
     # -----------------------------
-    ref_cols = set(reference_data.columns)
-    cur_cols = set(current_data.columns)
+    if reference_unchanged:
+        ref_cols = set(pd.read_csv(ref_out, nrows=0).columns)
+    else:
+        ref_cols = set(reference_data.columns)
+    cur_cols = set(current_data.columns) - set(SCORE_COLUMNS)
     only_in_ref = sorted(list(ref_cols - cur_cols))
     only_in_cur = sorted(list(cur_cols - ref_cols))
 
@@ -115,16 +146,15 @@ def prepare_data():
     # -----------------------------
     # SAVE FILES
     # -----------------------------
-    os.makedirs(data_dir, exist_ok=True)
-
-    ref_out = os.path.join(data_dir, "reference_data.csv")
-    cur_out = os.path.join(data_dir, "current_data.csv")
-
-    reference_data.to_csv(ref_out, index=False)
+    if not reference_unchanged:
+        reference_data.to_csv(ref_out, index=False)
+        with open(stamp_path, "w") as f:
+            f.write(f"{source_sha} {file_sha256(ref_out)}")
     current_data.to_csv(cur_out, index=False)
 
     print(f"\n💾 Fichiers sauvegardés:")
-    print(f"   Reference: {ref_out}")
+    if not reference_unchanged:
+        print(f"   Reference: {ref_out}")
     print(f"   Current:   {cur_out}")
 
 
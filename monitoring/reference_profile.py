@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Profil de référence persistant pour le monitoring
+
+Le dataset de référence ne change jamais : son profil (drift_engine.build_profile)
+est construit une fois et sauvegardé dans data/profiles/, sous une clé dérivée
+du hash SHA-256 du contenu du fichier et des paramètres du profil (bins, taille
+du sketch, version du format). Les runs suivants relisent ce JSON (quelques
+centaines de Ko) au lieu de re-parser et re-profiler la référence.
+
+Les scores de la référence (churn / prediction / proba) ne sont plus dans le
+CSV mais dans le cache de score_data.py : ils sont passés en `extra` et le nom
+de leur fichier (déjà dérivé des hash du CSV, du modèle et du preprocessor)
+entre dans la clé du profil.
+
+Usage:
+    python reference_profile.py [reference.csv]   # construit ou retrouve le profil
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from drift_engine import DRIFT_BINS, PROFILE_SKETCH_SIZE, PROFILE_VERSION, build_profile
+
+# =========================
+# CONFIG
+# =========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "data", "profiles"))
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Hash du contenu, lu par blocs (mémoire constante)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def profile_path(data_path: str, sha: str = None, profile_dir: str = None, extra_key: str = "") -> str:
+    """Chemin du profil pour ce contenu, ces paramètres et ces colonnes additionnelles"""
+    sha = sha or file_sha256(data_path)
+    params = hashlib.sha256(f"{PROFILE_VERSION}|{DRIFT_BINS}|{PROFILE_SKETCH_SIZE}|{extra_key}".encode()).hexdigest()
+    name = os.path.splitext(os.path.basename(data_path))[0]
+    return os.path.join(profile_dir or PROFILE_DIR, f"{name}-{sha[:16]}-{params[:8]}.json")
+
+
+def load_or_build_profile(data_path: str, profile_dir: str = None,
+                          extra: pd.DataFrame = None, extra_key: str = "") -> dict:
+    """
+    Profil du fichier de référence : relu depuis le disque si le contenu n'a pas
+    changé, sinon construit (une lecture du CSV) puis sauvegardé
+    extra : colonnes ajoutées au CSV avant profilage (mêmes lignes), identifiées par extra_key
+    """
+    sha = file_sha256(data_path)
+    path = profile_path(data_path, sha, profile_dir, extra_key)
+
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+        print(f"♻️ Profil de référence réutilisé: {os.path.basename(path)}")
+        return profile
+
+    start = time.perf_counter()
+    reference = pd.read_csv(data_path)
+    if extra is not None:
+        if len(extra) != len(reference):
+            raise ValueError(f"Colonnes additionnelles ({len(extra)} lignes) incohérentes avec {data_path} ({len(reference)} lignes)")
+        reference = pd.concat([reference.drop(columns=extra.columns, errors="ignore"), extra.reset_index(drop=True)], axis=1)
+    profile = build_profile(reference)
+    profile["source"] = {"path": os.path.basename(data_path), "sha256": sha}
+
+    # Écriture atomique : un run interrompu ne laisse pas de profil tronqué
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(profile, f)
+    os.replace(tmp_path, path)
+
+    print(f"🧮 Profil de référence construit en {time.perf_counter() - start:.2f}s: {os.path.basename(path)}")
+    return profile
+
+
+if __name__ == "__main__":
+    data_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(BASE_DIR, "data", "reference_data.csv")
+    if not os.path.exists(data_path):
+        print(f"❌ Fichier introuvable: {data_path}")
+        sys.exit(1)
+
+    profile = load_or_build_profile(data_path)
+    print(f"   {profile['rows']:,} lignes, {len(profile['columns'])} colonnes")
@@ -3,6 +3,7 @@ import json
 from datetime import datetime
 
 import pandas as pd
+from score_data import load_scores, with_scores
 from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, f1_score,
     roc_auc_score, confusion_matrix
@@ -368,6 +369,12 @@ def main():
     reference_data = pd.read_csv(ref_path)
     current_data = pd.read_csv(cur_path)
 
+    # Scores du cache de score_data.py (les CSV ne contiennent que les données brutes)
+    reference_scores, current_scores = load_scores(ref_path), load_scores(cur_path)
+    if reference_scores is not None and current_scores is not None:
+        reference_data = with_scores(reference_data, reference_scores)
+        current_data = with_scores(current_data, current_scores)
+
     print(f"   Reference shape: {reference_data.shape}")
     print(f"   Current shape: {current_data.shape}")
     print("")
@@ -1,8 +1,28 @@
+"""
+Scoring des données de monitoring (reference_data.csv, current_data.csv)
+
+Les CSV ne sont plus modifiés : les scores (cible binaire, prédiction, proba)
+sont écrits dans un fichier compact à côté, data/scores/<fichier>-<sha CSV>-
+<sha modèle>-<sha preprocessor>.scores (10 octets par ligne). Tant que le CSV,
+le modèle et le preprocessor n'ont pas changé, la clé est la même et le
+fichier est réutilisé : un run ne score en pratique que le nouveau batch de
+production. Un nouveau modèle ou preprocessor change la clé (les anciens
+scores du même fichier sont supprimés) ; --invalidate vide le cache,
+--force rescore sans le consulter.
+
+Usage:
+    python score_data.py [--force] [--invalidate]
+"""
+import argparse
+import glob
 import os
+import time
 import pandas as pd
 import numpy as np
 import joblib
 
+from reference_profile import file_sha256, load_or_build_profile
+
 TARGET_COL = "Attrition_Flag"
 TARGET_BIN = "churn"
 PRED_COL = "prediction"
@@ -10,6 +30,24 @@ PROBA_COL = "proba"
 
 EPS = 1e-9  # éviter division par 0
 
+# Lignes lues, scorées et écrites à la fois : la mémoire ne dépend pas de la taille du fichier
+SCORE_CHUNK_ROWS = int(os.getenv("SCORE_CHUNK_ROWS", "50000"))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+# modèle dans processors/models, preprocessor dans processors/
+MODEL_PATH = os.path.join(PROJECT_ROOT, "backend", "src", "processors", "models", "best_model_final.pkl")
+PREPROCESSOR_PATH = os.path.join(PROJECT_ROOT, "backend", "src", "processors", "preprocessor.pkl")
+
+SCORE_CACHE_DIR = os.getenv("SCORE_CACHE_DIR", os.path.join(DATA_DIR, "scores"))
+
+# Une ligne du fichier de scores (proba NaN si le modèle n'a pas predict_proba)
+SCORE_DTYPE = np.dtype([(TARGET_BIN, "i1"), (PRED_COL, "i1"), (PROBA_COL, "<f8")])
+
+_sha_memo = {}
+
 def to_bin_label(s: pd.Series) -> pd.Series:
     return (s.astype(str).str.strip() == "Attrited Customer").astype(int)
 
@@ -63,63 +101,163 @@ def add_engineered_features(X: pd.DataFrame) -> pd.DataFrame:
 
     return X
 
-def main():
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.abspath(os.path.join(base_dir, ".."))
+def predict_chunk(model, Xp) -> tuple:
+    """
+    Une seule passe d'inférence : prédiction = classe de proba maximale
+    (ce que fait model.predict), proba de churn = colonne 1
+    """
+    if not hasattr(model, "predict_proba"):
+        return np.asarray(model.predict(Xp)).astype(int), None
+    probas = model.predict_proba(Xp)
+    classes = np.asarray(getattr(model, "classes_", np.array([0, 1])))
+    return classes.take(np.argmax(probas, axis=1)).astype(int), probas[:, 1]
 
-    # modèle dans processors/models
-    models_dir = os.path.join(project_root, "backend", "src", "processors", "models")
-    model_path = os.path.join(models_dir, "best_model_final.pkl")
+def score_chunk(df: pd.DataFrame, name: str, model, preprocessor) -> np.ndarray:
+    if TARGET_COL not in df.columns:
+        raise ValueError(f"Missing '{TARGET_COL}' in {name} data")
 
-    # preprocessor dans processors/
-    preprocessor_path = os.path.join(project_root, "backend", "src", "processors", "preprocessor.pkl")
+    # X brut
+    X = df.drop(columns=[TARGET_COL, TARGET_BIN, PRED_COL, PROBA_COL], errors="ignore")
+    X = normalize_columns(X)
 
-    data_dir = os.path.join(base_dir, "data")
-    ref_path = os.path.join(data_dir, "reference_data.csv")
-    cur_path = os.path.join(data_dir, "current_data.csv")
+    # Feature engineering (IMPORTANT)
+    X = add_engineered_features(X)
 
-    for p in [model_path, preprocessor_path, ref_path, cur_path]:
-        if not os.path.exists(p):
-            raise FileNotFoundError(f"Missing file: {p}")
+    # Transform + predict
+    y_pred, y_proba = predict_chunk(model, preprocessor.transform(X))
 
-    print("Loading model + preprocessor...")
-    model = joblib.load(model_path)
-    preprocessor = joblib.load(preprocessor_path)
+    scores = np.empty(len(df), dtype=SCORE_DTYPE)
+    scores[TARGET_BIN] = to_bin_label(df[TARGET_COL]).to_numpy()
+    scores[PRED_COL] = y_pred
+    scores[PROBA_COL] = np.nan if y_proba is None else y_proba
+    return scores
 
-    print("Loading reference/current data...")
-    ref = pd.read_csv(ref_path)
-    cur = pd.read_csv(cur_path)
+# =========================
+# CACHE DES SCORES
+# =========================
+def cached_sha256(path: str) -> str:
+    """file_sha256 mémorisé tant que le fichier (taille, mtime) ne change pas"""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if key not in _sha_memo:
+        _sha_memo[key] = file_sha256(path)
+    return _sha_memo[key]
 
-    for name, df in [("reference", ref), ("current", cur)]:
-        print(f"Scoring {name} data...")
+def scores_path(data_path: str, model_path: str = None, preprocessor_path: str = None,
+                cache_dir: str = None) -> str:
+    """Fichier de scores pour ce contenu de CSV, ce modèle et ce preprocessor"""
+    name = os.path.splitext(os.path.basename(data_path))[0]
+    key = "-".join([
+        cached_sha256(data_path)[:16],
+        cached_sha256(model_path or MODEL_PATH)[:8],
+        cached_sha256(preprocessor_path or PREPROCESSOR_PATH)[:8],
+    ])
+    return os.path.join(cache_dir or SCORE_CACHE_DIR, f"{name}-{key}.scores")
+
+def load_scores(data_path: str, **kwargs):
+    """Scores en cache du CSV (DataFrame churn / prediction / proba), None s'il faut scorer"""
+    try:
+        path = scores_path(data_path, **kwargs)
+    except FileNotFoundError:
+        return None  # CSV ou artefacts absents : rien à relire
+    if not os.path.exists(path):
+        return None
+    return pd.DataFrame(np.fromfile(path, dtype=SCORE_DTYPE))
+
+def scored_profile(data_path: str, scores: pd.DataFrame = None) -> dict:
+    """Profil de référence persistant, avec les colonnes de scores si elles sont en cache"""
+    scores = load_scores(data_path) if scores is None else scores
+    if scores is None:
+        return load_or_build_profile(data_path)
+    return load_or_build_profile(data_path, extra=scores, extra_key=os.path.basename(scores_path(data_path)))
+
+def with_scores(df: pd.DataFrame, scores: pd.DataFrame) -> pd.DataFrame:
+    """Ajoute les colonnes de scores (même ordre de lignes) à un CSV chargé"""
+    if len(df) != len(scores):
+        raise ValueError(f"Scores ({len(scores)} lignes) incohérents avec les données ({len(df)} lignes)")
+    df = df.drop(columns=list(SCORE_DTYPE.names), errors="ignore").reset_index(drop=True)
+    return pd.concat([df, scores.reset_index(drop=True)], axis=1)
+
+def prune_scores(path: str) -> int:
+    """Supprime les scores du même fichier calculés avec un autre contenu ou d'autres artefacts"""
+    name = os.path.basename(path).rsplit("-", 3)[0]
+    removed = 0
+    for old in glob.glob(os.path.join(os.path.dirname(path), f"{glob.escape(name)}-*-*-*.scores")):
+        if old != path and os.path.basename(old).rsplit("-", 3)[0] == name:
+            os.remove(old)
+            removed += 1
+    return removed
+
+def invalidate_scores(cache_dir: str = None) -> int:
+    """Vide le cache des scores (prochain run : tout est rescoré)"""
+    paths = glob.glob(os.path.join(cache_dir or SCORE_CACHE_DIR, "*.scores"))
+    for path in paths:
+        os.remove(path)
+    return len(paths)
+
+def score_file(path: str, name: str, model, preprocessor, out_path: str, chunk_rows: int = None) -> int:
+    """
+    Score un CSV par blocs de chunk_rows lignes ; les scores de chaque bloc sont
+    ajoutés à un fichier temporaire qui devient out_path à la fin (un run
+    interrompu ne laisse pas de scores tronqués). Retourne le nombre de lignes.
+    """
+    chunk_rows = chunk_rows or SCORE_CHUNK_ROWS
+    tmp_path = f"{out_path}.tmp"
+    rows = 0
+    start = time.perf_counter()
 
-        if TARGET_COL not in df.columns:
-            raise ValueError(f"Missing '{TARGET_COL}' in {name} data")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    try:
+        with open(tmp_path, "wb") as out:
+            for chunk in pd.read_csv(path, chunksize=chunk_rows):
+                score_chunk(chunk, name, model, preprocessor).tofile(out)
+                rows += len(chunk)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
-        df[TARGET_BIN] = to_bin_label(df[TARGET_COL])
+    os.replace(tmp_path, out_path)
+    print(f"   {rows:,} lignes scorées en {time.perf_counter() - start:.2f}s (blocs de {chunk_rows:,})")
+    return rows
 
-        # X brut
-        X = df.drop(columns=[TARGET_COL, TARGET_BIN, PRED_COL, PROBA_COL], errors="ignore")
-        X = normalize_columns(X)
+def main():
+    parser = argparse.ArgumentParser(description="Scoring des données de monitoring (avec cache)")
+    parser.add_argument("--force", action="store_true", help="rescorer sans consulter le cache")
+    parser.add_argument("--invalidate", action="store_true", help="vider le cache des scores puis quitter")
+    args = parser.parse_args()
 
-        # Feature engineering (IMPORTANT)
-        X = add_engineered_features(X)
+    if args.invalidate:
+        print(f"🗑️ {invalidate_scores()} fichier(s) de scores supprimé(s) de {SCORE_CACHE_DIR}")
+        return
 
-        # Transform + predict
-        Xp = preprocessor.transform(X)
+    ref_path = os.path.join(DATA_DIR, "reference_data.csv")
+    cur_path = os.path.join(DATA_DIR, "current_data.csv")
 
-        y_pred = model.predict(Xp)
-        df[PRED_COL] = pd.Series(y_pred).astype(int)
+    for p in [MODEL_PATH, PREPROCESSOR_PATH, ref_path, cur_path]:
+        if not os.path.exists(p):
+            raise FileNotFoundError(f"Missing file: {p}")
+
+    model = preprocessor = None
+    for name, path in [("reference", ref_path), ("current", cur_path)]:
+        out_path = scores_path(path)
+        if os.path.exists(out_path) and not args.force:
+            print(f"♻️ Scores {name} réutilisés: {os.path.basename(out_path)}")
+            continue
 
-        if hasattr(model, "predict_proba"):
-            df[PROBA_COL] = model.predict_proba(Xp)[:, 1]
-        else:
-            df[PROBA_COL] = None
+        # Artefacts chargés seulement s'il y a quelque chose à scorer
+        if model is None:
+            print("Loading model + preprocessor...")
+            model = joblib.load(MODEL_PATH)
+            preprocessor = joblib.load(PREPROCESSOR_PATH)
 
-    ref.to_csv(ref_path, index=False)
-    cur.to_csv(cur_path, index=False)
+        print(f"Scoring {name} data...")
+        score_file(path, name, model, preprocessor, out_path)
+        removed = prune_scores(out_path)
+        if removed:
+            print(f"   {removed} ancien(s) fichier(s) de scores supprimé(s)")
 
-    print("✅ Done. Added columns:", [TARGET_BIN, PRED_COL, PROBA_COL])
+    print("✅ Done. Scores:", [TARGET_BIN, PRED_COL, PROBA_COL], "->", SCORE_CACHE_DIR)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Drift en continu sur le journal des prédictions du backend
+
+Lit en continu (tail) le fichier JSON lines écrit par backend/src/prediction_log.py
+(PREDICTION_LOG_PATH) et compare la production récente au profil de référence
+(reference_profile.py, scores de score_data.py inclus), sans attendre le
+prochain run Jenkins.
+
+Fenêtres :
+- tumbling : un "pane" de STREAM_PANE_S secondes (horodatage des prédictions)
+- sliding  : les panes des STREAM_WINDOW_S dernières secondes, fusionnés
+
+Chaque pane ne garde que des sketchs fusionnables, de taille fixée par le
+profil : effectifs sur les bornes de bins de la référence, effectifs entre les
+points du sketch de répartition (pour le KS), compteurs de manquants / hors
+plage, effectifs par modalité (plafonnés). Ajouter une ligne coûte quelques
+recherches dichotomiques ; la fenêtre glissante est la somme des panes de
+l'anneau. La mémoire ne dépend donc ni du débit ni de la durée du run.
+
+À la fermeture de chaque pane (ou après STREAM_PANE_S + STREAM_LATENESS_S
+secondes sans nouvelle ligne), les deux fenêtres sont évaluées avec les
+mêmes tests que la gate Jenkins (drift_engine.drift_decision) et un
+événement est ajouté à STREAM_EVENTS_PATH.
+
+Usage:
+    python stream_drift.py [--log predictions.jsonl] [--reference reference_data.csv]
+                           [--from-start] [--once]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from drift_engine import DRIFT_SHARE, category_values, drift_decision, kolmogorov_sf, quality_issues
+from score_data import scored_profile
+
+# =========================
+# CONFIG
+# =========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+LOG_PATH = os.getenv("PREDICTION_LOG_PATH", os.path.join(DATA_DIR, "predictions.jsonl"))
+EVENTS_PATH = os.getenv("STREAM_EVENTS_PATH", os.path.join(DATA_DIR, "stream_drift_events.jsonl"))
+
+STREAM_PANE_S = int(os.getenv("STREAM_PANE_S", "60"))
+STREAM_WINDOW_S = int(os.getenv("STREAM_WINDOW_S", "900"))
+# En dessous, une fenêtre n'est pas évaluée (PSI / JS trop bruités)
+STREAM_MIN_RECORDS = int(os.getenv("STREAM_MIN_RECORDS", "500"))
+# Délai accordé aux lignes en retard avant de fermer un pane sur l'horloge
+STREAM_LATENESS_S = float(os.getenv("STREAM_LATENESS_S", "5"))
+STREAM_POLL_S = float(os.getenv("STREAM_POLL_S", "1.0"))
+STREAM_BATCH_LINES = int(os.getenv("STREAM_BATCH_LINES", "5000"))
+# Modalités inconnues conservées par colonne et par pane (le reste est regroupé)
+STREAM_MAX_CATEGORIES = int(os.getenv("STREAM_MAX_CATEGORIES", "64"))
+
+# Cible : inconnue au moment du scoring, jamais comparée
+EXCLUDED_COLUMNS = {"attrition_flag", "churn"}
+OTHER_CATEGORY = "(autres)"
+
+
+# =========================
+# SKETCHS PAR COLONNE
+# =========================
+class NumericSketch:
+    """Effectifs sur les bornes et le sketch de répartition d'une colonne numérique"""
+
+    def __init__(self, ref: dict):
+        self.ref = ref
+        self.edges = np.asarray(ref["edges"], dtype=np.float64)
+        self.points = np.asarray(ref["sketch"]["values"], dtype=np.float64)
+        self.bins = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.steps = np.zeros(len(self.points) + 1, dtype=np.int64)
+        self.count = self.missing = self.invalid = self.outside = 0
+
+    def add(self, series: pd.Series):
+        originally_missing = int(series.isna().sum())
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        nan = np.isnan(values)
+        self.missing += int(nan.sum())
+        self.invalid += int(nan.sum()) - originally_missing
+        values = values[~nan]
+
+        # side="left" : bin i = ]e(i-1), e(i)], même convention que sorted_counts
+        self.bins += np.bincount(np.searchsorted(self.edges, values, side="left"), minlength=len(self.bins))
+        self.steps += np.bincount(np.searchsorted(self.points, values, side="left"), minlength=len(self.steps))
+        stats = self.ref["stats"]
+        self.outside += int(((values < stats.get("min", -np.inf)) | (values > stats.get("max", np.inf))).sum())
+        self.count += len(values)
+
+    def merge(self, other: "NumericSketch"):
+        self.bins += other.bins
+        self.steps += other.steps
+        self.count += other.count
+        self.missing += other.missing
+        self.invalid += other.invalid
+        self.outside += other.outside
+
+    def ks(self) -> tuple:
+        """KS évalué aux points du sketch de référence (exact si la colonne est discrète)"""
+        if self.count == 0 or len(self.points) == 0:
+            return 0.0, 1.0
+        cdf_cur = np.cumsum(self.steps)[:-1] / self.count
+        d = float(np.max(np.abs(np.asarray(self.ref["sketch"]["cdf"]) - cdf_cur)))
+        return d, kolmogorov_sf(d, self.ref["count"], self.count)
+
+    def evaluate(self, reference_rows: int, rows: int) -> tuple:
+        ks_stat, ks_pvalue = self.ks()
+        decision = drift_decision("num", np.asarray(self.ref["counts"]), self.bins, ks_stat, ks_pvalue, reference_rows)
+        quality = {
+            "non_numeric": self.invalid,
+            "out_of_range_share": self.outside / rows if rows else 0.0,
+        }
+        return decision, quality
+
+
+class CategorySketch:
+    """Effectifs par modalité d'une colonne catégorielle (modalités inconnues plafonnées)"""
+
+    def __init__(self, ref: dict):
+        self.ref = ref
+        self.counts = {}
+        self.count = self.missing = 0
+
+    def _add_count(self, label: str, n: int):
+        if label not in self.counts and label not in self.ref["categories"]:
+            unseen = len(self.counts.keys() - self.ref["categories"].keys())
+            if unseen >= STREAM_MAX_CATEGORIES:
+                label = OTHER_CATEGORY
+        self.counts[label] = self.counts.get(label, 0) + n
+
+    def add(self, series: pd.Series):
+        self.missing += int(series.isna().sum())
+        for label, n in category_values(series).items():
+            self._add_count(label, int(n))
+            self.count += int(n)
+
+    def merge(self, other: "CategorySketch"):
+        for label, n in other.counts.items():
+            self._add_count(label, n)
+        self.count += other.count
+        self.missing += other.missing
+
+    def evaluate(self, reference_rows: int, rows: int) -> tuple:
+        categories = self.ref["categories"]
+        unseen = [c for c in self.counts if c not in categories]
+        labels = list(categories) + unseen
+        ref_counts = np.array([categories.get(c, 0) for c in labels])
+        cur_counts = np.array([self.counts.get(c, 0) for c in labels])
+        decision = drift_decision("cat", ref_counts, cur_counts, None, None, reference_rows)
+        quality = {
+            "unseen_categories": unseen[:20],
+            "unseen_share": sum(self.counts[c] for c in unseen) / rows if rows else 0.0,
+        }
+        return decision, quality
+
+
+class Pane:
+    """Sketchs de toutes les colonnes suivies sur un intervalle de temps"""
+
+    def __init__(self, pane_id: int, profile_columns: dict):
+        self.id = pane_id
+        self.rows = 0
+        self.sketches = {
+            key: (NumericSketch(ref) if ref["type"] == "num" else CategorySketch(ref))
+            for key, (_, ref) in profile_columns.items()
+        }
+
+    def add(self, records: pd.DataFrame):
+        self.rows += len(records)
+        for key, sketch in self.sketches.items():
+            if key in records.columns:
+                sketch.add(records[key])
+            else:
+                sketch.missing += len(records)
+
+    def merge(self, other: "Pane"):
+        self.rows += other.rows
+        for key, sketch in self.sketches.items():
+            sketch.merge(other.sketches[key])
+
+
+# =========================
+# MONITEUR
+# =========================
+class StreamDriftMonitor:
+
+    def __init__(self, profile: dict, pane_s: int = None, window_s: int = None,
+                 min_records: int = None, events_path: str = None):
+        self.profile = profile
+        self.pane_s = pane_s or STREAM_PANE_S
+        self.window_panes = max(1, (window_s or STREAM_WINDOW_S) // self.pane_s)
+        self.min_records = STREAM_MIN_RECORDS if min_records is None else min_records
+        self.events_path = events_path or EVENTS_PATH
+
+        # Le journal utilise les noms de colonnes en minuscules
+        self.columns = {
+            name.lower(): (name, ref)
+            for name, ref in profile["columns"].items()
+            if name.lower() not in EXCLUDED_COLUMNS
+        }
+        self.open = None
+        self.last_closed = None
+        self.ring = deque(maxlen=self.window_panes)
+        self.late = 0
+        self.events = 0
+
+    def ingest(self, records: list):
+        """Ajoute un micro-batch de lignes du journal (dicts)"""
+        df = pd.DataFrame.from_records(records)
+        if "ts" not in df.columns:
+            return
+        ts = pd.to_numeric(df["ts"], errors="coerce")
+        df = df[ts.notna()]
+        pane_ids = (ts[ts.notna()] // self.pane_s).astype(np.int64)
+
+        for pane_id, group in df.groupby(pane_ids.to_numpy(), sort=True):
+            pane_id = int(pane_id)
+            # Pane déjà fermé (tick) : rattaché au suivant, jamais rouvert (sinon
+            # un second pane du même id entre dans l'anneau, compté deux fois)
+            late = self.last_closed is not None and pane_id <= self.last_closed
+            if late:
+                pane_id = self.last_closed + 1
+            if self.open is not None and pane_id > self.open.id:
+                self.close()
+            if self.open is None:
+                self.open = Pane(pane_id, self.columns)
+            elif pane_id < self.open.id:
+                late = True
+            if late:
+                # Ligne en retard : comptée dans le pane courant
+                self.late += len(group)
+            self.open.add(group)
+
+    def tick(self, now: float = None):
+        """Ferme le pane courant si son intervalle est écoulé (flux inactif)"""
+        now = time.time() if now is None else now
+        if self.open is not None and now >= (self.open.id + 1) * self.pane_s + STREAM_LATENESS_S:
+            self.close()
+
+    def close(self):
+        """Ferme le pane courant et évalue les fenêtres tumbling et sliding"""
+        if self.open is None:
+            return
+        closed, self.open = self.open, None
+        self.last_closed = closed.id
+        # Les panes sortis de la fenêtre (trou dans le flux) ne comptent plus
+        while self.ring and self.ring[0].id <= closed.id - self.window_panes:
+            self.ring.popleft()
+        self.ring.append(closed)
+
+        self.evaluate("tumbling", [closed])
+        if self.window_panes > 1:
+            self.evaluate("sliding", list(self.ring))
+
+    def evaluate(self, window: str, panes: list) -> dict:
+        merged = Pane(panes[-1].id, self.columns)
+        for pane in panes:
+            merged.merge(pane)
+        if merged.rows < self.min_records:
+            return None
+
+        reference_rows = self.profile["rows"]
+        drifted, issues = {}, []
+        for key, sketch in merged.sketches.items():
+            name, ref = self.columns[key]
+            (_, test, score, threshold, detected), quality = sketch.evaluate(reference_rows, merged.rows)
+            quality["missing_share"] = {
+                "reference": ref["missing"] / reference_rows if reference_rows else 0.0,
+                "current": sketch.missing / merged.rows,
+            }
+            if detected:
+                drifted[name] = {"stattest": test, "score": round(float(score), 6), "threshold": threshold}
+            issues += quality_issues(name, quality)
+
+        n_columns = len(merged.sketches)
+        share = len(drifted) / n_columns if n_columns else 0.0
+        event = {
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "window": window,
+            "start": datetime.fromtimestamp(panes[0].id * self.pane_s).isoformat(timespec="seconds"),
+            "end": datetime.fromtimestamp((panes[-1].id + 1) * self.pane_s).isoformat(timespec="seconds"),
+            "rows": merged.rows,
+            "number_of_columns": n_columns,
+            "number_of_drifted_columns": len(drifted),
+            "share_of_drifted_columns": round(share, 4),
+            "dataset_drift": bool(n_columns) and share >= DRIFT_SHARE,
+            "drifted_columns": drifted,
+            "issues": issues,
+        }
+        self.emit(event)
+        return event
+
+    def emit(self, event: dict):
+        self.events += 1
+        os.makedirs(os.path.dirname(os.path.abspath(self.events_path)), exist_ok=True)
+        with open(self.events_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+        flag = "🔴" if event["dataset_drift"] else ("🟠" if event["drifted_columns"] else "🟢")
+        span = f"{event['start'][11:]}–{event['end'][11:]}"
+        print(f"{flag} [{event['window']:8s} {span}] {event['number_of_drifted_columns']}/"
+              f"{event['number_of_columns']} colonnes en drift ({event['rows']:,} lignes)"
+              + (f": {', '.join(event['drifted_columns'])}" if event["drifted_columns"] else ""))
+        for issue in event["issues"][:5]:
+            print(f"   ⚠️  Qualité: {issue}")
+
+
+# =========================
+# LECTURE DU JOURNAL
+# =========================
+class LogTailer:
+    """tail -F d'un fichier JSON lines : suit la rotation (<path>.1) et la troncature"""
+
+    def __init__(self, path: str, from_start: bool = False):
+        self.path = path
+        self.from_start = from_start
+        self.f = None
+        self.inode = None
+        self.partial = b""
+        self.malformed = 0
+
+    def _open(self, from_start: bool) -> bool:
+        try:
+            self.f = open(self.path, "rb")
+        except FileNotFoundError:
+            # Journal pas encore créé : il sera lu depuis le début à son apparition
+            self.from_start = True
+            return False
+        self.inode = os.fstat(self.f.fileno()).st_ino
+        if not from_start:
+            self.f.seek(0, os.SEEK_END)
+        self.partial = b""
+        return True
+
+    def _check_rotation(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self.inode:
+            # Rotation : fin de l'ancien fichier déjà lue (EOF), le nouveau est lu depuis le début
+            self.f.close()
+            self._open(from_start=True)
+        elif st.st_size < self.f.tell():
+            self.f.seek(0)
+            self.partial = b""
+
+    def read(self, max_lines: int = None) -> list:
+        """Jusqu'à max_lines lignes complètes, décodées (les lignes invalides sont ignorées)"""
+        if self.f is None and not self._open(self.from_start):
+            return []
+
+        records = []
+        for _ in range(max_lines or STREAM_BATCH_LINES):
+            line = self.f.readline()
+            if not line:
+                break
+            if not line.endswith(b"\n"):
+                # Ligne en cours d'écriture : complétée au prochain appel
+                self.partial += line
+                break
+            line, self.partial = self.partial + line, b""
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line.decode("utf-8")))
+            except ValueError:
+                self.malformed += 1
+
+        if not records and not self.partial:
+            self._check_rotation()
+        return records
+
+
+# =========================
+# MAIN
+# =========================
+def run(log_path: str, reference_path: str, from_start: bool = False, once: bool = False,
+        pane_s: int = None, window_s: int = None) -> StreamDriftMonitor:
+    # Scores de la référence inclus s'ils sont en cache : drift de prediction / proba
+    profile = scored_profile(reference_path)
+    monitor = StreamDriftMonitor(profile, pane_s=pane_s, window_s=window_s)
+    tailer = LogTailer(log_path, from_start=from_start or once)
+
+    print(f"👀 Suivi de {log_path} : {len(monitor.columns)} colonnes, pane {monitor.pane_s}s, "
+          f"fenêtre {monitor.pane_s * monitor.window_panes}s")
+    processed = 0
+    try:
+        while True:
+            records = tailer.read()
+            if records:
+                monitor.ingest(records)
+                processed += len(records)
+                continue
+            if once:
+                monitor.close()
+                break
+            monitor.tick()
+            time.sleep(STREAM_POLL_S)
+    except KeyboardInterrupt:
+        pass
+
+    print(f"📊 {processed:,} lignes lues, {monitor.events} événement(s), "
+          f"{monitor.late:,} en retard, {tailer.malformed:,} invalide(s)")
+    return monitor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drift en continu sur le journal des prédictions")
+    parser.add_argument("--log", default=LOG_PATH)
+    parser.add_argument("--reference", default=os.path.join(DATA_DIR, "reference_data.csv"))
+    parser.add_argument("--from-start", action="store_true", help="relire le journal depuis le début")
+    parser.add_argument("--once", action="store_true", help="traiter le journal existant puis s'arrêter")
+    parser.add_argument("--pane", type=int, default=None, help="taille du pane en secondes")
+    parser.add_argument("--window", type=int, default=None, help="taille de la fenêtre glissante en secondes")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.reference):
+        print(f"❌ Référence introuvable: {args.reference} (lancer prepare_data.py)")
+        sys.exit(1)
+
+    run(args.log, args.reference, args.from_start, args.once, args.pane, args.window)